@@ -0,0 +1,55 @@
+# --- Analisi Visiva dei Bit Meno Significativi ---
+# Per controllare cosa ha cambiato la steganografia: un "piano di bit" mostra,
+# per ogni pixel, il valore di un singolo bit di un canale (bianco = 1, nero = 0);
+# la differenza tra un originale e il suo "_con_testo.png" evidenzia i pixel
+# modificati, colorati secondo i canali cambiati. Tutto è calcolato con NumPy
+# sull'intera immagine in una sola operazione (niente cicli sui pixel).
+import os # Per cercare l'originale di un file "_con_testo"
+import numpy as np # Operazioni vettorizzate sui pixel
+from PIL import Image # Per manipolazione immagini
+
+CANALI_ANALISI = {"RGB": None, "R": 0, "G": 1, "B": 2} # None = i tre canali insieme (immagine a colori)
+SUFFISSO_TESTO = "_con_testo" # Suffisso proposto da 'Nascondi Testo' per il file con il messaggio
+
+
+def piano_di_bit(img, canale, bit):
+    """Immagine del bit 'bit' (0 = LSB) del canale indicato: L in bianco e nero
+    per un singolo canale, RGB per "RGB" (ogni canale mostra il proprio bit).
+    """
+    pixel = np.asarray(img)
+    if pixel.ndim == 2: pixel = pixel[:, :, None] # Immagini a un solo canale
+    indice = CANALI_ANALISI[canale]
+    if indice is None:
+        scelti = pixel[:, :, :3] if pixel.shape[2] >= 3 else np.repeat(pixel[:, :, :1], 3, axis=2)
+        return Image.fromarray(((scelti >> bit) & 1) * np.uint8(255), "RGB")
+    scelto = pixel[:, :, min(indice, pixel.shape[2] - 1)]
+    return Image.fromarray(((scelto >> bit) & 1) * np.uint8(255), "L")
+
+
+def differenza(originale, modificata):
+    """Confronta due immagini delle stesse dimensioni.
+    Restituisce (immagine RGB, pixel cambiati): ogni canale cambiato è acceso al massimo,
+    quindi anche una modifica di un solo livello (LSB) è ben visibile.
+    """
+    if originale.size != modificata.size:
+        raise ValueError(f"Dimensioni diverse: {originale.size[0]}x{originale.size[1]} e {modificata.size[0]}x{modificata.size[1]}")
+    a = np.asarray(originale.convert("RGB"))
+    b = np.asarray(modificata.convert("RGB"))
+    cambiati = a != b
+    return Image.fromarray(cambiati.astype(np.uint8) * np.uint8(255), "RGB"), int(cambiati.any(axis=2).sum())
+
+
+def trova_originale(path, estensioni):
+    """Per "nome_con_testo.png" cerca "nome" (con una delle 'estensioni') nella stessa cartella;
+    per un originale cerca il suo "nome_con_testo.png". Restituisce (originale, con_testo) o None.
+    """
+    cartella, nome = os.path.split(path)
+    base = os.path.splitext(nome)[0]
+    if base.endswith(SUFFISSO_TESTO):
+        radice = base[:-len(SUFFISSO_TESTO)]
+        for estensione in [e for est in estensioni for e in (est.lower(), est.upper())]:
+            candidato = os.path.join(cartella, radice + estensione)
+            if os.path.isfile(candidato): return candidato, path
+        return None
+    candidato = os.path.join(cartella, base + SUFFISSO_TESTO + ".png")
+    return (path, candidato) if os.path.isfile(candidato) else None
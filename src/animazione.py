@@ -0,0 +1,139 @@
+# --- Riproduzione delle GIF Animate ---
+# Un thread separato decodifica i fotogrammi della GIF (già composti da Pillow) e
+# li ridimensiona alla vista; il thread della GUI li converte in PhotoImage, li
+# conserva in una cache con un limite di memoria e li mostra con timer after()
+# che rispettano la durata di ogni fotogramma. Se la GUI resta indietro i
+# fotogrammi in ritardo vengono saltati invece di bloccare l'interfaccia.
+import time # Orologio monotono per la temporizzazione
+import queue # Coda limitata tra decodifica e GUI
+import threading # La decodifica gira in un thread separato
+from PIL import Image, ImageSequence, ImageTk # Per manipolazione immagini
+
+from cache import CacheLRU # Cache dei fotogrammi già convertiti
+
+
+class RiproduttoreGif:
+    """Riproduce una GIF animata chiamando 'mostra(photo)' per ogni fotogramma.
+
+    Se tutti i fotogrammi stanno nel budget di memoria, dopo il primo giro la
+    decodifica si ferma e l'animazione prosegue solo dalla cache; altrimenti il
+    thread continua a decodificare in ciclo, sempre con pochi fotogrammi di anticipo.
+    """
+
+    BUDGET_MEMORIA = 64 * 1024 * 1024 # Byte massimi dei fotogrammi convertiti in cache
+    FOTOGRAMMI_ANTICIPO = 8 # Fotogrammi decodificati in anticipo (limite della coda)
+    DURATA_MINIMA = 20 # ms: durate inferiori vengono trattate come i browser...
+    DURATA_PREDEFINITA = 100 # ...cioè come 100 ms
+    ATTESA_DECODIFICA = 10 # ms tra due controlli se il fotogramma successivo non è ancora pronto
+
+    def __init__(self, widget, mostra):
+        self.widget = widget # Widget Tkinter usato per i timer after()
+        self.mostra = mostra
+        self.path = self.dimensione = None
+        self._job = None
+        self._stop = threading.Event()
+        self._coda = None
+        self._cache = None
+        self.fotogrammi_saltati = 0
+
+    def avvia(self, path, dimensione):
+        """Avvia (o riavvia) la riproduzione di 'path' con fotogrammi grandi 'dimensione'."""
+        if (path, dimensione) == (self.path, self.dimensione) and self._job is not None: return # Già in corso
+        self.ferma()
+        self.path, self.dimensione = path, dimensione
+        # Ogni riproduzione ha la sua coda e il suo evento: un thread precedente non può interferire
+        self._stop = threading.Event()
+        self._coda = queue.Queue(self.FOTOGRAMMI_ANTICIPO)
+        self._cache = CacheLRU(self.BUDGET_MEMORIA, peso=lambda elemento: elemento[2])
+        self._totale = None # Numero di fotogrammi (noto dal primo fotogramma decodificato)
+        self._indice = -1 # Fotogramma mostrato
+        self._scadenza = time.monotonic() # Istante in cui il fotogramma mostrato va sostituito
+        self._completa = False # True quando tutti i fotogrammi sono in cache
+        self.fotogrammi_saltati = 0
+        threading.Thread(target=self._decodifica, args=(path, dimensione, self._stop, self._coda), daemon=True).start()
+        self._job = self.widget.after(0, self._avanza)
+
+    def ferma(self):
+        """Ferma riproduzione e decodifica (la cache viene liberata)."""
+        if self._job is not None:
+            self.widget.after_cancel(self._job)
+            self._job = None
+        self._stop.set()
+        self._cache = None
+        self.path = self.dimensione = None
+
+    def memoria_occupata(self):
+        """Byte dei fotogrammi convertiti in cache (entro BUDGET_MEMORIA)."""
+        return self._cache.peso_totale if self._cache is not None else 0
+
+    # --- Thread di decodifica ---
+
+    def _decodifica(self, path, dimensione, stop, coda):
+        """Decodifica e ridimensiona i fotogrammi in ordine, ricominciando finché non viene fermato."""
+        try:
+            while not stop.is_set():
+                with Image.open(path) as img:
+                    totale = getattr(img, "n_frames", 1)
+                    for i, fotogramma in enumerate(ImageSequence.Iterator(img)):
+                        if stop.is_set(): return
+                        durata = fotogramma.info.get("duration") or 0
+                        if durata < self.DURATA_MINIMA: durata = self.DURATA_PREDEFINITA
+                        adattato = fotogramma.convert("RGBA").resize(dimensione, Image.Resampling.BILINEAR)
+                        while not stop.is_set(): # Attende spazio nella coda senza restare bloccato per sempre
+                            try: coda.put((i, totale, adattato, durata), timeout=0.1); break
+                            except queue.Full: pass
+        except Exception as e: # File corrotto o troncato: resta visibile l'ultimo fotogramma
+            print(f"WARN: Riproduzione GIF interrotta per {path}: {e}")
+
+    # --- Temporizzazione (thread della GUI) ---
+
+    def _avanza(self):
+        """Mostra il fotogramma successivo quando è il momento, saltando quelli in ritardo."""
+        self._job = None
+        ora = time.monotonic()
+        if ora < self._scadenza:
+            self._job = self.widget.after(max(1, int((self._scadenza - ora) * 1000)), self._avanza)
+            return
+        elemento = self._prossimo_da_cache(ora) if self._completa else self._prossimo_da_coda(ora)
+        if elemento is None: # Il decoder non ha ancora pronto il fotogramma: riprova tra poco
+            self._job = self.widget.after(self.ATTESA_DECODIFICA, self._avanza)
+            return
+        indice, photo, durata = elemento
+        self._indice = indice
+        # Se il ritardo supera un intero fotogramma (es. attesa del decoder) riparte da adesso
+        inizio = self._scadenza if ora - self._scadenza < durata / 1000 else ora
+        self._scadenza = inizio + durata / 1000
+        self.mostra(photo)
+        self._job = self.widget.after(max(1, int((self._scadenza - time.monotonic()) * 1000)), self._avanza)
+
+    def _prossimo_da_cache(self, ora):
+        """Animazione interamente in cache: sceglie il fotogramma che dovrebbe essere visibile ora."""
+        indice = (self._indice + 1) % self._totale
+        photo, durata, _ = self._cache.get(indice)
+        for _ in range(self._totale): # Salta i fotogrammi il cui intervallo è già passato
+            if ora < self._scadenza + durata / 1000: break
+            self._scadenza += durata / 1000
+            self.fotogrammi_saltati += 1
+            indice = (indice + 1) % self._totale
+            photo, durata, _ = self._cache.get(indice)
+        return indice, photo, durata
+
+    def _prossimo_da_coda(self, ora):
+        """Prende il prossimo fotogramma decodificato; quelli già scaduti vengono scartati senza convertirli."""
+        while True:
+            try: indice, totale, img, durata = self._coda.get_nowait()
+            except queue.Empty: return None
+            self._totale = totale
+            if ora >= self._scadenza + durata / 1000 and not self._coda.empty():
+                self._scadenza += durata / 1000 # In ritardo e c'è già il successivo: salta questo
+                self.fotogrammi_saltati += 1
+                continue
+            break
+        elemento = self._cache.get(indice)
+        if elemento is None:
+            elemento = (ImageTk.PhotoImage(img), durata, img.width * img.height * 4)
+            self._cache.inserisci(indice, elemento)
+        if len(self._cache) == self._totale: # Tutti i fotogrammi in cache: la decodifica non serve più
+            self._completa = True
+            self._stop.set()
+        return indice, elemento[0], durata
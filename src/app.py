@@ -3,11 +3,12 @@ import tkinter as tk
 # ttkbootstrap migliora l'aspetto di tkinter
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import * # Importa costanti di stile (es. PRIMARY, INFO)
-from tkinter import filedialog, messagebox, scrolledtext # Widget standard Tkinter
+from tkinter import filedialog, messagebox, scrolledtext, simpledialog # Widget standard Tkinter
 import os # Per operazioni sul sistema operativo (path, file)
 from PIL import Image, ImageTk, UnidentifiedImageError # Per manipolazione immagini
 import sys # Per controllare l'ambiente di esecuzione (es. se è un eseguibile)
 import traceback # Per ottenere dettagli sugli errori
+import multiprocessing # Supporto ai processi di lavoro negli eseguibili
 
 # --- Importazione Libreria Steganografia (con controllo) ---
 # La steganografia permette di nascondere dati (testo) dentro immagini
@@ -18,6 +19,25 @@ except ImportError:
     messagebox.showerror("Errore Dipendenza", "Libreria 'stegano' non trovata.\nInstallala con: pip install stegano")
     sys.exit(1) # Termina l'applicazione
 
+# --- Moduli Interni dell'Applicazione ---
+from catalogo import CatalogoImmagini, leggi_metadati # Catalogo persistente (SQLite) delle cartelle aperte
+from ricerca import IndiceMetadati, analizza_query, ErroreQuery, costruisci_indice_async # Query strutturate e ordinamenti in memoria
+from steganografia import rileva_payload, AnalisiPayload, capacita_voce, miglior_contenitore, nascondi_con_chiave, rivela_con_chiave # Testo nascosto: rilevamento, capacità e modalità con chiave
+from osservatore import OsservatoreCartella, RIMOSSO # Notifiche di file aggiunti/rimossi/modificati
+from miniature import crea_miniatura, livello_per, CacheMultiRisoluzione # Decodifica ridotta e livelli di risoluzione delle miniature
+from duplicati import CalcoloImpronte, raggruppa_duplicati # Ricerca di duplicati con hash percettivi
+from visualizzatore import VisualizzatoreTile # Presentazione a tile con zoom e spostamento
+from atlante import GrigliaAtlante # Griglia disegnata a bande su un unico canvas
+from proiezione import Proiezione, TRANSIZIONI # Proiezione automatica con decodifica anticipata
+from codificatore_png import salva_png, PROFILI_PNG, PROFILO_PREDEFINITO, memoria_blocchi, riduci_blocchi # Profili di codifica PNG
+from cache import CacheLRU # Cache delle miniature (scaricate dal gestore della memoria)
+from decodifica import DecodificatoreEsterno, ErroreDecodifica # Decodifica in processi separati
+from io_remoto import LettoreFileRemoti # Letture parallele e cache dei file delle cartelle di rete
+from memoria import GestoreMemoria, BUDGET_PREDEFINITO, BUDGET_DISPONIBILI, MB, byte_photo # Budget di memoria
+from analisi_lsb import trova_originale, CANALI_ANALISI, SUFFISSO_TESTO # Piani di bit e differenze (verifica della steganografia)
+from sessione import salva_sessione, carica_sessione, carica_miniature, verifica_sessione # Istantanea della sessione
+from esportazione import EsportazioneBatch, FORMATI_ESPORTAZIONE, QUALITA_PREDEFINITA, prepara_per_formato # Esportazione in blocco
+
 
 # --- Classe Principale dell'Applicazione ---
 class GalleriaImmagini(ttk.Window):
@@ -33,9 +53,10 @@ class GalleriaImmagini(ttk.Window):
         if self._search_debounce_job:
             self.after_cancel(self._search_debounce_job)
 
-        # Avvia un nuovo timer per chiamare _perform_search dopo 300ms
+        # Avvia un nuovo timer per chiamare _perform_search dopo RITARDO_RICERCA ms
+        # (la ricerca usa l'indice a trigrammi in memoria: basta un ritardo minimo per accorpare i tasti)
         # self.after è un metodo Tkinter per eseguire codice dopo un ritardo
-        self._search_debounce_job = self.after(300, self._perform_search)
+        self._search_debounce_job = self.after(self.RITARDO_RICERCA, self._perform_search)
 
     def _perform_search(self):
         """Esegue la ricerca effettiva basandosi sul contenuto attuale della barra.
@@ -46,21 +67,30 @@ class GalleriaImmagini(ttk.Window):
         # Esegui la ricerca solo se una cartella è aperta
         if self.directory_corrente:
             termine_ricerca = self.txt_ricerca.get()
-            # Riutilizza la funzione esistente per caricare/filtrare le immagini
-            self.carica_immagini_da_cartella(self.directory_corrente, termine_ricerca)
-        # else:
-        # Potrebbe voler pulire la griglia se non c'è una cartella,
-        # ma lascia che carica_immagini_da_cartella gestisca il caso
-        # in cui self.directory_corrente è vuoto.
+            # Filtra in memoria i metadati già caricati (nessuna nuova scansione della cartella)
+            self._applica_query(termine_ricerca)
 
 
     # --- Costanti di Configurazione ---
     APP_TITLE = "Galleria Immagini Samu v1.2 (Steganografia)" # Titolo finestra
     DEFAULT_GEOMETRY = "1150x700" # Dimensioni iniziali
     MIN_WINDOW_SIZE = (650, 450) # Dimensioni minime
-    THUMBNAIL_SIZE = (150, 150) # Dimensione miniature nella griglia
+    THUMBNAIL_SIZE = (150, 150) # Dimensione iniziale delle miniature nella griglia (regolabile dalla toolbar)
+    LATO_MINIATURE_MIN, LATO_MINIATURE_MAX = 64, 384 # Estremi del cursore delle miniature
     THUMBNAIL_PADDING = 8 # Spaziatura attorno alle miniature
     ICON_SIZE = (20, 20) # Dimensione icone nella toolbar
+    DATA_DIR = os.path.join(os.path.expanduser("~"), ".galleria_samu") # Cartella dati utente (catalogo, cache)
+    CATALOGO_FILE = "catalogo.db" # Nome del database del catalogo dentro DATA_DIR
+    RITARDO_RICERCA = 30 # Debounce (ms) della ricerca mentre si digita
+    RITARDO_MINIATURE = 120 # Debounce (ms) del cursore della dimensione delle miniature
+    RITARDO_CAPACITA = 100 # Debounce (ms) del contatore dei byte rimasti mentre si digita
+    TESTO_GUIDA_STEGANO = "Inserisci qui il testo da nascondere o visualizza il testo estratto."
+    INTERVALLO_EVENTI_FS = 500 # Ogni quanti ms applicare le modifiche segnalate dall'osservatore cartella
+    INTERVALLO_MEMORIA = 2000 # Ogni quanti ms controllare il budget di memoria e aggiornare la barra di stato
+    INTERVALLO_MINIATURE = 30 # Ogni quanti ms raccogliere le miniature decodificate dai processi separati
+    INTERVALLO_ANALISI = 200 # Ogni quanti ms raccogliere i verdetti dell'analisi steganografica in background
+    INTERVALLO_CATALOGO = 100 # Ogni quanti ms controllare se l'indice di tutto il catalogo è pronto
+    SOGLIA_DUPLICATI = 6 # Distanza massima (bit diversi su 64) tra i pHash di due immagini duplicate
 
     # Dizionario dei formati immagine supportati e le loro estensioni
     SUPPORTED_EXT_MAP = {
@@ -85,6 +115,14 @@ class GalleriaImmagini(ttk.Window):
         ("BMP", "*.bmp"),
         ("Tutti i file", "*.*")
     ]
+    # Ordinamenti disponibili nella barra filtri -> chiave dell'indice metadati
+    ORDINAMENTI = {
+        "Pertinenza": "pertinenza", # Con un testo di ricerca: prima le corrispondenze migliori (altrimenti per nome)
+        "Nome": "nome",
+        "Data": "data",
+        "Dimensione": "dimensione",
+        "Risoluzione": "risoluzione",
+    }
     # Tipi di file specifici per salvare con steganografia (solo PNG è affidabile)
     STEGANO_SAVE_FILETYPES = [
         ("PNG (Lossless)", "*.png"),
@@ -107,10 +145,16 @@ class GalleriaImmagini(ttk.Window):
 
         # Inizializza le variabili di stato
         self._initialize_state()
+        # Apre il catalogo persistente delle immagini (se disponibile)
+        self._apri_catalogo()
 
-        # Crea la barra di stato in fondo alla finestra
-        self.barra_stato = ttk.Label(self, text="Pronto", relief=tk.FLAT, anchor=tk.W, bootstyle=PRIMARY)
-        self.barra_stato.pack(side=tk.BOTTOM, fill=tk.X)
+        # Crea la barra di stato in fondo alla finestra (a destra la memoria occupata)
+        barra = ttk.Frame(self)
+        barra.pack(side=tk.BOTTOM, fill=tk.X)
+        self.etichetta_memoria = ttk.Label(barra, text="", relief=tk.FLAT, anchor=tk.E, bootstyle=PRIMARY)
+        self.etichetta_memoria.pack(side=tk.RIGHT, padx=(10, 5))
+        self.barra_stato = ttk.Label(barra, text="Pronto", relief=tk.FLAT, anchor=tk.W, bootstyle=PRIMARY)
+        self.barra_stato.pack(side=tk.LEFT, fill=tk.X, expand=True)
 
         # Crea tutti i widget (menu, toolbar, area visualizzazione, etc.)
         self._create_widgets()
@@ -118,6 +162,8 @@ class GalleriaImmagini(ttk.Window):
         self._bind_events()
         # Imposta lo stato iniziale dell'interfaccia (es. cosa mostrare all'inizio)
         self._initial_ui_update()
+        # Controllo periodico del budget di memoria
+        self._controlla_memoria()
         print(f"{self.APP_TITLE} inizializzata.")
 
     # --- Metodo per Inizializzare lo Stato ---
@@ -127,7 +173,6 @@ class GalleriaImmagini(ttk.Window):
         self.indice_corrente = tk.IntVar(value=-1) # Indice dell'immagine selezionata (-1 = nessuna)
         self.modalita_visualizzazione = tk.StringVar(value="Griglia") # "Griglia" o "Presentazione"
         self.directory_corrente = "" # Cartella attualmente aperta
-        self.current_photo_image = None # Riferimento all'oggetto PhotoImage per evitare garbage collection
 
         # Variabili booleane per i filtri tipo file
         self.filtro_jpeg = tk.BooleanVar(value=True)
@@ -135,13 +180,95 @@ class GalleriaImmagini(ttk.Window):
         self.filtro_gif = tk.BooleanVar(value=True)
         self.filtro_bmp = tk.BooleanVar(value=True)
 
+        # Impostazioni della proiezione automatica (slideshow)
+        self.intervallo_proiezione = tk.IntVar(value=5) # Secondi per diapositiva
+        self.transizione_proiezione = tk.StringVar(value="Dissolvenza")
+
         # Dizionario per conservare le icone caricate
         self.icons = {}
 
         # Variabile per attivare/disattivare la modalità steganografia
         self.stegano_mode = tk.BooleanVar(value=False)
+        # Profilo di codifica dei PNG con testo nascosto (velocità contro dimensione)
+        self.profilo_png = tk.StringVar(value=PROFILO_PREDEFINITO)
+        # Analisi LSB in presentazione: "Immagine", "Piano di Bit" o "Differenza"
+        self.analisi_modo = tk.StringVar(value="Immagine")
+        self.analisi_canale = tk.StringVar(value="RGB") # Canale del piano di bit (RGB = tutti, a colori)
+        self.analisi_bit = tk.IntVar(value=0) # Bit del piano (0 = LSB)
         self._search_debounce_job = None #Tiene traccia del timer
 
+        # Catalogo persistente (None se il database non è utilizzabile)
+        self.catalogo = None
+        # Se attivo, la ricerca per nome avviene su tutte le cartelle del catalogo
+        self.cerca_ovunque = tk.BooleanVar(value=False)
+        # Metadati della cartella corrente, indicizzati in memoria per filtri e ordinamenti
+        self.indice_metadati = None
+        # Metadati di tutto il catalogo per "Tutte le cartelle" (letti in background al primo uso, scartati se il catalogo cambia)
+        self._indice_catalogo = None
+        self._costruzione_catalogo = None # Future dell'indice in costruzione
+        self._modifiche_catalogo = [] # (metodo, argomenti) arrivati durante la costruzione, riapplicati all'indice
+        self._catalogo_job = None
+        # Ordinamento scelto nella barra filtri
+        self.ordinamento = tk.StringVar(value="Pertinenza")
+        self.ordine_decrescente = tk.BooleanVar(value=False)
+
+        # Analisi steganografica in background dei file senza verdetto (per i filtri 'has:payload')
+        self._analisi_payload = None
+        self._analisi_job = None # Timer che raccoglie i verdetti
+        self._verdetti_da_salvare = {} # path -> verdetto, scritti nel catalogo in un'unica transazione
+        self._calcolo_impronte = None # Hash percettivi in calcolo per "Trova Duplicati"
+
+        # Osservatore della cartella corrente (aggiorna la galleria se i file cambiano)
+        self.osservatore = None
+        self._osservatore_job = None # Timer che legge gli eventi dell'osservatore
+        # Miniature già pronte (PhotoImage, path), indicizzate per chiave cache (cambia se il file viene modificato).
+        # Nessun limite proprio: è il gestore della memoria a scaricare quelle viste meno di recente
+        self._cache_miniature = CacheLRU(float("inf"), peso=lambda valore: byte_photo(valore[0]),
+                                         alla_rimozione=self._scarica_miniatura)
+        self._miniature_in_vista = set() # Chiavi delle miniature nelle righe visibili della griglia
+        self._vista_griglia_job = None # Aggiornamento delle miniature in vista (dopo scorrimento o ridisposizione)
+        # Decodifica in processi separati (un file corrotto non blocca né chiude la finestra)
+        # I file delle cartelle di rete (NFS, SMB) vengono letti una volta, in parallelo, e decodificati dalla memoria
+        self.lettore_remoto = LettoreFileRemoti()
+        self.decodificatore = DecodificatoreEsterno(lettore=self.lettore_remoto)
+        self._miniature_in_arrivo = {} # chiave -> (Future, path, livello) delle miniature in decodifica
+        # Livelli di risoluzione (96/160/192/384) condivisi dalle due griglie: cambiare dimensione non rilegge i file
+        self.livelli_miniature = CacheMultiRisoluzione(float("inf"))
+        self.lato_miniature = tk.IntVar(value=self.THUMBNAIL_SIZE[0]) # Lato scelto con il cursore della toolbar
+        self._lato_miniature_job = None # Applicazione ritardata del cursore (durante il trascinamento)
+        self._capacita_job = None # Aggiornamento ritardato del contatore dei byte rimasti
+        self.chiave_stegano = None # Frase segreta della modalità con chiave (None = ordine sequenziale di stegano)
+        self._lato_applicato = self.THUMBNAIL_SIZE[0] # Lato con cui sono disegnate le griglie
+        self._ricezione_job = None # Timer che raccoglie le miniature decodificate
+
+        # Contabilità della memoria: miniature, presentazione, proiezione e cache dei PNG
+        self.budget_memoria = tk.IntVar(value=BUDGET_PREDEFINITO // MB) # MB scelti nel menu Strumenti
+        self.memoria = GestoreMemoria(BUDGET_PREDEFINITO)
+        # Priorità: prima i blocchi PNG, poi le tile della presentazione, per ultime le miniature della griglia
+        self.memoria.registra("Blocchi PNG", memoria_blocchi, riduci_blocchi, priorita=0)
+        self.memoria.registra("Miniature", lambda: self._cache_miniature.peso_totale, self._riduci_miniature, priorita=2)
+        self.memoria.registra("Livelli miniature", lambda: self.livelli_miniature.peso_totale, self.livelli_miniature.riduci, priorita=2)
+        self.memoria.registra("File di rete", self.lettore_remoto.memoria_occupata, self.lettore_remoto.libera_memoria, priorita=1)
+        self._memoria_job = None
+
+        # Griglia persistente: widget creati una volta e riusati tra ricerche e filtri
+        self._griglia = None # Canvas, scrollbar e frame interno (creati alla prima visualizzazione)
+        self._tile_griglia = {} # path -> elemento griglia {"frame", "chiave", "pos"}
+        # Griglia ad atlante: poche immagini composte al posto di un widget per miniatura (predefinita)
+        self.griglia_atlante = tk.BooleanVar(value=True)
+        self.atlante = None # Creato alla prima visualizzazione
+        self._indice_griglia = {} # path -> indice in self.immagini
+        self._verifica_sessione = None # (Future, cartella) del confronto tra sessione ripristinata e cartella
+
+    # --- Metodo per Aprire il Catalogo ---
+    def _apri_catalogo(self):
+        """Apre il catalogo SQLite in DATA_DIR. Se fallisce, l'app funziona comunque senza catalogo."""
+        try:
+            self.catalogo = CatalogoImmagini(os.path.join(self.DATA_DIR, self.CATALOGO_FILE))
+        except Exception as e:
+            print(f"WARN: Catalogo non disponibile, uso la scansione diretta delle cartelle: {e}")
+            self.catalogo = None
+
     # --- Metodo per Trovare il Percorso Base ---
     def _get_base_path(self):
         """Restituisce il percorso base dell'applicazione (utile per trovare risorse)."""
@@ -225,6 +352,18 @@ class GalleriaImmagini(ttk.Window):
                                 value="Griglia", command=self.cambia_visualizzazione)
         view_menu.add_radiobutton(label="Presentazione", variable=self.modalita_visualizzazione,
                                 value="Presentazione", command=self.cambia_visualizzazione)
+        view_menu.add_checkbutton(label="Griglia ad Atlante", variable=self.griglia_atlante,
+                                command=self._cambia_tipo_griglia)
+        view_menu.add_separator()
+        view_menu.add_command(label="Avvia/Ferma Proiezione", command=self.alterna_proiezione, accelerator="F5")
+        intervallo_menu = tk.Menu(view_menu, tearoff=0)
+        for secondi in (2, 3, 5, 10, 20):
+            intervallo_menu.add_radiobutton(label=f"{secondi} secondi", variable=self.intervallo_proiezione, value=secondi)
+        view_menu.add_cascade(label="Intervallo Proiezione", menu=intervallo_menu)
+        transizione_menu = tk.Menu(view_menu, tearoff=0)
+        for transizione in TRANSIZIONI:
+            transizione_menu.add_radiobutton(label=transizione, variable=self.transizione_proiezione, value=transizione)
+        view_menu.add_cascade(label="Transizione", menu=transizione_menu)
         menubar.add_cascade(label="Visualizza", menu=view_menu)
         self.view_menu = view_menu
 
@@ -237,9 +376,44 @@ class GalleriaImmagini(ttk.Window):
         # Comandi per nascondere/estrarre testo (inizialmente disabilitati)
         steg_menu.add_command(label="Nascondi Testo nell'Immagine...", command=self.nascondi_testo, state=tk.DISABLED)
         steg_menu.add_command(label="Estrai Testo dall'Immagine", command=self.estrai_testo, state=tk.DISABLED)
+        # Con una chiave i bit vengono sparsi su tutta l'immagine in un ordine che solo la chiave conosce
+        steg_menu.add_command(label="Chiave Segreta...", command=self.imposta_chiave_stegano)
+        steg_menu.add_separator()
+        profilo_menu = tk.Menu(steg_menu, tearoff=0)
+        for profilo in PROFILI_PNG:
+            profilo_menu.add_radiobutton(label=profilo, variable=self.profilo_png, value=profilo)
+        steg_menu.add_cascade(label="Profilo PNG", menu=profilo_menu)
+        # Analisi LSB: piani di bit e differenza con l'originale, mostrati in presentazione
+        analisi_menu = tk.Menu(steg_menu, tearoff=0)
+        for modo, etichetta in (("Immagine", "Immagine"), ("Piano di Bit", "Piano di Bit"), ("Differenza", "Differenza con l'Originale")):
+            analisi_menu.add_radiobutton(label=etichetta, variable=self.analisi_modo, value=modo, command=self._cambia_analisi)
+        analisi_menu.add_separator()
+        canale_menu = tk.Menu(analisi_menu, tearoff=0)
+        for canale in CANALI_ANALISI:
+            canale_menu.add_radiobutton(label=canale, variable=self.analisi_canale, value=canale, command=self._cambia_piano)
+        analisi_menu.add_cascade(label="Canale", menu=canale_menu)
+        bit_menu = tk.Menu(analisi_menu, tearoff=0)
+        for bit in range(8):
+            bit_menu.add_radiobutton(label=f"{bit}{' (LSB)' if bit == 0 else ' (MSB)' if bit == 7 else ''}",
+                                     variable=self.analisi_bit, value=bit, command=self._cambia_piano)
+        analisi_menu.add_cascade(label="Bit", menu=bit_menu)
+        steg_menu.add_cascade(label="Analisi LSB", menu=analisi_menu)
         menubar.add_cascade(label="Steganografia", menu=steg_menu)
         self.steg_menu = steg_menu
 
+        # --- Menu Strumenti ---
+        tools_menu = tk.Menu(menubar, tearoff=0)
+        tools_menu.add_command(label="Trova Duplicati...", command=self.trova_duplicati, state=tk.DISABLED)
+        tools_menu.add_command(label="Esporta Immagini...", command=self.esporta_immagini, state=tk.DISABLED)
+        tools_menu.add_separator()
+        budget_menu = tk.Menu(tools_menu, tearoff=0)
+        for budget in BUDGET_DISPONIBILI:
+            budget_menu.add_radiobutton(label=f"{budget // MB} MB", variable=self.budget_memoria, value=budget // MB,
+                                        command=self._imposta_budget_memoria)
+        tools_menu.add_cascade(label="Budget Memoria", menu=budget_menu)
+        menubar.add_cascade(label="Strumenti", menu=tools_menu)
+        self.tools_menu = tools_menu
+
         # Applica la menubar creata alla finestra principale
         self.config(menu=menubar)
 
@@ -301,6 +475,12 @@ class GalleriaImmagini(ttk.Window):
         self.btn_extract.pack(side=tk.LEFT, padx=2)
         ttk.Separator(toolbar, orient=tk.VERTICAL).pack(side=tk.LEFT, padx=5, fill=tk.Y)
 
+        # Cursore della dimensione delle miniature (le miniature vengono ricavate dai livelli in cache)
+        ttk.Label(toolbar, text="Miniature").pack(side=tk.LEFT, padx=(2, 0))
+        self.cursore_miniature = ttk.Scale(toolbar, from_=self.LATO_MINIATURE_MIN, to=self.LATO_MINIATURE_MAX, length=120,
+                                           value=self.lato_miniature.get(), command=self._on_cursore_miniature, bootstyle=INFO)
+        self.cursore_miniature.pack(side=tk.LEFT, padx=5)
+
         # --- Widget Ricerca (allineati a destra) ---
         self.btn_help = ttk.Button(toolbar, text="Aiuto", image=icon_help, compound=btn_compound, command=self.mostra_info, bootstyle=INFO)#Usa la stessa funzione del menu
         self.btn_help.pack(side=tk.RIGHT, padx=5)
@@ -311,6 +491,10 @@ class GalleriaImmagini(ttk.Window):
         self.btn_cerca.pack(side=tk.RIGHT) # Bottone a destra nel frame
         self.txt_ricerca = ttk.Entry(search_frame, width=20) # Campo di testo per la ricerca
         self.txt_ricerca.pack(side=tk.RIGHT, padx=5) # Campo testo a sinistra del bottone Cerca
+        # Interruttore per cercare in tutte le cartelle già aperte (catalogo)
+        self.chk_ovunque = ttk.Checkbutton(search_frame, text="Tutte le cartelle", variable=self.cerca_ovunque,
+                                           command=self.applica_filtri, bootstyle=('info', 'round-toggle'))
+        self.chk_ovunque.pack(side=tk.RIGHT, padx=5)
 
         return toolbar
 
@@ -331,6 +515,16 @@ class GalleriaImmagini(ttk.Window):
         canvas_bg = self.style.lookup('TFrame', 'background') # Usa colore sfondo del tema
         self.canvas_immagine = tk.Canvas(self.frame_presentazione, bg=canvas_bg, highlightthickness=0) # highlightthickness=0 toglie bordo
         self.canvas_immagine.pack(fill=tk.BOTH, expand=True) # Occupa tutto lo spazio del frame presentazione
+        # Disegno a tile con zoom (rotella), spostamento (trascinamento) e 1:1 (doppio clic)
+        self.visualizzatore = VisualizzatoreTile(self.canvas_immagine, self.decodificatore)
+        # I livelli arrivano dai processi di decodifica dopo apri(): errori e analisi vengono segnalati qui
+        self.visualizzatore.al_errore = self._errore_visualizzazione
+        self.visualizzatore.al_cambio_analisi = self._analisi_aggiornata
+        self._avvisa_errore_analisi = False # L'analisi in calcolo è stata scelta dal menu (un errore va mostrato)
+        # Proiezione automatica: disegna le diapositive sopra il visualizzatore
+        self.proiezione = Proiezione(self.canvas_immagine, self._on_diapositiva, self.decodificatore)
+        self.memoria.registra("Presentazione", self.visualizzatore.memoria_occupata, self.visualizzatore.libera_memoria, priorita=1)
+        self.memoria.registra("Proiezione", self.proiezione.memoria_occupata) # Limitata dall'anticipo
 
         return display_frame
 
@@ -354,6 +548,9 @@ class GalleriaImmagini(ttk.Window):
         self.area_dettagli = scrolledtext.ScrolledText(details_frame_outer, height=4, wrap=tk.WORD, # wrap=WORD manda a capo parole intere
                                                      padx=5, pady=5, state=tk.DISABLED, relief=tk.FLAT, borderwidth=1) # Inizialmente non modificabile
         self.area_dettagli.pack(fill=tk.BOTH, expand=True) # Occupa lo spazio rimanente nel pannello
+        self.area_dettagli.bind("<<Modified>>", self._on_testo_modificato) # Contatore dei byte mentre si digita
+        # Capacità dell'immagine corrente e byte rimasti (mostrata solo in modalità steganografia)
+        self.lbl_capacita = ttk.Label(details_frame_outer, text="", bootstyle=SECONDARY)
 
         return details_frame_outer
 
@@ -373,16 +570,27 @@ class GalleriaImmagini(ttk.Window):
                         command=self.applica_filtri, bootstyle=chk_style).pack(side=tk.LEFT, padx=3)
         ttk.Checkbutton(filter_frame, text="BMP", variable=self.filtro_bmp,
                         command=self.applica_filtri, bootstyle=chk_style).pack(side=tk.LEFT, padx=3)
+
+        # Ordinamento (allineato a destra): calcolato in memoria, senza rileggere i file
+        ttk.Checkbutton(filter_frame, text="Decrescente", variable=self.ordine_decrescente,
+                        command=self.applica_filtri, bootstyle=chk_style).pack(side=tk.RIGHT, padx=3)
+        combo_ordina = ttk.Combobox(filter_frame, textvariable=self.ordinamento, values=list(self.ORDINAMENTI),
+                                    state="readonly", width=12)
+        combo_ordina.pack(side=tk.RIGHT, padx=3)
+        combo_ordina.bind("<<ComboboxSelected>>", lambda e: self.applica_filtri())
+        ttk.Label(filter_frame, text="Ordina per:").pack(side=tk.RIGHT, padx=(10, 5))
         return filter_frame
 
     # --- Metodo per Associare Eventi ---
     def _bind_events(self):
         """Collega eventi dell'interfaccia (es. tasti, resize) a metodi specifici."""
-        # Evento <Configure> viene generato quando la finestra cambia dimensione
-        self.bind("<Configure>", self._handle_resize)
+        # Il ridimensionamento è gestito dai canvas stessi (griglia e visualizzatore a tile)
         # Tasti freccia sinistra/destra per navigare tra le immagini
         self.bind("<Left>", lambda e: self.mostra_precedente() if self.immagini else None)
         self.bind("<Right>", lambda e: self.mostra_successivo() if self.immagini else None)
+        # F5 avvia/ferma la proiezione, Esc la ferma
+        self.bind("<F5>", lambda e: self.alterna_proiezione())
+        self.bind("<Escape>", lambda e: self.ferma_proiezione() if self.proiezione.attiva else None)
         # Tasto Invio nel campo di ricerca esegue la ricerca
         self.txt_ricerca.bind("<Return>", lambda e: self.cerca_immagini())
         self.txt_ricerca.bind("<KP_Enter>", lambda e: self.cerca_immagini()) # Invio da tastierino numerico
@@ -393,16 +601,8 @@ class GalleriaImmagini(ttk.Window):
     def _initial_ui_update(self):
         """Imposta lo stato iniziale dell'interfaccia dopo la creazione dei widget."""
         self._toggle_stegano_mode() # Applica lo stato iniziale del pannello dettagli/stegano
-        self.cambia_visualizzazione() # Mostra la vista iniziale (Griglia vuota)
-
-    # --- Gestione Eventi ---
-    def _handle_resize(self, event=None):
-        """Chiamato quando la finestra viene ridimensionata."""
-        # Se siamo in modalità Presentazione e ci sono immagini, ridisegna l'immagine corrente
-        if self.modalita_visualizzazione.get() == "Presentazione" and self.immagini:
-            # Usa after per ritardare leggermente, assicurando che le dimensioni del canvas siano aggiornate
-            self.after(50, self.mostra_immagine_corrente)
-        # La griglia si ridimensiona automaticamente grazie al binding sul suo canvas interno
+        # Mostra subito la sessione precedente (se c'è), altrimenti la vista iniziale (Griglia vuota)
+        if not self._ripristina_sessione(): self.cambia_visualizzazione()
 
     # --- Logica Applicazione ---
 
@@ -414,6 +614,7 @@ class GalleriaImmagini(ttk.Window):
         self.frame_griglia.pack_forget()
 
         if current_mode == "Griglia":
+            self.ferma_proiezione(ridisegna=False) # La proiezione esiste solo in presentazione
             # Mostra il frame della griglia e la popola
             self.frame_griglia.pack(fill=tk.BOTH, expand=True)
             self.mostra_griglia()
@@ -456,12 +657,20 @@ class GalleriaImmagini(ttk.Window):
             indice_display = current_index + 1
             status_text = f"Img: {indice_display}/{num_immagini}"
             try: # Aggiunge nome file e cartella se possibile
-                nome_file = os.path.basename(self.immagini[current_index]["path"])
-                cartella = os.path.basename(self.directory_corrente) or self.directory_corrente
+                path_corrente = self.immagini[current_index]["path"]
+                nome_file = os.path.basename(path_corrente)
+                # La cartella è quella del file (con la ricerca globale può differire da quella aperta)
+                cartella_file = os.path.dirname(path_corrente) or self.directory_corrente
+                cartella = os.path.basename(cartella_file) or cartella_file
                 status_text += f" | {nome_file} | Cartella: {cartella}"
             except Exception: pass
         if in_stegano_mode:
             status_text += " | Modalità Steganografia ATTIVA" # Indica se la modalità è attiva
+            if self.chiave_stegano: status_text += " (con chiave)"
+        if self.proiezione.attiva:
+            status_text += " | Proiezione (F5 o Esc per fermare)"
+        elif is_valid_index and self.modalita_visualizzazione.get() == "Presentazione" and self.analisi_modo.get() != "Immagine":
+            status_text += f" | {self._descrizione_analisi()}"
         self.barra_stato.config(text=status_text)
 
         # --- Determina Stato Abilitazione Controlli ---
@@ -482,6 +691,7 @@ class GalleriaImmagini(ttk.Window):
         self.btn_salva.config(state=save_state)
         self.btn_cerca.config(state=search_state)
         self.txt_ricerca.config(state=search_state) # Abilita/disabilita anche campo ricerca
+        self.chk_ovunque.config(state=search_state if self.catalogo else tk.DISABLED) # Serve il catalogo
         self.btn_mostra_griglia.config(state=grid_btn_state)
         self.btn_hide.config(state=stegano_hide_state)
         self.btn_extract.config(state=stegano_extract_state)
@@ -495,6 +705,8 @@ class GalleriaImmagini(ttk.Window):
             self.steg_menu.entryconfig("Modalità Steganografia", state=stegano_general_state)
             self.steg_menu.entryconfig("Nascondi Testo nell'Immagine...", state=stegano_hide_state)
             self.steg_menu.entryconfig("Estrai Testo dall'Immagine", state=stegano_extract_state)
+            self.tools_menu.entryconfig("Trova Duplicati...", state=tk.NORMAL if num_immagini > 1 else tk.DISABLED)
+            self.tools_menu.entryconfig("Esporta Immagini...", state=tk.NORMAL if num_immagini else tk.DISABLED)
         except tk.TclError: pass # Ignora errori se il menu non è ancora completamente creato
 
         # --- Gestisci Stato Area Dettagli ---
@@ -510,6 +722,7 @@ class GalleriaImmagini(ttk.Window):
                 # Ricarica i dettagli immagine (sovrascrive eventuale testo stegano)
                 self.aggiorna_dettagli()
             except tk.TclError: pass
+        self._aggiorna_capacita() # La capacità dipende dall'immagine corrente
 
 
     def mostra_modalita_griglia(self):
@@ -519,17 +732,45 @@ class GalleriaImmagini(ttk.Window):
             self.cambia_visualizzazione()
 
     def mostra_griglia(self):
-        """Popola l'area della griglia con le miniature delle immagini caricate."""
-        # Pulisci la griglia precedente
-        for widget in self.frame_griglia.winfo_children():
-            widget.destroy()
+        """Popola l'area della griglia con le miniature delle immagini caricate.
+        Canvas, scrollbar e miniature vengono creati una sola volta e poi riusati:
+        a ogni aggiornamento si nascondono, mostrano o spostano solo le miniature necessarie.
+        """
+        if self._griglia is None: self._crea_griglia() # Prima visualizzazione
+        griglia = self._griglia
 
-        # Se non ci sono immagini, mostra un messaggio
+        # Se non ci sono immagini, mostra un messaggio (le miniature restano in memoria, nascoste)
         if not self.immagini:
-            ttk.Label(self.frame_griglia, text="Nessuna immagine da visualizzare.",
-                      bootstyle=DEFAULT, font="-size 12", justify=tk.CENTER).pack(pady=50, padx=20, expand=True)
+            griglia["canvas"].pack_forget(); griglia["scrollbar"].pack_forget()
+            self._organizza_griglia_items(griglia["frame"], 0) # Nasconde le miniature
+            if self.atlante: self.atlante.nascondi()
+            griglia["vuota"].pack(pady=50, padx=20, expand=True)
             return
+        griglia["vuota"].pack_forget()
+
+        if self.griglia_atlante.get():
+            # Griglia ad atlante: la griglia a widget resta nascosta (le sue miniature restano in cache)
+            griglia["canvas"].pack_forget(); griglia["scrollbar"].pack_forget()
+            self._organizza_griglia_items(griglia["frame"], 0)
+            if self.atlante is None: self._crea_atlante()
+            self.atlante.mostra()
+            self.atlante.imposta_voci((info.get("path"), info.get("chiave_miniatura"))
+                                      for info in self.immagini if info.get("path"))
+            return
+        if self.atlante: self.atlante.nascondi()
+
+        # Posiziona canvas e scrollbar (se erano nascosti)
+        if not griglia["canvas"].winfo_ismapped():
+            griglia["canvas"].pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+            griglia["scrollbar"].pack(side=tk.RIGHT, fill=tk.Y)
+
+        # Forza l'aggiornamento per ottenere le dimensioni e aggiorna la griglia
+        self.frame_griglia.update_idletasks()
+        initial_width = max(1, griglia["canvas"].winfo_width()) # Evita larghezza 0
+        self._organizza_griglia_items(griglia["frame"], initial_width)
 
+    def _crea_griglia(self):
+        """Crea (una sola volta) canvas scorrevole, scrollbar e messaggio 'vuoto' della griglia."""
         # --- Configurazione Canvas Scorrevole per la Griglia ---
         canvas_bg = self.style.lookup('TFrame', 'background')
         grid_canvas = tk.Canvas(self.frame_griglia, highlightthickness=0, bg=canvas_bg)
@@ -540,8 +781,11 @@ class GalleriaImmagini(ttk.Window):
         scrollable_frame.bind("<Configure>", lambda e: grid_canvas.configure(scrollregion=grid_canvas.bbox("all")))
         # Inserisce il frame scorrevole dentro il canvas
         canvas_window = grid_canvas.create_window((0, 0), window=scrollable_frame, anchor="nw")
-        # Collega la scrollbar al canvas
-        grid_canvas.configure(yscrollcommand=scrollbar.set)
+        # Collega la scrollbar al canvas (a ogni scorrimento si caricano le miniature entrate in vista)
+        def _on_scorrimento(*args):
+            scrollbar.set(*args)
+            self._pianifica_vista_griglia()
+        grid_canvas.configure(yscrollcommand=_on_scorrimento)
 
         # --- Funzione per Riorganizzare la Griglia al Resize ---
         def _on_canvas_configure(event):
@@ -549,96 +793,273 @@ class GalleriaImmagini(ttk.Window):
             canvas_width = event.width
             # Adatta la larghezza del frame interno a quella del canvas
             grid_canvas.itemconfig(canvas_window, width=canvas_width)
-            # Ridisponi le miniature in base alla nuova larghezza
+            # Ridisponi le miniature in base alla nuova larghezza (senza ricrearle)
             self._organizza_griglia_items(scrollable_frame, canvas_width)
         # Collega la funzione all'evento <Configure> del canvas
         grid_canvas.bind("<Configure>", _on_canvas_configure)
 
-        # Posiziona canvas e scrollbar
-        grid_canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-
-        # Forza l'aggiornamento per ottenere le dimensioni iniziali e popola la griglia
-        self.frame_griglia.update_idletasks()
-        initial_width = max(1, grid_canvas.winfo_width()) # Evita larghezza 0
-        self._organizza_griglia_items(scrollable_frame, initial_width)
+        # Messaggio mostrato al posto del canvas quando non ci sono immagini
+        vuota = ttk.Label(self.frame_griglia, text="Nessuna immagine da visualizzare.",
+                          bootstyle=DEFAULT, font="-size 12", justify=tk.CENTER)
+        self._griglia = {"canvas": grid_canvas, "scrollbar": scrollbar, "frame": scrollable_frame,
+                         "vuota": vuota, "colonne": 0}
+
+    @property
+    def dimensione_miniature(self):
+        """(lato, lato) delle miniature della griglia, scelto con il cursore della toolbar."""
+        return (self.lato_miniature.get(),) * 2
+
+    def _on_cursore_miniature(self, valore):
+        """Il cursore si sta muovendo: applica il nuovo lato solo quando si ferma per un attimo."""
+        self.lato_miniature.set(int(float(valore)))
+        if self._lato_miniature_job is not None: self.after_cancel(self._lato_miniature_job)
+        self._lato_miniature_job = self.after(self.RITARDO_MINIATURE, self._imposta_lato_miniature)
+
+    def _imposta_lato_miniature(self):
+        """Ridisegna la griglia con il lato scelto, ricavando le miniature dai livelli già decodificati."""
+        self._lato_miniature_job = None
+        lato = self.lato_miniature.get()
+        try: self.cursore_miniature.set(lato) # Allinea il cursore (es. dopo il ripristino della sessione)
+        except (AttributeError, tk.TclError): pass
+        if lato == self._lato_applicato: return
+        self._lato_applicato = lato
+        if self.atlante: self.atlante.imposta_dimensione(lato)
+        # La griglia a widget ha riquadri di dimensione fissa: le sue miniature vengono ricreate (i livelli restano)
+        if self._tile_griglia:
+            for path in list(self._tile_griglia): self._rimuovi_tile_griglia(path)
+            self._cache_miniature.svuota()
+            self._miniature_in_vista = set()
+        if self.modalita_visualizzazione.get() == "Griglia" and self._griglia is not None: self.mostra_griglia()
+
+    def _crea_atlante(self):
+        """Crea la griglia ad atlante con i colori del tema corrente."""
+        colori = {"sfondo": self.style.lookup('TFrame', 'background'), "bordo": self.style.colors.secondary,
+                  "testo": self.style.lookup('TLabel', 'foreground'), "errore": self.style.colors.danger}
+        # Il click restituisce l'indice della voce, che coincide con quello in self.immagini (voci senza path escluse)
+        def al_clic(indice):
+            voci = [i for i, info in enumerate(self.immagini) if info.get("path")]
+            if 0 <= indice < len(voci): self.seleziona_immagine_da_griglia(voci[indice])
+        self.atlante = GrigliaAtlante(self.frame_griglia, al_clic, self.dimensione_miniature, self.THUMBNAIL_PADDING,
+                                      colori, self.decodificatore, self.livelli_miniature)
+        self.memoria.registra("Atlante", self.atlante.memoria_occupata, self.atlante.libera_memoria, priorita=2)
+
+    def _cambia_tipo_griglia(self):
+        """Passa dalla griglia ad atlante a quella a widget (o viceversa) mantenendo le immagini mostrate."""
+        if self.modalita_visualizzazione.get() == "Griglia": self.mostra_griglia()
 
     def _organizza_griglia_items(self, container_frame, available_width):
-        """Dispone le miniature nel frame scorrevole in base alla larghezza disponibile."""
-        # Pulisci il frame prima di ridisporre
-        for widget in container_frame.winfo_children():
-            widget.destroy()
+        """Dispone le miniature nel frame scorrevole in base alla larghezza disponibile.
+        Calcola la differenza rispetto alla disposizione attuale: nasconde le miniature
+        escluse, crea solo quelle mancanti e sposta solo quelle che cambiano cella.
+        """
+        visibili = {img_info.get("path") for img_info in self.immagini}
+        # Nasconde (senza distruggerle) le miniature che non fanno più parte del risultato
+        for path, tile in self._tile_griglia.items():
+            if path not in visibili and tile["pos"] is not None:
+                tile["frame"].grid_remove(); tile["pos"] = None
 
+        self._griglia["ordine"] = [] # path nell'ordine delle celle
         if not self.immagini or available_width <= 1: return # Niente da fare
 
         # Calcola quante colonne entrano nella larghezza disponibile
-        grid_item_width = self.THUMBNAIL_SIZE[0] + self.THUMBNAIL_PADDING * 2
+        grid_item_width = self.lato_miniature.get() + self.THUMBNAIL_PADDING * 2
         cols = max(1, int(available_width // grid_item_width)) # Almeno 1 colonna
 
-        row, col = 0, 0 # Indici per la griglia
+        n = 0 # Numero di celle occupate finora
+        ordine = []
+        self._indice_griglia = {} # path -> indice in self.immagini (usato dal click)
         # Itera su tutte le immagini caricate
         for i, img_info in enumerate(self.immagini):
             path = img_info.get("path")
             if not path: continue # Salta se manca il percorso
-
-            try:
-                # --- Crea Elemento Griglia (Miniatura + Nome) ---
-                # Frame contenitore per una singola miniatura
-                item_frame = ttk.Frame(container_frame, borderwidth=1, relief=tk.SOLID, padding=self.THUMBNAIL_PADDING // 2, bootstyle=SECONDARY)
-
-                # Carica, ridimensiona (thumbnail) e visualizza l'immagine
-                img = Image.open(path)
-                img_copy = img.copy() # Lavora su una copia
-                img_copy.thumbnail(self.THUMBNAIL_SIZE, Image.Resampling.LANCZOS) # Ridimensiona mantenendo proporzioni
-                photo = ImageTk.PhotoImage(img_copy)
-                img.close() # Chiudi file originale
-
-                img_label = ttk.Label(item_frame, image=photo)
-                img_label.image = photo # Mantiene riferimento!
-                img_label.pack(pady=(0, 5))
-
-                # Mostra il nome del file (troncato se troppo lungo)
-                nome_file = os.path.basename(path)
-                display_name = (nome_file[:20] + '...') if len(nome_file) > 23 else nome_file
-                name_label = ttk.Label(item_frame, text=display_name, anchor=tk.CENTER, justify=tk.CENTER, wraplength=self.THUMBNAIL_SIZE[0])
-                name_label.pack(fill=tk.X)
-
-                # --- Associa Evento Click ---
-                # Funzione lambda cattura l'indice 'i' corrente per passarlo al metodo
-                click_handler = lambda e, idx=i: self.seleziona_immagine_da_griglia(idx)
-                # Rendi cliccabile il frame, l'immagine e il nome
-                item_frame.bind("<Button-1>", click_handler)
-                img_label.bind("<Button-1>", click_handler)
-                name_label.bind("<Button-1>", click_handler)
-
-                # Posiziona il frame nella griglia
-                item_frame.grid(row=row, column=col, padx=self.THUMBNAIL_PADDING // 2, pady=self.THUMBNAIL_PADDING // 2, sticky="nsew")
-
-                # Passa alla cella successiva
-                col += 1
-                if col >= cols: # Se abbiamo riempito la riga
-                    col = 0 # Torna alla prima colonna
-                    row += 1 # Passa alla riga successiva
-
-            except Exception as e: # Gestione errori caricamento miniatura
-                print(f"Errore Griglia: Caricamento miniatura {path}: {e}")
-                # Crea un placeholder di errore al posto della miniatura
-                error_frame = ttk.Frame(container_frame, bootstyle=DANGER, borderwidth=1, relief=tk.SOLID, padding=5,
-                                        width=self.THUMBNAIL_SIZE[0], height=self.THUMBNAIL_SIZE[1])
-                error_frame.grid(row=row, column=col, padx=self.THUMBNAIL_PADDING // 2, pady=self.THUMBNAIL_PADDING // 2, sticky="nsew")
-                error_frame.grid_propagate(False) # Impedisce al frame di restringersi
-                ttk.Label(error_frame, text=f"ERRORE\n{os.path.basename(path)}", bootstyle=(INVERSE, DANGER),
-                          wraplength=self.THUMBNAIL_SIZE[0] - 10, justify=tk.CENTER, anchor=tk.CENTER).pack(expand=True, fill=tk.BOTH)
-                # Passa comunque alla cella successiva
-                col += 1;
-                if col >= cols: col = 0; row += 1
+            self._indice_griglia[path] = i
+
+            # Riusa la miniatura esistente; la ricrea solo se manca o se il file è cambiato
+            tile = self._tile_griglia.get(path)
+            if tile is None or tile["chiave"] != img_info.get("chiave_miniatura"):
+                self._rimuovi_tile_griglia(path)
+                tile = self._crea_tile_griglia(container_frame, img_info)
+                self._tile_griglia[path] = tile
+
+            # Sposta la miniatura solo se la sua cella è cambiata
+            pos = (n // cols, n % cols)
+            if tile["pos"] != pos:
+                tile["frame"].grid(row=pos[0], column=pos[1], padx=self.THUMBNAIL_PADDING // 2, pady=self.THUMBNAIL_PADDING // 2, sticky="nsew")
+                tile["pos"] = pos
+            ordine.append(path)
+            n += 1
 
         # Configura le colonne del container_frame per espandersi uniformemente
         for c in range(cols):
             container_frame.columnconfigure(c, weight=1, uniform="grid_col")
+        # Le colonne in più della disposizione precedente non devono occupare spazio
+        for c in range(cols, self._griglia["colonne"]):
+            container_frame.columnconfigure(c, weight=0, uniform="")
+        self._griglia["colonne"] = cols
+        self._griglia["ordine"] = ordine
 
         # Aggiorna il layout per ricalcolare le dimensioni (necessario per scrollregion)
         container_frame.update_idletasks()
+        self._pianifica_vista_griglia() # Carica le miniature delle righe visibili
+
+    def _crea_tile_griglia(self, container_frame, img_info):
+        """Crea l'elemento griglia (riquadro miniatura + nome) di un'immagine e lo restituisce come dizionario.
+        La miniatura viene decodificata solo quando l'elemento entra in vista (vedi _aggiorna_vista_griglia).
+        """
+        path = img_info.get("path")
+        # Funzione lambda cattura il path: l'indice viene calcolato al momento del click
+        click_handler = lambda e, p=path: self.seleziona_immagine_da_griglia(self._indice_griglia.get(p, -1))
+        # --- Crea Elemento Griglia (Miniatura + Nome) ---
+        # Frame contenitore per una singola miniatura
+        item_frame = ttk.Frame(container_frame, borderwidth=1, relief=tk.SOLID, padding=self.THUMBNAIL_PADDING // 2, bootstyle=SECONDARY)
+        # Riquadro di dimensione fissa: la griglia non cambia forma quando le miniature vengono caricate o scaricate
+        riquadro = ttk.Frame(item_frame, width=self.lato_miniature.get(), height=self.lato_miniature.get())
+        riquadro.pack_propagate(False)
+        riquadro.pack(pady=(0, 5))
+        img_label = ttk.Label(riquadro, anchor=tk.CENTER)
+        img_label.image = None # Riferimento alla PhotoImage mostrata
+        img_label.pack(expand=True, fill=tk.BOTH)
+
+        # Mostra il nome del file (troncato se troppo lungo)
+        nome_file = os.path.basename(path)
+        display_name = (nome_file[:20] + '...') if len(nome_file) > 23 else nome_file
+        name_label = ttk.Label(item_frame, text=display_name, anchor=tk.CENTER, justify=tk.CENTER, wraplength=self.lato_miniature.get())
+        name_label.pack(fill=tk.X)
+
+        # --- Associa Evento Click ---
+        # Rendi cliccabile il frame, l'immagine e il nome
+        for widget in (item_frame, riquadro, img_label, name_label):
+            widget.bind("<Button-1>", click_handler)
+
+        tile = {"frame": item_frame, "chiave": img_info.get("chiave_miniatura"), "pos": None,
+                "path": path, "etichetta": img_label, "caricata": False}
+        # Riusa subito la miniatura già pronta se il file non è cambiato
+        if (tile["chiave"] or path) in self._cache_miniature: self._carica_miniatura(tile)
+        return tile
+
+    def _carica_miniatura(self, tile):
+        """Mostra la miniatura di un elemento griglia. Se non è in cache la fa decodificare da un
+        processo separato (arriverà in _ricevi_miniature) o, se non è possibile, la decodifica qui.
+        """
+        path = tile["path"]
+        chiave = tile["chiave"] or path
+        valore = self._cache_miniature.get(chiave)
+        if valore is not None:
+            self._mostra_miniatura(tile, valore); return
+        if chiave in self._miniature_in_arrivo: return # Già richiesta
+        # Ricavata da un livello già decodificato (se è solo un'anteprima ingrandita, si decodifica quello giusto)
+        if self._mostra_da_livelli(tile, chiave): return
+        livello = livello_per(self.lato_miniature.get())
+        try:
+            futuro = self.decodificatore.decodifica(path, ("miniatura", (livello, livello)))
+        except ErroreDecodifica:
+            futuro = None # Processi non disponibili
+        if futuro is not None:
+            self._miniature_in_arrivo[chiave] = (futuro, path, livello)
+            if self._ricezione_job is None:
+                self._ricezione_job = self.after(self.INTERVALLO_MINIATURE, self._ricevi_miniature)
+            return
+        try:
+            # Decodifica ridotta (senza passare dall'immagine a piena risoluzione)
+            self.livelli_miniature.inserisci(chiave, livello, crea_miniatura(self.decodificatore.apri(path), (livello, livello)))
+        except Exception as e: # Gestione errori caricamento miniatura
+            self._errore_miniatura(tile, e); return
+        self._mostra_da_livelli(tile, chiave)
+
+    def _mostra_da_livelli(self, tile, chiave):
+        """Mostra la miniatura ricavata dai livelli in cache. True se è quella definitiva (e va in cache)."""
+        img, esatta = self.livelli_miniature.miniatura(chiave, self.lato_miniature.get())
+        if img is None: return False
+        valore = (ImageTk.PhotoImage(img), tile["path"])
+        if esatta: self._cache_miniature.inserisci(chiave, valore)
+        self._mostra_miniatura(tile, valore)
+        tile["caricata"] = esatta # Un'anteprima ingrandita verrà sostituita
+        return esatta
+
+    def _ricevi_miniature(self):
+        """Mostra le miniature arrivate dai processi di decodifica; si ripete finché ce ne sono in arrivo."""
+        self._ricezione_job = None
+        for chiave, (futuro, path, livello) in list(self._miniature_in_arrivo.items()):
+            if not futuro.done(): continue
+            del self._miniature_in_arrivo[chiave]
+            if futuro.cancelled(): continue
+            tile = self._tile_griglia.get(path)
+            if tile is not None and (tile["chiave"] or path) != chiave: tile = None # File cambiato nel frattempo
+            try:
+                self.livelli_miniature.inserisci(chiave, livello, futuro.result())
+            except Exception as e: # File corrotto, timeout o processo terminato
+                if tile is not None: self._errore_miniatura(tile, e)
+                continue
+            # Se nel frattempo le miniature sono state ingrandite oltre il livello arrivato, si chiede il successivo
+            if tile is not None: self._carica_miniatura(tile)
+        if self._miniature_in_arrivo:
+            self._ricezione_job = self.after(self.INTERVALLO_MINIATURE, self._ricevi_miniature)
+
+    def _mostra_miniatura(self, tile, valore):
+        tile["etichetta"].configure(image=valore[0])
+        tile["etichetta"].image = valore[0] # Mantiene riferimento!
+        tile["caricata"] = True
+
+    def _errore_miniatura(self, tile, errore):
+        """Placeholder di errore al posto della miniatura."""
+        print(f"Errore Griglia: Caricamento miniatura {tile['path']}: {errore}")
+        tile["etichetta"].configure(text=f"ERRORE\n{os.path.basename(tile['path'])}", bootstyle=(INVERSE, DANGER),
+                                    wraplength=self.lato_miniature.get() - 10, justify=tk.CENTER)
+        tile["caricata"] = True # Non riprova a ogni scorrimento
+
+    def _scarica_miniatura(self, chiave, valore):
+        """La cache ha scartato una miniatura: l'elemento resta nella griglia, senza immagine, finché non torna in vista."""
+        tile = self._tile_griglia.get(valore[1])
+        if tile and tile["etichetta"].image is valore[0]:
+            tile["etichetta"].configure(image="")
+            tile["etichetta"].image = None # Ultimo riferimento: Tk libera i pixel
+            tile["caricata"] = False
+
+    def _riduci_miniature(self, limite):
+        """Scarica le miniature viste meno di recente finché non si scende entro 'limite' byte (mai quelle in vista)."""
+        in_vista = 0
+        for chiave in self._miniature_in_vista:
+            valore = self._cache_miniature.get(chiave) # Diventano le più recenti: scartate per ultime
+            if valore is not None: in_vista += byte_photo(valore[0])
+        self._cache_miniature.riduci(max(limite, in_vista))
+
+    def _pianifica_vista_griglia(self):
+        """Aggiorna le miniature in vista una sola volta, quando gli eventi di scorrimento sono finiti."""
+        if self._vista_griglia_job is None:
+            self._vista_griglia_job = self.after_idle(self._aggiorna_vista_griglia)
+
+    def _aggiorna_vista_griglia(self):
+        """Carica le miniature delle righe visibili (più una riga di margine) e le segna come usate di recente."""
+        self._vista_griglia_job = None
+        griglia = self._griglia
+        if griglia is None or not griglia.get("ordine") or self.modalita_visualizzazione.get() != "Griglia": return
+        canvas, frame, cols = griglia["canvas"], griglia["frame"], max(1, griglia["colonne"])
+        # Righe della griglia sotto il bordo superiore e inferiore della parte visibile del canvas
+        riga_alta = frame.grid_location(0, int(canvas.canvasy(0)))[1]
+        riga_bassa = frame.grid_location(0, int(canvas.canvasy(canvas.winfo_height())))[1]
+        riga_alta = max(0, riga_alta - 1)
+        riga_bassa = max(riga_alta, riga_bassa) + 1
+        in_vista = set()
+        for path in griglia["ordine"][riga_alta * cols:(riga_bassa + 1) * cols]:
+            tile = self._tile_griglia.get(path)
+            if tile is None: continue
+            chiave = tile["chiave"] or path
+            if tile["caricata"]: self._cache_miniature.get(chiave) # Usata di recente
+            else: self._carica_miniatura(tile)
+            in_vista.add(chiave)
+        self._miniature_in_vista = in_vista
+        # Cartelle di rete: legge in anticipo i file della schermata successiva (scorrimento verso il basso)
+        prossime = griglia["ordine"][(riga_bassa + 1) * cols:(2 * riga_bassa - riga_alta + 2) * cols]
+        self.decodificatore.precarica([p for p in prossime if p in self._tile_griglia and not self._tile_griglia[p]["caricata"]])
+        # Le richieste per righe già uscite di vista (scorrimento veloce) non servono più
+        for chiave in [c for c in self._miniature_in_arrivo if c not in in_vista]:
+            if self._miniature_in_arrivo[chiave][0].cancel(): del self._miniature_in_arrivo[chiave]
+        self.memoria.applica()
+
+    def _rimuovi_tile_griglia(self, path):
+        """Distrugge la miniatura di un file (es. file cancellato o modificato)."""
+        tile = self._tile_griglia.pop(path, None)
+        if tile: tile["frame"].destroy()
 
     def seleziona_immagine_da_griglia(self, indice):
         """Chiamato quando si clicca su una miniatura nella griglia."""
@@ -653,19 +1074,20 @@ class GalleriaImmagini(ttk.Window):
     def mostra_immagine_corrente(self):
         """Visualizza l'immagine attualmente selezionata nell'area di presentazione."""
         # Pulisci il canvas da disegni precedenti
-        self.canvas_immagine.delete("all")
-        self.current_photo_image = None # Rilascia riferimento vecchia immagine
+        self.canvas_immagine.delete("messaggio")
 
         current_index = self.indice_corrente.get()
         # Se non ci sono immagini o l'indice non è valido
         if not self.immagini or not (0 <= current_index < len(self.immagini)):
+            self.visualizzatore.chiudi() # Rilascia l'immagine precedente
+            self.proiezione.ferma()
             # Mostra un messaggio sul canvas vuoto
             self.canvas_immagine.update_idletasks() # Assicura dimensioni canvas
             cw, ch = self.canvas_immagine.winfo_width(), self.canvas_immagine.winfo_height()
             if cw > 1 and ch > 1: # Disegna solo se il canvas è visibile
                  self.canvas_immagine.create_text(cw/2, ch/2, text="Nessuna immagine selezionata",
                                                   fill=self.style.lookup('TLabel', 'foreground'), # Colore testo del tema
-                                                  font="-size 14", anchor=tk.CENTER)
+                                                  font="-size 14", anchor=tk.CENTER, tags="messaggio")
             self.aggiorna_dettagli() # Aggiorna comunque i dettagli (mostrerà vuoto)
             self.aggiorna_stato() # Aggiorna stato bottoni etc.
             return
@@ -677,10 +1099,17 @@ class GalleriaImmagini(ttk.Window):
              messagebox.showerror("Errore", "Percorso immagine mancante.")
              self.aggiorna_dettagli(); self.aggiorna_stato(); return
 
-        try:
-            # Apre l'immagine con PIL
-            img = Image.open(path)
+        if self.proiezione.attiva:
+            # Durante la proiezione (es. frecce) si salta alla diapositiva scelta, già in preparazione
+            percorsi = [img.get("path") for img in self.immagini]
+            if percorsi != self.proiezione.pipeline.percorsi: # Lista cambiata (ricerca, filtri, cartella)
+                self.proiezione.avvia(percorsi, current_index, self.intervallo_proiezione.get(), self.transizione_proiezione.get())
+            else:
+                self.proiezione.vai_a(current_index)
+            self.aggiorna_dettagli(); self.aggiorna_stato()
+            return
 
+        try:
             # Ottieni dimensioni canvas (dopo update_idletasks per sicurezza)
             self.canvas_immagine.update_idletasks()
             canvas_width = self.canvas_immagine.winfo_width()
@@ -690,25 +1119,12 @@ class GalleriaImmagini(ttk.Window):
             if canvas_width <= 1 or canvas_height <= 1:
                 self.after(100, self.mostra_immagine_corrente); return
 
-            # --- Ridimensiona Immagine per Adattarla al Canvas ---
-            img_width, img_height = img.size
-            # Calcola il rapporto di ridimensionamento per far stare l'immagine nel canvas
-            ratio = min(canvas_width / img_width, canvas_height / img_height)
-            # Calcola nuove dimensioni (assicurandosi che siano almeno 1 pixel)
-            new_width = max(1, int(img_width * ratio))
-            new_height = max(1, int(img_height * ratio))
-
-            # Ridimensiona l'immagine
-            img_resized = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            # Converti in formato Tkinter
-            self.current_photo_image = ImageTk.PhotoImage(img_resized)
-            img.close() # Chiudi file originale
-
-            # --- Posiziona Immagine al Centro del Canvas ---
-            x = (canvas_width - new_width) // 2
-            y = (canvas_height - new_height) // 2
-            # Disegna l'immagine sul canvas
-            self.canvas_immagine.create_image(x, y, anchor=tk.NW, image=self.current_photo_image)
+            # Mostra l'immagine adattata al canvas: vengono preparate solo le tile visibili
+            self._avvisa_errore_analisi = False
+            self.visualizzatore.apri(path, self._analisi_richiesta(path))
+            # Cartelle di rete: le immagini vicine vengono lette in anticipo (frecce sinistra e destra)
+            self.decodificatore.precarica([self.immagini[i].get("path") for i in (current_index + 1, current_index - 1, current_index + 2)
+                                           if 0 <= i < len(self.immagini)])
 
             # Aggiorna dettagli e stato DOPO aver mostrato l'immagine
             self.aggiorna_dettagli()
@@ -722,6 +1138,72 @@ class GalleriaImmagini(ttk.Window):
             traceback.print_exc() # Stampa errore dettagliato in console
             self.aggiorna_dettagli(); self.aggiorna_stato()
 
+    # --- Analisi LSB ---
+
+    def _analisi_richiesta(self, path):
+        """Analisi da mostrare per 'path' secondo il menu Analisi LSB (None = l'immagine)."""
+        modo = self.analisi_modo.get()
+        if modo == "Piano di Bit": return ("piano", self.analisi_canale.get(), self.analisi_bit.get())
+        if modo == "Differenza":
+            coppia = trova_originale(path, self.ALL_SUPPORTED_EXT_FLAT)
+            if coppia is None: return None
+            originale, con_testo = coppia
+            return ("differenza", originale if path == con_testo else con_testo)
+        return None
+
+    def _descrizione_analisi(self):
+        """Testo per la barra di stato sull'analisi mostrata."""
+        analisi = self.visualizzatore.analisi
+        if self.visualizzatore.errore_analisi: return f"Analisi non disponibile: {self.visualizzatore.errore_analisi}"
+        if analisi is None:
+            return f"Nessun originale o file '{SUFFISSO_TESTO}.png' da confrontare"
+        if self.visualizzatore.analisi_in_calcolo: return "Calcolo dell'analisi..."
+        if analisi[0] == "piano":
+            return f"Piano di bit {analisi[2]} del canale {analisi[1]} (bianco = 1)"
+        cambiati = self.visualizzatore.pixel_cambiati or 0
+        totale = max(1, self.visualizzatore.larghezza * self.visualizzatore.altezza)
+        return f"Differenza con {os.path.basename(analisi[1])}: {cambiati} pixel cambiati ({100 * cambiati / totale:.2f}%)"
+
+    def _cambia_piano(self):
+        """Scelto un canale o un bit: passa (se serve) alla vista dei piani di bit."""
+        self.analisi_modo.set("Piano di Bit")
+        self._cambia_analisi()
+
+    def _cambia_analisi(self):
+        """Applica all'immagine in presentazione l'analisi scelta nel menu (i risultati restano in cache)."""
+        current_index = self.indice_corrente.get()
+        if not (0 <= current_index < len(self.immagini)) or self.proiezione.attiva: return
+        path = self.immagini[current_index].get("path")
+        analisi = self._analisi_richiesta(path)
+        if self.analisi_modo.get() == "Differenza" and analisi is None:
+            messagebox.showwarning("Analisi LSB", f"Nessun file da confrontare con:\n{os.path.basename(path)}\n\n"
+                                   f"Serve l'originale e il file '{SUFFISSO_TESTO}.png' nella stessa cartella.")
+            self.analisi_modo.set("Immagine"); analisi = None
+        if self.modalita_visualizzazione.get() != "Presentazione":
+            self.modalita_visualizzazione.set("Presentazione") # L'analisi si vede in presentazione
+            self.cambia_visualizzazione(); return
+        self._avvisa_errore_analisi = analisi is not None
+        self.visualizzatore.imposta_analisi(analisi) # Gli errori arrivano ad _analisi_aggiornata
+        self.aggiorna_stato()
+
+    def _analisi_aggiornata(self):
+        """Il visualizzatore ha calcolato l'analisi o ha scoperto che non si può calcolare."""
+        errore = self.visualizzatore.errore_analisi
+        if errore and self._avvisa_errore_analisi: # Es. originale e file con testo di dimensioni diverse
+            self._avvisa_errore_analisi = False
+            messagebox.showerror("Errore Analisi", f"Impossibile calcolare l'analisi:\n{errore}")
+            self.analisi_modo.set("Immagine")
+            self.visualizzatore.errore_analisi = None
+        elif not self.visualizzatore.analisi_in_calcolo:
+            self._avvisa_errore_analisi = False
+        self.aggiorna_stato()
+
+    def _errore_visualizzazione(self, path, errore):
+        """Un livello dell'immagine in presentazione non si è potuto decodificare."""
+        if self.proiezione.attiva: return # Le diapositive hanno la loro gestione degli errori
+        messagebox.showerror("Errore Visualizzazione", f"Impossibile visualizzare l'immagine:\n{path}\n\nErrore: {errore}")
+        self.aggiorna_stato()
+
     def aggiorna_dettagli(self):
         """Recupera e visualizza i dettagli dell'immagine corrente SE non in modalità stegano."""
         # Se siamo in modalità steganografia, l'area dettagli serve per input/output testo, non mostrare dettagli immagine
@@ -749,16 +1231,21 @@ class GalleriaImmagini(ttk.Window):
         try:
             # Prova a leggere dimensioni e formato con PIL (apre solo header se possibile)
             img_width, img_height, img_format = "N/D", "N/D", "N/D" # Valori default
-            try:
-                 with Image.open(path) as img:
-                     img_width, img_height = img.size; img_format = img.format or "N/D"
-            except Exception as e: print(f"WARN: Impossibile leggere dettagli PIL per {path}: {e}") # Avviso non bloccante
+            if img_info.get("larghezza"):
+                # Metadati già presenti nel catalogo: nessuna lettura dal disco
+                img_width, img_height = img_info["larghezza"], img_info["altezza"]
+                img_format = img_info.get("formato") or "N/D"
+            else:
+                try:
+                     with Image.open(self.decodificatore.apri(path)) as img:
+                         img_width, img_height = img.size; img_format = img.format or "N/D"
+                except Exception as e: print(f"WARN: Impossibile leggere dettagli PIL per {path}: {e}") # Avviso non bloccante
 
-            # Ottieni nome file e dimensione da OS
+            # Ottieni nome file e dimensione (dal catalogo o dal sistema operativo)
             nome_file = os.path.basename(path)
             dimensione_bytes = 0; dim_str = "N/D"
             try:
-                 dimensione_bytes = os.path.getsize(path)
+                 dimensione_bytes = img_info.get("dimensione") or os.path.getsize(path)
                  dim_kb = dimensione_bytes / 1024; dim_mb = dim_kb / 1024
                  if dim_mb >= 1: dim_str = f"{dim_mb:.1f} MB" # Mostra in MB se >= 1
                  elif dimensione_bytes > 0: dim_str = f"{dim_kb:.1f} KB" # Altrimenti in KB
@@ -813,6 +1300,45 @@ class GalleriaImmagini(ttk.Window):
                 self.aggiorna_dettagli()
             self.aggiorna_stato()
 
+    # --- Proiezione Automatica ---
+
+    def alterna_proiezione(self):
+        """Avvia la proiezione dall'immagine corrente, o la ferma se è già attiva."""
+        if self.proiezione.attiva:
+            self.ferma_proiezione(); return
+        if not self.immagini:
+            messagebox.showinfo("Proiezione", "Apri una cartella con delle immagini per avviare la proiezione.")
+            return
+        if self.modalita_visualizzazione.get() != "Presentazione":
+            self.modalita_visualizzazione.set("Presentazione")
+            self.cambia_visualizzazione()
+        # Attende che il canvas della presentazione abbia le sue dimensioni definitive
+        self.after(100, self._avvia_proiezione)
+
+    def _avvia_proiezione(self):
+        if not self.immagini: return
+        indice = max(0, self.indice_corrente.get())
+        self.visualizzatore.chiudi() # Libera l'immagine interattiva (e ferma eventuali GIF animate)
+        self.proiezione.avvia([img.get("path") for img in self.immagini], indice,
+                              self.intervallo_proiezione.get(), self.transizione_proiezione.get())
+        self.aggiorna_stato()
+
+    def ferma_proiezione(self, ridisegna=True):
+        """Ferma la proiezione e torna alla presentazione interattiva (zoom, spostamento)."""
+        if not self.proiezione.attiva: return
+        self.proiezione.ferma()
+        if ridisegna and self.modalita_visualizzazione.get() == "Presentazione":
+            self.mostra_immagine_corrente()
+        else:
+            self.aggiorna_stato()
+
+    def _on_diapositiva(self, indice):
+        """Chiamata dalla proiezione a ogni nuova diapositiva: aggiorna selezione, dettagli e stato."""
+        if 0 <= indice < len(self.immagini):
+            self.indice_corrente.set(indice)
+            self.aggiorna_dettagli()
+            self.aggiorna_stato()
+
     # --- Operazioni File ---
 
     def apri_immagine(self):
@@ -827,6 +1353,8 @@ class GalleriaImmagini(ttk.Window):
 
             # Aggiorna stato applicazione
             self.directory_corrente = os.path.dirname(file_path) # Memorizza cartella
+            self.indice_metadati = None # La cartella verrà letta solo se si cerca/filtra
+            self._ferma_osservatore() # Nessuna cartella da osservare finché non viene letta
             self.immagini = [{"path": file_path}] # Lista con solo questa immagine
             self.indice_corrente.set(0) # Seleziona la prima (e unica) immagine
             self.txt_ricerca.delete(0, tk.END) # Pulisci campo ricerca
@@ -860,57 +1388,254 @@ class GalleriaImmagini(ttk.Window):
         return estensioni
 
     def carica_immagini_da_cartella(self, directory, termine_ricerca=""):
-        """Scansiona una cartella, filtra i file per estensione e termine di ricerca, e aggiorna la lista immagini."""
-        self.immagini = [] # Pulisci lista precedente
+        """Scansiona una cartella (aggiornando il catalogo), ne memorizza i metadati e applica filtri e ricerca."""
+        try:
+            # Legge una sola volta le voci della cartella: filtri, ricerca e ordinamenti lavorano poi in memoria
+            self.indice_metadati = IndiceMetadati(self._leggi_voci_cartella(directory))
+        except Exception as e: # Errore durante lettura cartella
+            messagebox.showerror("Errore Caricamento Cartella", f"Impossibile leggere la cartella:\n{directory}\n\nErrore: {e}")
+            traceback.print_exc()
+            self.immagini = []; self.indice_metadati = None
+            self.indice_corrente.set(-1); self.cambia_visualizzazione() # Resetta stato
+            return
+        # Tiene in cache solo le miniature (ed elementi griglia) dei file di questa cartella
+        chiavi = {v.get("chiave_miniatura") for v in self.indice_metadati.voci}
+        self._cache_miniature.rimuovi_se(lambda chiave: chiave not in chiavi)
+        self.livelli_miniature.rimuovi_se(lambda chiave: chiave not in chiavi)
+        percorsi = {v["path"] for v in self.indice_metadati.voci}
+        for path in [p for p in self._tile_griglia if p not in percorsi]:
+            self._rimuovi_tile_griglia(path)
+        # Osserva la cartella per applicare in seguito solo le modifiche
+        if self.osservatore is None or self.osservatore.cartella != os.path.abspath(directory):
+            self._avvia_osservatore(directory)
+        self._applica_query(termine_ricerca)
+
+    def _leggi_voci_cartella(self, directory):
+        """Restituisce i metadati di tutte le immagini supportate nella cartella."""
+        if self.catalogo:
+            # Sincronizza il catalogo con la cartella (rilegge solo file nuovi o modificati)
+            self.catalogo.indicizza_cartella(directory, self.ALL_SUPPORTED_EXT_FLAT)
+            self._scarta_indice_catalogo() # Il catalogo può essere cambiato: verrà riletto alla prossima ricerca ovunque
+            return self.catalogo.cerca("", directory)
+        # Senza catalogo: scansione diretta della cartella (legge l'header di ogni file)
+        voci = []
+        for filename in os.listdir(directory):
+            file_path = os.path.join(directory, filename)
+            # Controlla se è un file (e non una sottocartella) con estensione supportata
+            if os.path.isfile(file_path) and filename.lower().endswith(tuple(self.ALL_SUPPORTED_EXT_FLAT)):
+                voci.append(leggi_metadati(file_path))
+        return voci
+
+    def _applica_query(self, termine_ricerca="", avvisa=True):
+        """Filtra e ordina in memoria le immagini della cartella corrente (nessuna lettura da disco).
+        Con avvisa=False non mostra popup (usato per gli aggiornamenti automatici della cartella).
+        """
+        # Se la cartella non è ancora stata letta (es. dopo 'Apri Immagine'), caricala ora
+        if self.indice_metadati is None:
+            if self.directory_corrente: self.carica_immagini_da_cartella(self.directory_corrente, termine_ricerca)
+            return
+
         active_extensions = self._get_active_extensions() # Ottieni estensioni dai filtri
-        termine_ricerca = termine_ricerca.strip().lower() # Pulisci e metti in minuscolo il termine di ricerca
+        termine_ricerca = termine_ricerca.strip() # Pulisci il termine di ricerca
+        try:
+            query = analizza_query(termine_ricerca)
+        except ErroreQuery as e:
+            # Query incompleta o errata (spesso mentre si sta ancora scrivendo): restano i risultati precedenti
+            self.barra_stato.config(text=f"Query non valida: {e}")
+            return
+
+        indice = self.indice_metadati
+        if self.catalogo and self.cerca_ovunque.get() and not query.vuota:
+            # "Tutte le cartelle": stessa ricerca in memoria (tollerante agli errori) su tutto il catalogo
+            indice = self._indice_tutte_le_cartelle()
+            if indice is None: # Indice ancora in costruzione in background
+                if len(query.testo) < 3: # L'indice FTS5 a trigrammi non serve: si aspetta l'indice completo
+                    self.barra_stato.config(text="Lettura del catalogo in corso...")
+                    return
+                # Intanto i nomi che contengono esattamente il testo, dall'indice FTS5 del catalogo
+                indice = IndiceMetadati(self.catalogo.cerca(query.testo, None, active_extensions))
+
+        # Ricorda l'immagine selezionata per mantenerla dopo il filtro/ordinamento
+        current_index = self.indice_corrente.get()
+        path_selezionato = self.immagini[current_index].get("path") if 0 <= current_index < len(self.immagini) else None
+        self.immagini = [] # Pulisci lista precedente
 
         # Se nessun filtro è attivo, non caricare nulla e avvisa
         if not active_extensions:
             messagebox.showwarning("Nessun Filtro Attivo", "Selezionare almeno un formato di immagine nei filtri.")
             self.indice_corrente.set(-1); self.cambia_visualizzazione(); return
 
-        immagini_trovate = []
-        try:
-            # Ordina i file alfabeticamente (case-insensitive)
-            files_in_dir = sorted(os.listdir(directory), key=str.lower)
-            # Itera su tutti i file nella cartella
-            for filename in files_in_dir:
-                file_path = os.path.join(directory, filename)
-                # Controlla se è un file (e non una sottocartella)
-                if os.path.isfile(file_path):
-                    name_lower = filename.lower()
-                    # Verifica se l'estensione è tra quelle attive
-                    has_valid_ext = any(name_lower.endswith(ext) for ext in active_extensions)
-                    # Verifica se il nome file contiene il termine di ricerca (se presente)
-                    matches_search = not termine_ricerca or termine_ricerca in name_lower
-                    # Se entrambe le condizioni sono vere, aggiungi alla lista
-                    if has_valid_ext and matches_search:
-                        immagini_trovate.append({"path": file_path})
-
-            # Aggiorna la lista principale e l'indice
-            self.immagini = immagini_trovate
-            if self.immagini:
-                self.indice_corrente.set(0) # Seleziona la prima immagine trovata
-                # Aggiorna barra stato con numero immagini
-                status_msg = f"Caricate {len(self.immagini)} immagini"
-                if termine_ricerca: status_msg += f" per '{termine_ricerca}'"
-                self.barra_stato.config(text=status_msg)
-            else:
-                # Se non trova immagini, resetta indice e mostra messaggio
-                self.indice_corrente.set(-1)
-                info_msg = f"Nessuna immagine trovata{' per ' + termine_ricerca if termine_ricerca else ''} con i filtri attivi."
-                # Mostra popup solo se non era una ricerca (altrimenti è ovvio che non ha trovato)
-                if not termine_ricerca: messagebox.showinfo("Nessuna Immagine", f"{info_msg}\nCartella: {directory}")
-                self.barra_stato.config(text="Nessuna immagine trovata")
-
-            # Aggiorna la visualizzazione (mostra griglia/presentazione vuota o con le nuove immagini)
-            self.cambia_visualizzazione()
+        if query.richiede_verdetto: self._assicura_verdetti_stegano(indice.voci)
+        else: self._ferma_analisi_payload() # La query non usa più i verdetti
 
-        except Exception as e: # Errore durante lettura cartella
-            messagebox.showerror("Errore Caricamento Cartella", f"Impossibile leggere la cartella:\n{directory}\n\nErrore: {e}")
-            traceback.print_exc()
-            self.indice_corrente.set(-1); self.cambia_visualizzazione() # Resetta stato
+        ordina_per = self.ORDINAMENTI.get(self.ordinamento.get(), "nome")
+        self.immagini = indice.interroga(query, active_extensions, ordina_per, self.ordine_decrescente.get())
+
+        # Aggiorna l'indice (mantiene l'immagine selezionata se è ancora nei risultati)
+        if self.immagini:
+            percorsi = [img["path"] for img in self.immagini]
+            self.indice_corrente.set(percorsi.index(path_selezionato) if path_selezionato in percorsi else 0)
+            # Aggiorna barra stato con numero immagini
+            status_msg = f"Caricate {len(self.immagini)} immagini"
+            if termine_ricerca: status_msg += f" per '{termine_ricerca}'"
+            self.barra_stato.config(text=status_msg)
+        else:
+            # Se non trova immagini, resetta indice e mostra messaggio
+            self.indice_corrente.set(-1)
+            info_msg = f"Nessuna immagine trovata{' per ' + termine_ricerca if termine_ricerca else ''} con i filtri attivi."
+            # Mostra popup solo se non era una ricerca (altrimenti è ovvio che non ha trovato)
+            if not termine_ricerca and avvisa: messagebox.showinfo("Nessuna Immagine", f"{info_msg}\nCartella: {self.directory_corrente}")
+            self.barra_stato.config(text="Nessuna immagine trovata")
+
+        # Aggiorna la visualizzazione (mostra griglia/presentazione vuota o con le nuove immagini)
+        self.cambia_visualizzazione()
+
+    def _indice_tutte_le_cartelle(self):
+        """Indice di tutto il catalogo se è pronto; altrimenti ne avvia la costruzione in background e restituisce None."""
+        if self._indice_catalogo is None and self._costruzione_catalogo is None:
+            self._costruzione_catalogo = costruisci_indice_async(self.catalogo.cerca_separata, "nome")
+            self._catalogo_job = self.after(self.INTERVALLO_CATALOGO, self._controlla_indice_catalogo)
+        return self._indice_catalogo
+
+    def _controlla_indice_catalogo(self):
+        """Adotta l'indice del catalogo appena costruito e ripete la ricerca in corso."""
+        self._catalogo_job = None
+        futuro = self._costruzione_catalogo
+        if futuro is None: return
+        if not futuro.done():
+            self._catalogo_job = self.after(self.INTERVALLO_CATALOGO, self._controlla_indice_catalogo); return
+        self._costruzione_catalogo = None
+        modifiche, self._modifiche_catalogo = self._modifiche_catalogo, []
+        try:
+            indice = futuro.result()
+        except Exception as e: # Si riproverà alla prossima ricerca ovunque
+            print(f"WARN: Impossibile leggere il catalogo: {e}")
+            return
+        for metodo, argomenti in modifiche: getattr(indice, metodo)(*argomenti) # Cambiati durante la lettura
+        self._indice_catalogo = indice
+        if self.cerca_ovunque.get() and self.indice_metadati is not None:
+            self._applica_query(self.txt_ricerca.get(), avvisa=False)
+
+    def _modifica_indice_catalogo(self, metodo, *argomenti):
+        """Applica una modifica all'indice di tutto il catalogo (accodata se l'indice è in costruzione)."""
+        if self._indice_catalogo is not None: getattr(self._indice_catalogo, metodo)(*argomenti)
+        elif self._costruzione_catalogo is not None: self._modifiche_catalogo.append((metodo, argomenti))
+
+    def _scarta_indice_catalogo(self):
+        """Dimentica l'indice di tutto il catalogo (e l'eventuale costruzione in corso, il cui risultato viene ignorato)."""
+        if self._catalogo_job:
+            self.after_cancel(self._catalogo_job)
+            self._catalogo_job = None
+        self._indice_catalogo = self._costruzione_catalogo = None
+        self._modifiche_catalogo = []
+
+    def _assicura_verdetti_stegano(self, voci):
+        """Avvia in background l'analisi (una sola volta per file) delle immagini senza verdetto steganografico.
+        Finché l'analisi non termina queste immagini restano fuori dai risultati; alla fine la query viene rieseguita.
+        """
+        mancanti = [v["path"] for v in voci if v and v.get("verdetto_stegano") is None]
+        if not mancanti: return
+        if self._analisi_payload is not None and self._analisi_payload.copre(mancanti): return # Già in corso
+        self._ferma_analisi_payload()
+        self._analisi_payload = AnalisiPayload(mancanti)
+        self._analisi_payload.avvia()
+        self._analisi_job = self.after(self.INTERVALLO_ANALISI, self._controlla_analisi_payload)
+
+    def _controlla_analisi_payload(self):
+        """Raccoglie i verdetti arrivati; a fine analisi li salva nel catalogo e riesegue la query."""
+        self._analisi_job = None
+        analisi = self._analisi_payload
+        if analisi is None: return
+        self._registra_verdetti(analisi.risultati_pronti())
+        if not analisi.terminata:
+            self.barra_stato.config(text=f"Analisi steganografica {analisi.fatti}/{analisi.totale}... (i file analizzati compariranno alla fine)")
+            self._analisi_job = self.after(self.INTERVALLO_ANALISI, self._controlla_analisi_payload)
+            return
+        self._analisi_payload = None
+        self._salva_verdetti()
+        self._applica_query(self.txt_ricerca.get(), avvisa=False)
+
+    def _ferma_analisi_payload(self):
+        """Annulla l'analisi steganografica in corso (se c'è), salvando i verdetti già calcolati."""
+        if self._analisi_job:
+            self.after_cancel(self._analisi_job)
+            self._analisi_job = None
+        analisi, self._analisi_payload = self._analisi_payload, None
+        if analisi is None: return
+        analisi.annulla()
+        self._registra_verdetti(analisi.risultati_pronti())
+        self._salva_verdetti()
+
+    def _registra_verdetti(self, verdetti):
+        """Riporta i verdetti sulle voci in memoria (cartella corrente e tutto il catalogo)."""
+        for path, verdetto in verdetti.items():
+            if self.indice_metadati is not None: self.indice_metadati.imposta_verdetto(path, verdetto)
+            self._modifica_indice_catalogo("imposta_verdetto", path, verdetto)
+        self._verdetti_da_salvare.update(verdetti)
+
+    def _salva_verdetti(self):
+        """Scrive nel catalogo i verdetti raccolti (un'unica transazione)."""
+        if self.catalogo and self._verdetti_da_salvare: self.catalogo.aggiorna_verdetti(self._verdetti_da_salvare)
+        self._verdetti_da_salvare = {}
+
+    # --- Osservazione Cartella ---
+
+    def _avvia_osservatore(self, directory):
+        """Avvia l'osservatore sulla cartella indicata (fermando quello precedente)."""
+        self._ferma_osservatore()
+        try:
+            self.osservatore = OsservatoreCartella(directory, self.ALL_SUPPORTED_EXT_FLAT)
+            self.osservatore.avvia()
+            self._osservatore_job = self.after(self.INTERVALLO_EVENTI_FS, self._controlla_eventi_fs)
+        except Exception as e: # Non bloccante: la galleria funziona anche senza aggiornamenti automatici
+            print(f"WARN: Impossibile osservare la cartella {directory}: {e}")
+            self.osservatore = None
+
+    def _ferma_osservatore(self):
+        """Ferma l'osservatore della cartella (se attivo) e il relativo timer."""
+        if self._osservatore_job:
+            self.after_cancel(self._osservatore_job)
+            self._osservatore_job = None
+        if self.osservatore:
+            self.osservatore.ferma()
+            self.osservatore = None
+
+    def _controlla_eventi_fs(self):
+        """Legge periodicamente gli eventi dell'osservatore e li applica."""
+        self._osservatore_job = None
+        if not self.osservatore: return
+        eventi = self.osservatore.eventi_pendenti()
+        if eventi and self.indice_metadati is not None:
+            try:
+                self._applica_eventi_fs(eventi)
+            except Exception as e: # Un file problematico non deve fermare l'osservazione
+                print(f"Errore aggiornamento cartella: {e}")
+                traceback.print_exc()
+        self._osservatore_job = self.after(self.INTERVALLO_EVENTI_FS, self._controlla_eventi_fs)
+
+    def _applica_eventi_fs(self, eventi):
+        """Applica file aggiunti/rimossi/modificati a catalogo, indice metadati e cache miniature."""
+        for tipo, path in eventi:
+            # Toglie la vecchia voce (se c'era) e invalida solo la sua miniatura
+            vecchia = self.indice_metadati.rimuovi_voce(path)
+            self._modifica_indice_catalogo("rimuovi_voce", path)
+            if vecchia:
+                self._cache_miniature.rimuovi(vecchia.get("chiave_miniatura"))
+                self.livelli_miniature.dimentica(vecchia.get("chiave_miniatura"))
+            self._rimuovi_tile_griglia(path)
+            if vecchia and self.atlante: self.atlante.dimentica(vecchia.get("chiave_miniatura") or path)
+            self.visualizzatore.dimentica(path)
+            self.lettore_remoto.dimentica(path)
+            if tipo == RIMOSSO or not os.path.isfile(path):
+                if self.catalogo: self.catalogo.rimuovi_file(path)
+                continue
+            # Nuovo o modificato: rilegge solo l'header di questo file
+            voce = self.catalogo.aggiorna_file(path) if self.catalogo else leggi_metadati(path)
+            self.indice_metadati.aggiorna_voce(voce)
+            self._modifica_indice_catalogo("aggiorna_voce", voce)
+        print(f"Cartella aggiornata: {len(eventi)} file cambiati")
+        # Ricalcola in memoria la lista visibile (mantiene la selezione corrente)
+        self._applica_query(self.txt_ricerca.get(), avvisa=False)
 
     def salva_immagine(self):
         """Salva l'immagine corrente in un nuovo file, permettendo conversione formato base."""
@@ -939,23 +1664,8 @@ class GalleriaImmagini(ttk.Window):
             # Apre l'immagine originale
             with Image.open(img_path_originale) as img:
                 save_format_ext = os.path.splitext(file_path_salvataggio)[1].lower()
-                img_to_save = img # Immagine da salvare (potrebbe essere convertita)
-
-                # --- Gestione Conversione Formato (opzionale ma utile) ---
-                # Se salva come JPG e l'originale ha trasparenza (RGBA), la rimuove (es. sfondo bianco)
-                if save_format_ext in ['.jpg', '.jpeg']:
-                    if img.mode == 'RGBA' or 'A' in img.mode:
-                        # Crea sfondo bianco e incolla immagine sopra usando maschera alpha
-                        img_to_save = Image.new("RGB", img.size, (255, 255, 255))
-                        try: img_to_save.paste(img, mask=img.split()[3]) # Indice 3 è il canale Alpha
-                        except Exception: img_to_save = img.convert('RGB') # Fallback: conversione semplice
-                    elif img.mode != 'RGB' and img.mode != 'L': # Converti altri modi (es. P, LA) a RGB
-                        img_to_save = img.convert('RGB')
-                # Se salva come BMP e ha trasparenza, converti a RGB (BMP non la supporta)
-                elif save_format_ext == '.bmp':
-                     if img_to_save.mode == 'RGBA' or 'A' in img_to_save.mode:
-                          img_to_save = img_to_save.convert('RGB')
-
+                # JPEG e BMP non supportano la trasparenza: l'immagine viene appiattita (sfondo bianco per JPEG)
+                img_to_save = prepara_per_formato(img, save_format_ext)
                 # Salva l'immagine (PIL determina formato da estensione se non specificato)
                 img_to_save.save(file_path_salvataggio)
 
@@ -966,7 +1676,7 @@ class GalleriaImmagini(ttk.Window):
             traceback.print_exc()
 
     def cerca_immagini(self):
-        """Esegue una ricerca di immagini nella cartella corrente usando il testo nel campo di ricerca."""
+        """Riscansiona la cartella corrente e applica il testo del campo di ricerca (bottone 'Cerca' / Invio)."""
         # Controlla se una cartella è aperta
         if not self.directory_corrente:
             messagebox.showwarning("Nessuna Cartella Aperta", "Aprire prima una cartella per poter effettuare una ricerca.")
@@ -977,12 +1687,11 @@ class GalleriaImmagini(ttk.Window):
         self.carica_immagini_da_cartella(self.directory_corrente, termine_ricerca)
 
     def applica_filtri(self):
-        """Ricarica le immagini dalla cartella corrente quando un filtro viene cambiato."""
+        """Aggiorna la lista immagini quando cambia un filtro o l'ordinamento."""
         # Funziona solo se una cartella è già stata aperta
         if self.directory_corrente:
-            # Esegue una nuova ricerca (con termine vuoto se non c'è nulla nel campo)
-            # Questo ricaricherà la lista usando i filtri aggiornati
-            self.cerca_immagini()
+            # Riapplica ricerca, filtri e ordinamento sui metadati in memoria
+            self._applica_query(self.txt_ricerca.get())
 
     # --- Metodi Steganografia ---
 
@@ -994,8 +1703,7 @@ class GalleriaImmagini(ttk.Window):
                 self.area_dettagli.config(state=tk.NORMAL) # Rende l'area di testo modificabile
                 self.area_dettagli.delete(1.0, tk.END)     # Cancella i dettagli immagine precedenti
                 # Inserisce un testo guida
-                placeholder_text = "Inserisci qui il testo da nascondere o visualizza il testo estratto."
-                self.area_dettagli.insert(tk.END, placeholder_text)
+                self.area_dettagli.insert(tk.END, self.TESTO_GUIDA_STEGANO)
 
                 # Posiziona il cursore all'inizio e deseleziona il testo placeholder
                 self.area_dettagli.mark_set(tk.INSERT, "1.0")
@@ -1022,6 +1730,49 @@ class GalleriaImmagini(ttk.Window):
         # Aggiorna lo stato di tutti i controlli (specialmente i bottoni/menu stegano)
         self.aggiorna_stato()
 
+    def _on_testo_modificato(self, event=None):
+        """Testo dell'area dettagli cambiato (digitazione, incolla): aggiorna il contatore con un breve ritardo."""
+        if not self.area_dettagli.edit_modified(): return
+        self.area_dettagli.edit_modified(False) # Riarma l'evento <<Modified>>
+        if self._capacita_job is not None: self.after_cancel(self._capacita_job)
+        self._capacita_job = self.after(self.RITARDO_CAPACITA, self._aggiorna_capacita)
+
+    def _aggiorna_capacita(self):
+        """Mostra sotto l'area di testo la capacità dell'immagine corrente e i byte rimasti."""
+        self._capacita_job = None
+        current_index = self.indice_corrente.get()
+        if not self.stegano_mode.get() or not (0 <= current_index < len(self.immagini)):
+            self.lbl_capacita.pack_forget()
+            return
+        con_chiave = bool(self.chiave_stegano)
+        capacita = capacita_voce(self.immagini[current_index], con_chiave) # Dalle dimensioni nei metadati, senza decodificare
+        testo = self.area_dettagli.get(1.0, tk.END).strip()
+        if testo == self.TESTO_GUIDA_STEGANO: testo = ""
+        usati = len(testo.encode("utf-8")) # stegano conta i byte UTF-8, non i caratteri
+        if capacita is None:
+            testo_etichetta, stile = "Capacità non disponibile (intestazione dell'immagine non leggibile)", SECONDARY
+        elif usati <= capacita:
+            testo_etichetta, stile = f"Capacità: {capacita} byte | Testo: {usati} | Rimasti: {capacita - usati}", SECONDARY
+        else:
+            testo_etichetta, stile = f"Testo troppo lungo di {usati - capacita} byte (capacità: {capacita})", DANGER
+            consigliata = miglior_contenitore(self.immagini, usati, self.immagini[current_index].get("path"), con_chiave)
+            if consigliata: testo_etichetta += f" | Prova con: {consigliata['nome']}"
+        self.lbl_capacita.config(text=testo_etichetta, bootstyle=stile)
+        if not self.lbl_capacita.winfo_ismapped():
+            self.lbl_capacita.pack(side=tk.BOTTOM, anchor=tk.W, pady=(3, 0), before=self.area_dettagli)
+
+    def imposta_chiave_stegano(self):
+        """Chiede la frase segreta per nascondere ed estrarre in ordine pseudo-casuale (vuota = modalità sequenziale)."""
+        chiave = simpledialog.askstring("Chiave Segreta",
+                                        "Frase segreta per nascondere ed estrarre il testo.\n"
+                                        "I bit vengono sparsi nell'immagine in un ordine che solo la chiave conosce.\n"
+                                        "Lascia vuoto per la modalità sequenziale (compatibile con stegano).",
+                                        show="*", parent=self)
+        if chiave is None: return # Annullato: la chiave resta quella di prima
+        self.chiave_stegano = chiave or None
+        self.aggiorna_stato() # Barra di stato e capacità dipendono dalla modalità
+        self.barra_stato.config(text="Chiave segreta impostata" if chiave else "Modalità sequenziale (senza chiave)")
+
     def nascondi_testo(self):
         """Nasconde il testo dall'area dettagli nell'immagine corrente, salvando come NUOVO file PNG."""
         current_index = self.indice_corrente.get()
@@ -1038,10 +1789,23 @@ class GalleriaImmagini(ttk.Window):
         # Ottieni il testo dall'area, rimuovendo spazi bianchi iniziali/finali
         testo_da_nascondere = self.area_dettagli.get(1.0, tk.END).strip()
         # Controlla se c'è testo effettivo da nascondere (diverso dal placeholder)
-        if not testo_da_nascondere or testo_da_nascondere == "Inserisci qui il testo da nascondere o visualizza il testo estratto.":
+        if not testo_da_nascondere or testo_da_nascondere == self.TESTO_GUIDA_STEGANO:
             messagebox.showwarning("Testo Mancante", "Inserisci il testo da nascondere nell'area di testo.")
             return
 
+        # --- Controllo della capacità (dalle sole dimensioni, prima di decodificare l'immagine) ---
+        voce = self.immagini[current_index]
+        con_chiave = bool(self.chiave_stegano)
+        capacita, necessari = capacita_voce(voce, con_chiave), len(testo_da_nascondere.encode("utf-8"))
+        if capacita is not None and necessari > capacita:
+            messaggio = (f"Il testo occupa {necessari} byte, ma '{os.path.basename(img_path_originale)}' "
+                         f"può contenerne al massimo {capacita}.")
+            consigliata = miglior_contenitore(self.immagini, necessari, img_path_originale, con_chiave)
+            if consigliata: messaggio += f"\n\nImmagine consigliata in questa cartella: {consigliata['nome']} (capacità {capacita_voce(consigliata, con_chiave)} byte)"
+            else: messaggio += "\n\nNessuna immagine di questa cartella è abbastanza grande: accorcia il testo."
+            messagebox.showerror("Testo Troppo Lungo", messaggio)
+            return
+
         # --- Avviso se l'immagine originale non è PNG ---
         if not img_path_originale.lower().endswith(".png"):
             # Chiedi conferma all'utente perché il salvataggio forzerà il formato PNG
@@ -1069,13 +1833,25 @@ class GalleriaImmagini(ttk.Window):
         try:
             # Usa la libreria stegano per nascondere il testo nell'immagine originale
             # NOTA: lsb.hide() carica l'immagine, nasconde il testo e restituisce un NUOVO oggetto Immagine PIL
-            secret_image = lsb.hide(img_path_originale, testo_da_nascondere)
-            # Salva la nuova immagine (che contiene il testo nascosto) nel percorso scelto
-            secret_image.save(file_path_salvataggio)
-
-            # Messaggio di successo
-            messagebox.showinfo("Successo", f"Testo nascosto con successo!\nImmagine salvata come:\n{file_path_salvataggio}")
-            self.barra_stato.config(text=f"Testo nascosto in {os.path.basename(file_path_salvataggio)}")
+            if self.chiave_stegano:
+                # Modalità con chiave: bit sparsi negli slot scelti dalla frase segreta
+                with Image.open(img_path_originale) as img:
+                    secret_image = nascondi_con_chiave(img, testo_da_nascondere, self.chiave_stegano)
+            else:
+                # auto_convert_rgb: le immagini in altri modi (P, L, ...) vengono convertite senza chiedere conferma su console
+                secret_image = lsb.hide(img_path_originale, testo_da_nascondere, auto_convert_rgb=True)
+            # Salva la nuova immagine (che contiene il testo nascosto) con il profilo PNG scelto
+            self.barra_stato.config(text=f"Salvataggio PNG (profilo {self.profilo_png.get()})...")
+            self.barra_stato.update_idletasks()
+            # Riusa i blocchi già compressi: risalvando la stessa copertina cambiano solo le righe toccate dal testo
+            rapporto = salva_png(secret_image, file_path_salvataggio, self.profilo_png.get(), riusa_blocchi=True)
+
+            # Messaggio di successo (con tempo di codifica e dimensione del file)
+            dettagli = f"Profilo {rapporto['profilo']}: {rapporto['byte'] / 1024:.0f} KB in {rapporto['secondi']:.2f} s"
+            if rapporto["blocchi_riusati"]:
+                dettagli += f"\n({rapporto['blocchi_riusati']}/{rapporto['blocchi']} blocchi di righe riusati senza ricomprimerli)"
+            messagebox.showinfo("Successo", f"Testo nascosto con successo!\nImmagine salvata come:\n{file_path_salvataggio}\n\n{dettagli}")
+            self.barra_stato.config(text=f"Testo nascosto in {os.path.basename(file_path_salvataggio)} | {dettagli.splitlines()[0]}")
         except FileNotFoundError:
              messagebox.showerror("Errore", f"File originale non trovato:\n{img_path_originale}")
         except ValueError as ve: # Errore comune: testo troppo lungo per l'immagine
@@ -1105,7 +1881,21 @@ class GalleriaImmagini(ttk.Window):
 
             # --- Esegui Steganografia (Estrai) ---
             # Usa la libreria stegano per rivelare il testo nascosto
-            testo_estratto = lsb.reveal(img_path)
+            if self.chiave_stegano:
+                with Image.open(img_path) as img: testo_estratto = rivela_con_chiave(img, self.chiave_stegano)
+            elif rileva_payload(img_path):
+                testo_estratto = lsb.reveal(img_path)
+            else:
+                # Nessuna intestazione plausibile: stegano scorrerebbe l'intera immagine pixel per pixel senza trovare nulla
+                testo_estratto = None
+
+            # Memorizza l'esito nel catalogo (usato dal filtro 'has:payload')
+            # Con la chiave un esito negativo non dice nulla sul testo sequenziale: si registra solo quello positivo
+            if testo_estratto or not self.chiave_stegano:
+                self.immagini[current_index]["verdetto_stegano"] = int(bool(testo_estratto))
+                if self.indice_metadati is not None: self.indice_metadati.imposta_verdetto(img_path, int(bool(testo_estratto)))
+                self._modifica_indice_catalogo("imposta_verdetto", img_path, int(bool(testo_estratto)))
+                if self.catalogo: self.catalogo.aggiorna_verdetto(img_path, bool(testo_estratto))
 
             # --- Mostra Risultato ---
             if testo_estratto: # Se è stato trovato del testo
@@ -1136,6 +1926,237 @@ class GalleriaImmagini(ttk.Window):
             # Ripristina stato corretto
             if not self.stegano_mode.get(): self.area_dettagli.config(state=tk.DISABLED)
 
+    # --- Ricerca Duplicati ---
+
+    def trova_duplicati(self):
+        """Raggruppa le immagini visualizzate che sono copie (anche ritoccate) l'una dell'altra.
+        Le impronte mancanti vengono calcolate in background, con avanzamento e possibilità di annullare.
+        """
+        if self._calcolo_impronte is not None:
+            messagebox.showinfo("Trova Duplicati", "Il calcolo delle impronte è già in corso."); return
+        voci = [v for v in self.immagini if v.get("path")]
+        if len(voci) < 2:
+            messagebox.showinfo("Trova Duplicati", "Servono almeno due immagini per cercare duplicati.")
+            return
+        percorsi = [v["path"] for v in voci]
+        # Gli hash già calcolati sono nel catalogo: si calcolano solo quelli mancanti (file nuovi o modificati)
+        hash_noti = self.catalogo.leggi_hash(percorsi) if self.catalogo else {}
+        mancanti = [p for p in percorsi if p not in hash_noti]
+        if not mancanti:
+            self._raggruppa_duplicati(voci, hash_noti); return
+
+        calcolo = self._calcolo_impronte = CalcoloImpronte(mancanti)
+        finestra = ttk.Toplevel(self)
+        finestra.title("Trova Duplicati")
+        finestra.resizable(False, False)
+        corpo = ttk.Frame(finestra, padding=10)
+        corpo.pack(fill=tk.BOTH, expand=True)
+        etichetta = ttk.Label(corpo, text=f"Calcolo impronte 0/{calcolo.totale}...", width=50)
+        etichetta.pack(anchor=tk.W)
+        barra = ttk.Progressbar(corpo, maximum=calcolo.totale, bootstyle=SUCCESS)
+        barra.pack(fill=tk.X, pady=(5, 10))
+        btn_annulla = ttk.Button(corpo, text="Annulla", bootstyle=DANGER)
+        btn_annulla.pack(side=tk.RIGHT)
+
+        def _controlla():
+            """Aggiorna l'avanzamento; alla fine salva le impronte e mostra i gruppi."""
+            if not calcolo.terminato:
+                testo = f"Calcolo impronte {calcolo.fatti}/{calcolo.totale}..."
+                if calcolo.annullato: testo += " annullamento in corso..."
+                if finestra.winfo_exists():
+                    barra.configure(value=calcolo.fatti)
+                    etichetta.config(text=testo)
+                self.barra_stato.config(text=testo)
+                self.after(100, _controlla); return
+            self._calcolo_impronte = None
+            if finestra.winfo_exists(): finestra.destroy()
+            # Anche in caso di annullamento le impronte calcolate restano nel catalogo: la prossima volta si riparte da lì
+            if self.catalogo and calcolo.hash: self.catalogo.aggiorna_hash(calcolo.hash)
+            if calcolo.annullato:
+                self.barra_stato.config(text=f"Ricerca duplicati annullata ({len(calcolo.hash)}/{calcolo.totale} impronte salvate)")
+                return
+            hash_noti.update(calcolo.hash)
+            self._raggruppa_duplicati(voci, hash_noti)
+
+        def _annulla():
+            calcolo.annulla()
+            btn_annulla.config(state=tk.DISABLED)
+
+        def _chiudi():
+            # Chiudere la finestra durante il calcolo lo annulla
+            calcolo.annulla()
+            finestra.destroy()
+
+        btn_annulla.config(command=_annulla)
+        finestra.protocol("WM_DELETE_WINDOW", _chiudi)
+        calcolo.avvia()
+        self.after(100, _controlla)
+
+    def _raggruppa_duplicati(self, voci, hash_noti):
+        """Raggruppa per pHash le voci con impronta nota e mostra i gruppi trovati."""
+        validi = [v["path"] for v in voci if v["path"] in hash_noti]
+        # Il pHash (basato sulla DCT) resiste a ricompressione, ridimensionamento e testo nascosto
+        gruppi = raggruppa_duplicati([hash_noti[p][1] for p in validi], self.SOGLIA_DUPLICATI)
+        gruppi = [[validi[i] for i in g] for g in gruppi]
+        if not gruppi:
+            self.barra_stato.config(text="Nessun duplicato trovato")
+            messagebox.showinfo("Trova Duplicati", f"Nessun duplicato trovato tra {len(validi)} immagini.")
+            return
+        self.barra_stato.config(text=f"Trovati {len(gruppi)} gruppi di duplicati")
+        self._mostra_duplicati(gruppi, {v["path"]: v for v in voci})
+
+    def _mostra_duplicati(self, gruppi, voci_per_path):
+        """Apre una finestra con l'elenco dei gruppi di duplicati."""
+        finestra = ttk.Toplevel(self)
+        finestra.title(f"Duplicati - {len(gruppi)} gruppi")
+        finestra.geometry("700x450")
+
+        albero = ttk.Treeview(finestra, columns=("cartella", "risoluzione", "dimensione"), show="tree headings")
+        albero.heading("#0", text="Nome"); albero.heading("cartella", text="Cartella")
+        albero.heading("risoluzione", text="Risoluzione"); albero.heading("dimensione", text="Dimensione")
+        albero.column("#0", width=220); albero.column("cartella", width=220)
+        albero.column("risoluzione", width=110, anchor=tk.CENTER); albero.column("dimensione", width=100, anchor=tk.E)
+        scrollbar = ttk.Scrollbar(finestra, orient=tk.VERTICAL, command=albero.yview)
+        albero.configure(yscrollcommand=scrollbar.set)
+
+        for n, gruppo in enumerate(gruppi, 1):
+            nodo = albero.insert("", tk.END, text=f"Gruppo {n} ({len(gruppo)} immagini)", open=True)
+            for path in gruppo:
+                voce = voci_per_path.get(path, {})
+                risoluzione = f"{voce['larghezza']}x{voce['altezza']}" if voce.get("larghezza") else "-"
+                dimensione = f"{voce['dimensione'] / 1024:.1f} KB" if voce.get("dimensione") is not None else "-"
+                albero.insert(nodo, tk.END, iid=path, text=os.path.basename(path),
+                              values=(os.path.dirname(path), risoluzione, dimensione))
+
+        def _mostra_selezionata(event=None):
+            """Mostra nella galleria l'immagine selezionata nell'elenco."""
+            selezione = albero.selection()
+            if not selezione or not albero.parent(selezione[0]): return # Nessun file (o riga di gruppo)
+            percorsi = [img.get("path") for img in self.immagini]
+            if selezione[0] in percorsi:
+                self.seleziona_immagine_da_griglia(percorsi.index(selezione[0]))
+            else: # L'elenco della galleria è cambiato nel frattempo
+                self.barra_stato.config(text=f"{os.path.basename(selezione[0])} non è più tra le immagini visualizzate")
+
+        barra = ttk.Frame(finestra, padding=5)
+        ttk.Button(barra, text="Mostra nella galleria", command=_mostra_selezionata, bootstyle=PRIMARY).pack(side=tk.RIGHT)
+        barra.pack(side=tk.BOTTOM, fill=tk.X)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        albero.pack(fill=tk.BOTH, expand=True)
+        albero.bind("<Double-1>", _mostra_selezionata)
+
+    # --- Esportazione in Blocco ---
+
+    def esporta_immagini(self):
+        """Apre la finestra per convertire tutte le immagini visualizzate in un altro formato."""
+        percorsi = [img["path"] for img in self.immagini if img.get("path")]
+        if not percorsi:
+            messagebox.showinfo("Esporta Immagini", "Nessuna immagine da esportare."); return
+
+        finestra = ttk.Toplevel(self)
+        finestra.title(f"Esporta {len(percorsi)} immagini")
+        finestra.resizable(False, False)
+        corpo = ttk.Frame(finestra, padding=10)
+        corpo.pack(fill=tk.BOTH, expand=True)
+
+        # --- Impostazioni ---
+        cartella = tk.StringVar(value=os.path.join(self.directory_corrente or os.path.expanduser("~"), "esportate"))
+        formato = tk.StringVar(value="JPEG")
+        larghezza_max = tk.IntVar(value=0) # 0 = dimensioni originali
+        altezza_max = tk.IntVar(value=0)
+        qualita = tk.IntVar(value=QUALITA_PREDEFINITA)
+        profilo = tk.StringVar(value="Predefinito")
+
+        ttk.Label(corpo, text="Cartella di destinazione:").grid(row=0, column=0, sticky=tk.W, pady=2)
+        ttk.Entry(corpo, textvariable=cartella, width=45).grid(row=0, column=1, columnspan=3, sticky=tk.EW, pady=2)
+        ttk.Button(corpo, text="Sfoglia...", bootstyle=SECONDARY,
+                   command=lambda: cartella.set(filedialog.askdirectory(parent=finestra, initialdir=cartella.get()) or cartella.get())
+                   ).grid(row=0, column=4, padx=(5, 0), pady=2)
+        ttk.Label(corpo, text="Formato:").grid(row=1, column=0, sticky=tk.W, pady=2)
+        ttk.Combobox(corpo, textvariable=formato, values=list(FORMATI_ESPORTAZIONE), state="readonly", width=8
+                     ).grid(row=1, column=1, sticky=tk.W, pady=2)
+        ttk.Label(corpo, text="Dimensioni massime (0 = originali):").grid(row=2, column=0, sticky=tk.W, pady=2)
+        ttk.Spinbox(corpo, from_=0, to=20000, increment=100, textvariable=larghezza_max, width=7).grid(row=2, column=1, sticky=tk.W)
+        ttk.Label(corpo, text="x").grid(row=2, column=2)
+        ttk.Spinbox(corpo, from_=0, to=20000, increment=100, textvariable=altezza_max, width=7).grid(row=2, column=3, sticky=tk.W)
+        ttk.Label(corpo, text="Qualità JPEG:").grid(row=3, column=0, sticky=tk.W, pady=2)
+        ttk.Spinbox(corpo, from_=1, to=95, textvariable=qualita, width=7).grid(row=3, column=1, sticky=tk.W, pady=2)
+        ttk.Label(corpo, text="Profilo PNG:").grid(row=3, column=2, columnspan=2, sticky=tk.E, padx=(10, 5), pady=2)
+        ttk.Combobox(corpo, textvariable=profilo, values=["Predefinito"] + list(PROFILI_PNG), state="readonly", width=11
+                     ).grid(row=3, column=4, sticky=tk.W, pady=2)
+
+        # --- Avanzamento ---
+        barra = ttk.Progressbar(corpo, maximum=len(percorsi), bootstyle=SUCCESS)
+        barra.grid(row=4, column=0, columnspan=5, sticky=tk.EW, pady=(10, 2))
+        etichetta = ttk.Label(corpo, text=f"{len(percorsi)} immagini da esportare")
+        etichetta.grid(row=5, column=0, columnspan=5, sticky=tk.W)
+        pulsanti = ttk.Frame(corpo)
+        pulsanti.grid(row=6, column=0, columnspan=5, sticky=tk.E, pady=(10, 0))
+        btn_esporta = ttk.Button(pulsanti, text="Esporta", bootstyle=PRIMARY)
+        btn_annulla = ttk.Button(pulsanti, text="Annulla", bootstyle=DANGER, state=tk.DISABLED)
+        btn_esporta.pack(side=tk.RIGHT); btn_annulla.pack(side=tk.RIGHT, padx=(0, 5))
+        stato = {"lavoro": None}
+
+        def _controlla():
+            """Legge i risultati arrivati dal pool e aggiorna l'avanzamento."""
+            lavoro = stato["lavoro"]
+            for path, _, _, errore in lavoro.risultati_pronti():
+                if errore: print(f"Errore esportazione {path}: {errore}")
+            fatti = len(lavoro.completati)
+            if finestra.winfo_exists():
+                barra.configure(value=fatti)
+                etichetta.config(text=f"Esportate {fatti}/{lavoro.totale}" + (" - annullamento in corso..." if lavoro.annullata else ""))
+            if lavoro.terminata: _fine(lavoro)
+            else: self.after(100, _controlla)
+
+        def _fine(lavoro):
+            """Mostra il riepilogo dell'esportazione."""
+            r = lavoro.riepilogo()
+            messaggio = f"Esportate {r['esportati']} immagini in {r['secondi']:.1f} s ({lavoro.processi} processi)\n"
+            messaggio += f"Dimensione: {r['byte_originali'] / 1048576:.1f} MB -> {r['byte_scritti'] / 1048576:.1f} MB\n"
+            if r["saltati"]: messaggio += f"Saltate per annullamento: {r['saltati']}\n"
+            if r["errori"]:
+                messaggio += f"\nErrori: {len(r['errori'])}\n"
+                messaggio += "\n".join(f"- {os.path.basename(p or '?')}: {e}" for p, e in r["errori"][:10])
+                if len(r["errori"]) > 10: messaggio += f"\n... e altri {len(r['errori']) - 10} (vedi console)"
+            self.barra_stato.config(text=f"Esportazione completata: {r['esportati']}/{lavoro.totale} in {lavoro.cartella}")
+            if finestra.winfo_exists(): finestra.destroy()
+            (messagebox.showwarning if r["errori"] else messagebox.showinfo)("Esportazione Completata", messaggio)
+
+        def _avvia():
+            try:
+                larghezza, altezza = larghezza_max.get(), altezza_max.get()
+                q = max(1, min(95, qualita.get()))
+            except tk.TclError: # Valore non numerico in uno dei campi
+                messagebox.showerror("Valore Non Valido", "Dimensioni e qualità devono essere numeri interi.", parent=finestra)
+                return
+            dimensione_massima = None
+            if larghezza > 0 or altezza > 0: # Un solo lato indicato: l'altro non pone limiti
+                dimensione_massima = (larghezza if larghezza > 0 else 10 ** 6, altezza if altezza > 0 else 10 ** 6)
+            try:
+                lavoro = EsportazioneBatch(percorsi, cartella.get(), formato.get(), dimensione_massima, q,
+                                           profilo_png=None if profilo.get() == "Predefinito" else profilo.get())
+                lavoro.avvia()
+            except OSError as e: # Cartella di destinazione non creabile
+                messagebox.showerror("Errore Esportazione", f"Impossibile usare la cartella:\n{cartella.get()}\n\nErrore: {e}", parent=finestra)
+                return
+            stato["lavoro"] = lavoro
+            btn_esporta.config(state=tk.DISABLED); btn_annulla.config(state=tk.NORMAL)
+            self.after(100, _controlla)
+
+        def _annulla():
+            if stato["lavoro"]: stato["lavoro"].annulla()
+            btn_annulla.config(state=tk.DISABLED)
+
+        def _chiudi():
+            # Chiudere la finestra durante l'esportazione la annulla (il riepilogo arriva comunque)
+            if stato["lavoro"] and not stato["lavoro"].terminata: _annulla()
+            finestra.destroy()
+
+        btn_esporta.config(command=_avvia)
+        btn_annulla.config(command=_annulla)
+        finestra.protocol("WM_DELETE_WINDOW", _chiudi)
+
     # --- Metodo Info e Uscita ---
 
     def mostra_info(self):
@@ -1149,13 +2170,17 @@ class GalleriaImmagini(ttk.Window):
         messaggio += "Usa 'Apri Immagine' o 'Apri Cartella' dal menu File o dalla barra degli strumenti per caricare le tue foto.\n\n"
 
         messaggio += "VISUALIZZARE:\n"
-        messaggio += "Scegli tra 'Griglia' per vedere le miniature o 'Presentazione' per vedere un'immagine ingrandita (menu Visualizza). Scorri tra le immagini usando i tasti freccia sinistra e destra.\n\n"
+        messaggio += "Scegli tra 'Griglia' per vedere le miniature o 'Presentazione' per vedere un'immagine ingrandita (menu Visualizza); con 'Griglia ad Atlante' le miniature vengono disegnate a bande su un unico canvas, più veloce con cartelle molto grandi. Scorri tra le immagini usando i tasti freccia sinistra e destra. In presentazione usa la rotella per lo zoom, trascina per spostarti e fai doppio clic per passare da 'adatta' a 1:1. Premi F5 per la proiezione automatica (intervallo e transizione nel menu Visualizza), Esc per fermarla. Con 'Steganografia > Chiave Segreta' il testo viene nascosto in un ordine pseudo-casuale dei pixel e si estrae solo con la stessa chiave. Con 'Steganografia > Analisi LSB' la presentazione mostra un piano di bit (canale e bit a scelta) o la differenza tra un'immagine e il suo file '_con_testo.png'. Il cursore 'Miniature' nella toolbar cambia la dimensione delle miniature. Alla chiusura la sessione (cartella, filtri, ricerca e posizione) viene salvata e ripristinata al prossimo avvio. Se la cartella è su un disco di rete (NFS, SMB) i file vengono letti in parallelo e in anticipo e conservati in memoria finché non cambiano. La memoria usata per le immagini è mostrata in basso a destra; il limite si sceglie in 'Strumenti > Budget Memoria'.\n\n"
 
         messaggio += "ORGANIZZARE:\n"
-        messaggio += "Hai aperto una cartella? Usa il campo 'Cerca' nella toolbar per trovare immagini per nome. Puoi anche filtrare i tipi di file (JPEG, PNG, ecc.) usando gli interruttori colorati in basso.\n\n"
+        messaggio += "Hai aperto una cartella? Usa il campo 'Cerca' nella toolbar per trovare immagini per nome, anche con errori di battitura (attiva 'Tutte le cartelle' per cercare in ogni cartella già aperta). Puoi anche filtrare i tipi di file (JPEG, PNG, ecc.) usando gli interruttori colorati in basso e scegliere l'ordinamento (nome, data, dimensione, risoluzione).\n"
+        messaggio += "Nella ricerca puoi usare filtri come: width>3000, height<=1080, size<2MB, taken:2024, has:payload (immagini con testo nascosto).\n\n"
+
+        messaggio += "TROVARE DUPLICATI:\n"
+        messaggio += "Usa 'Strumenti > Trova Duplicati...' per raggruppare le immagini visualizzate che sono copie l'una dell'altra, anche se ridimensionate, ricompresse o con testo nascosto.\n\n"
 
         messaggio += "SALVARE:\n"
-        messaggio += "Seleziona un'immagine e vai su 'File > Salva Immagine Come...' per salvarla, anche in un formato diverso se necessario.\n\n"
+        messaggio += "Seleziona un'immagine e vai su 'File > Salva Immagine Come...' per salvarla, anche in un formato diverso se necessario. Con 'Strumenti > Esporta Immagini...' converti in un colpo tutte le immagini visualizzate (formato, dimensioni massime e qualità), usando tutti i core del computer.\n\n"
 
         messaggio += "NASCONDERE TESTO (Steganografia):\n"
         messaggio += "Vuoi nascondere un messaggio segreto? Attiva la 'Modalità Steganografia' (menu o pannello inferiore), seleziona un'immagine (meglio PNG!), scrivi il testo nell'area apposita, clicca 'Nascondi' e salva il nuovo file PNG generato.\n\n"
@@ -1168,14 +2193,140 @@ class GalleriaImmagini(ttk.Window):
         # Mostra la finestra di dialogo. Si chiude cliccando su "OK".
         messagebox.showinfo(titolo, messaggio)
 
+    # --- Memoria ---
+    def _controlla_memoria(self):
+        """Applica il budget di memoria, aggiorna la barra di stato e si ripianifica."""
+        if self._memoria_job is not None: self.after_cancel(self._memoria_job)
+        self.memoria.applica()
+        self.etichetta_memoria.config(text=self.memoria.descrizione())
+        self._memoria_job = self.after(self.INTERVALLO_MEMORIA, self._controlla_memoria)
+
+    def _imposta_budget_memoria(self):
+        """Nuovo budget scelto nel menu: se è più basso libera subito la memoria in eccesso."""
+        self.memoria.budget = self.budget_memoria.get() * MB
+        self._controlla_memoria()
+
+    # --- Sessione ---
+
+    def _variabili_filtri(self):
+        return {"JPEG": self.filtro_jpeg, "PNG": self.filtro_png, "GIF": self.filtro_gif, "BMP": self.filtro_bmp}
+
+    def _salva_sessione(self):
+        """Salva cartella, filtri, ricerca, scorrimento, selezione, voci e miniature in vista per il prossimo avvio."""
+        if not self.directory_corrente or self.indice_metadati is None: return
+        indice = self.indice_corrente.get()
+        stato = {
+            "cartella": self.directory_corrente,
+            "filtri": {nome: var.get() for nome, var in self._variabili_filtri().items()},
+            "ricerca": self.txt_ricerca.get(),
+            "ordinamento": self.ordinamento.get(),
+            "ordine_decrescente": self.ordine_decrescente.get(),
+            "cerca_ovunque": self.cerca_ovunque.get(),
+            "selezionata": self.immagini[indice].get("path") if 0 <= indice < len(self.immagini) else None,
+            "scorrimento": self._posizione_griglia(),
+            "lato_miniature": self.lato_miniature.get(),
+        }
+        try:
+            salva_sessione(self.DATA_DIR, stato, self.indice_metadati.voci, self._miniature_per_sessione())
+        except Exception as e: # Non bloccante: al prossimo avvio si riparte dalla griglia vuota
+            print(f"WARN: Impossibile salvare la sessione: {e}")
+
+    def _ripristina_sessione(self):
+        """Mostra l'istantanea salvata alla chiusura precedente, senza scansionare né decodificare nulla.
+        La cartella viene poi confrontata in background con le voci salvate (vedi _controlla_verifica_sessione).
+        Restituisce False se non c'è una sessione utilizzabile.
+        """
+        sessione = carica_sessione(self.DATA_DIR)
+        if sessione is None: return False
+        stato, voci = sessione
+        cartella = stato.get("cartella")
+        if not cartella or not os.path.isdir(cartella): return False # Cartella rimossa o disco scollegato
+        self.directory_corrente = cartella
+        for nome, var in self._variabili_filtri().items(): var.set(stato.get("filtri", {}).get(nome, True))
+        if stato.get("ordinamento") in self.ORDINAMENTI: self.ordinamento.set(stato["ordinamento"])
+        self.ordine_decrescente.set(bool(stato.get("ordine_decrescente")))
+        self.cerca_ovunque.set(bool(stato.get("cerca_ovunque")))
+        self.txt_ricerca.delete(0, tk.END)
+        self.txt_ricerca.insert(0, stato.get("ricerca", ""))
+
+        self.indice_metadati = IndiceMetadati(voci)
+        lato = stato.get("lato_miniature")
+        if isinstance(lato, int) and self.LATO_MINIATURE_MIN <= lato <= self.LATO_MINIATURE_MAX:
+            self.lato_miniature.set(lato); self._imposta_lato_miniature()
+        self._precarica_miniature(carica_miniature(self.DATA_DIR, stato))
+        self._applica_query(stato.get("ricerca", ""), avvisa=False)
+        percorsi = [img.get("path") for img in self.immagini]
+        if stato.get("selezionata") in percorsi:
+            self.indice_corrente.set(percorsi.index(stato["selezionata"]))
+            self.aggiorna_stato()
+        self._scorri_griglia(stato.get("scorrimento") or 0)
+
+        # Da qui in poi l'osservatore segnala le modifiche; quelle avvenute ad app chiusa le trova la verifica
+        self._avvia_osservatore(cartella)
+        self._verifica_sessione = (verifica_sessione(cartella, voci, self.ALL_SUPPORTED_EXT_FLAT), cartella)
+        self.after(self.INTERVALLO_EVENTI_FS, self._controlla_verifica_sessione)
+        self.barra_stato.config(text=f"Sessione ripristinata: {len(self.immagini)} immagini (verifica della cartella in corso)")
+        return True
+
+    def _controlla_verifica_sessione(self):
+        """Applica i file cambiati mentre l'app era chiusa, appena la verifica in background è terminata."""
+        if self._verifica_sessione is None: return
+        futuro, cartella = self._verifica_sessione
+        if not futuro.done():
+            self.after(self.INTERVALLO_EVENTI_FS, self._controlla_verifica_sessione); return
+        self._verifica_sessione = None
+        if cartella != self.directory_corrente or self.indice_metadati is None: return # Nel frattempo è stata aperta un'altra cartella
+        try:
+            eventi = futuro.result()
+            if eventi: self._applica_eventi_fs(eventi)
+            else: self.barra_stato.config(text=f"Caricate {len(self.immagini)} immagini (cartella invariata)")
+        except Exception as e:
+            print(f"Errore verifica sessione: {e}")
+            traceback.print_exc()
+
+    def _precarica_miniature(self, miniature):
+        """Mette nei livelli delle miniature quelle salvate con la sessione (valgono per il loro lato o meno)."""
+        for chiave, img in miniature.items(): self.livelli_miniature.inserisci(chiave, max(img.size), img)
+
+    def _miniature_per_sessione(self):
+        """[(chiave, immagine PIL)] delle miniature in vista nella griglia attiva."""
+        if self.atlante and self.griglia_atlante.get(): return self.atlante.miniature_in_vista()
+        risultato = []
+        for chiave in self._miniature_in_vista:
+            img, esatta = self.livelli_miniature.miniatura(chiave, self.lato_miniature.get())
+            if esatta: risultato.append((chiave, img))
+        return risultato
+
+    def _posizione_griglia(self):
+        """Frazione di scorrimento della griglia attiva."""
+        if self.atlante and self.griglia_atlante.get(): return self.atlante.posizione()
+        if self._griglia: return self._griglia["canvas"].yview()[0]
+        return 0
+
+    def _scorri_griglia(self, frazione):
+        if self.atlante and self.griglia_atlante.get(): self.atlante.scorri_a(frazione)
+        elif self._griglia: self.after_idle(lambda: self._griglia["canvas"].yview_moveto(frazione))
+
     def quit(self):
         """Chiude l'applicazione."""
         print("Chiusura applicazione.")
+        self._salva_sessione() # Istantanea per mostrare subito la galleria al prossimo avvio
+        if self._memoria_job is not None: self.after_cancel(self._memoria_job)
+        self._ferma_osservatore() # Ferma l'osservazione della cartella
+        self._ferma_analisi_payload() # Salva i verdetti steganografici già calcolati
+        if self._calcolo_impronte: self._calcolo_impronte.annulla() # Ferma il calcolo dei duplicati
+        self.proiezione.ferma() # Ferma la proiezione (e il suo pool di decodifica)
+        if self.atlante: self.atlante.chiudi() # Annulla le miniature in decodifica
+        self.decodificatore.chiudi() # Ferma i processi di decodifica
+        self.lettore_remoto.chiudi() # Annulla le letture anticipate dalle cartelle di rete
+        if self.catalogo: self.catalogo.chiudi() # Chiude il database del catalogo
         self.destroy() # Distrugge la finestra Tkinter e termina il mainloop
 
 # --- Blocco di Esecuzione Principale ---
 # Questo codice viene eseguito solo se lo script è lanciato direttamente (non importato)
 if __name__ == "__main__":
+    # Necessario per il pool di processi dell'esportazione quando l'app è un eseguibile (PyInstaller)
+    multiprocessing.freeze_support()
     print(f"Avvio {GalleriaImmagini.APP_TITLE}...")
     try:
         # Crea un'istanza della classe principale dell'applicazione
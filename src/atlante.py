@@ -0,0 +1,315 @@
+# --- Griglia ad Atlante ---
+# Disegna la griglia delle miniature direttamente su un unico Canvas: le miniature
+# di alcune righe ("banda") vengono composte in una sola immagine PIL e mostrate
+# con una sola PhotoImage, i nomi sono elementi di testo del canvas. Esistono solo
+# le bande vicine alla parte visibile, quindi il numero di oggetti Tk non dipende
+# da quante immagini ci sono nella cartella, e il clic viene tradotto in indice
+# con un semplice calcolo sulla posizione.
+import os # Per i nomi dei file
+import tkinter as tk
+from tkinter import ttk
+from PIL import Image, ImageDraw, ImageTk # Per manipolazione immagini
+
+from memoria import byte_immagine # Contabilità della memoria
+from miniature import crea_miniatura, livello_per, CacheMultiRisoluzione # Decodifica ridotta e livelli di risoluzione
+from decodifica import ErroreDecodifica # Decodifica in processi separati
+
+
+class GrigliaAtlante:
+    """Griglia virtuale di miniature su un Canvas scorrevole.
+
+    imposta_voci([(path, chiave_miniatura), ...]) sostituisce il contenuto;
+    'al_clic(indice)' riceve l'indice della voce cliccata. Le miniature vengono
+    ricavate da 'livelli' (CacheMultiRisoluzione, condivisibile con altre viste).
+    """
+
+    RIGHE_BANDA = 4 # Righe di miniature composte in ogni immagine atlante
+    BANDE_MARGINE = 1 # Bande conservate sopra e sotto la parte visibile
+    ALTEZZA_NOME = 34 # Spazio per il nome del file (due righe)
+    INTERVALLO_MINIATURE = 30 # ms tra due controlli delle miniature in decodifica
+    MEMORIA_MINIATURE = 96 * 1024 * 1024 # Byte massimi dei livelli in cache (se non ne viene passata una)
+
+    def __init__(self, parent, al_clic, dimensione_miniatura, margine, colori, decodificatore=None, livelli=None):
+        self.al_clic = al_clic
+        self.lato = dimensione_miniatura[0]
+        self.margine = margine
+        self.colori = colori # "sfondo", "bordo", "testo", "errore"
+        self.decodificatore = decodificatore
+        self.canvas = tk.Canvas(parent, highlightthickness=0, bg=colori["sfondo"])
+        self.scrollbar = ttk.Scrollbar(parent, orient=tk.VERTICAL, command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=self._on_scorrimento)
+        self._voci = [] # (path, chiave) nell'ordine delle celle
+        self._indici_per_chiave = {} # chiave -> indici delle celle che la mostrano
+        self._errori = set() # Chiavi dei file non decodificabili
+        self._livelli = livelli if livelli is not None else CacheMultiRisoluzione(self.MEMORIA_MINIATURE)
+        self._bande = {} # indice banda -> {"immagine", "photo"}
+        self._in_arrivo = {} # chiave -> (Future, livello) della miniatura in decodifica
+        self._colonne = 1
+        self._larghezza_cella = self.lato + 2 * margine
+        self._altezza_cella = margine + self.lato + self.ALTEZZA_NOME + margine
+        self._job_vista = self._job_ricezione = None
+        self._scorrimento_in_attesa = None # Frazione da applicare quando il canvas avrà una larghezza
+
+        self.canvas.bind("<Configure>", self._on_configure)
+        self.canvas.bind("<Button-1>", self._on_clic)
+        self.canvas.bind("<MouseWheel>", lambda e: self.canvas.yview_scroll(-1 if e.delta > 0 else 1, "units")) # Windows / macOS
+        self.canvas.bind("<Button-4>", lambda e: self.canvas.yview_scroll(-1, "units")) # Linux (X11)
+        self.canvas.bind("<Button-5>", lambda e: self.canvas.yview_scroll(1, "units"))
+
+    # --- Visibilità e contenuto ---
+
+    def mostra(self):
+        if not self.canvas.winfo_ismapped():
+            self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+            self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self._pianifica_vista()
+
+    def nascondi(self):
+        """Toglie la griglia dalla finestra e libera le bande (le miniature restano in cache)."""
+        self.canvas.pack_forget()
+        self.scrollbar.pack_forget()
+        self._svuota_bande()
+
+    def imposta_voci(self, voci):
+        """Mostra le voci (path, chiave_miniatura); se sono le stesse di prima non ridisegna nulla."""
+        voci = list(voci)
+        if voci != self._voci:
+            self._voci = voci
+            self._indici_per_chiave = {}
+            for i, (path, chiave) in enumerate(voci):
+                self._indici_per_chiave.setdefault(chiave or path, []).append(i)
+            self._svuota_bande()
+            self._aggiorna_geometria()
+        self._pianifica_vista()
+
+    def imposta_dimensione(self, lato):
+        """Cambia il lato delle miniature: le bande vengono ricomposte dai livelli già in cache."""
+        if lato == self.lato: return
+        posizione = self.posizione()
+        self.lato = lato
+        self._altezza_cella = self.margine + lato + self.ALTEZZA_NOME + self.margine
+        self._svuota_bande()
+        self._aggiorna_geometria()
+        self.canvas.yview_moveto(posizione) # Resta sulla stessa parte della cartella
+        self._pianifica_vista()
+
+    def dimentica(self, chiave):
+        """Scarta le miniature di un file modificato o rimosso."""
+        self._livelli.dimentica(chiave)
+        self._errori.discard(chiave)
+
+    def miniature_in_vista(self):
+        """[(chiave, immagine PIL)] delle miniature pronte nelle righe visibili, dall'alto in basso."""
+        celle = self.RIGHE_BANDA * self._colonne
+        risultato = []
+        for b in self._bande_in_vista(margine=0):
+            for path, chiave in self._voci[b * celle:(b + 1) * celle]:
+                miniatura, esatta = self._livelli.miniatura(chiave or path, self.lato)
+                if esatta: risultato.append((chiave or path, miniatura))
+        return risultato
+
+    def posizione(self):
+        """Frazione dell'altezza totale in cima alla parte visibile (come yview)."""
+        return self.canvas.yview()[0]
+
+    def scorri_a(self, frazione):
+        """Scorre alla frazione indicata; se il canvas non ha ancora una larghezza lo fa alla prima disposizione."""
+        if self.canvas.winfo_width() > 1: self.canvas.yview_moveto(frazione)
+        else: self._scorrimento_in_attesa = frazione
+
+    def chiudi(self):
+        """Ferma i timer e annulla le decodifiche in attesa."""
+        for job in (self._job_vista, self._job_ricezione):
+            if job is not None: self.canvas.after_cancel(job)
+        self._job_vista = self._job_ricezione = None
+        for futuro, _ in self._in_arrivo.values(): futuro.cancel()
+        self._in_arrivo.clear()
+
+    def memoria_occupata(self):
+        """Byte delle bande (immagine PIL + PhotoImage); i livelli delle miniature li conta chi crea la cache."""
+        return sum(2 * byte_immagine(banda["immagine"]) for banda in self._bande.values())
+
+    def libera_memoria(self, limite):
+        """Scende (se possibile) entro 'limite' byte scartando le bande fuori vista."""
+        in_vista = set(self._bande_in_vista(margine=0))
+        for b in [b for b in self._bande if b not in in_vista]:
+            if self.memoria_occupata() <= limite: return
+            self._rimuovi_banda(b)
+
+    # --- Geometria ---
+
+    def _aggiorna_geometria(self):
+        """Ricalcola colonne e dimensioni delle celle dalla larghezza del canvas e aggiorna la scrollregion."""
+        larghezza = max(1, self.canvas.winfo_width())
+        self._colonne = max(1, larghezza // (self.lato + 2 * self.margine))
+        self._larghezza_cella = larghezza / self._colonne # Le colonne si spartiscono lo spazio in più
+        righe = -(-len(self._voci) // self._colonne)
+        altezza = righe * self._altezza_cella
+        self.canvas.configure(scrollregion=(0, 0, larghezza, altezza), yscrollincrement=self._altezza_cella // 4)
+        if self._scorrimento_in_attesa is not None and larghezza > 1:
+            self.canvas.yview_moveto(self._scorrimento_in_attesa); self._scorrimento_in_attesa = None
+        elif self.canvas.canvasy(0) > altezza: self.canvas.yview_moveto(0) # Il contenuto si è accorciato
+
+    def _riquadro(self, i):
+        """Rettangolo (x0, y0, x1, y1) della miniatura i in coordinate del canvas."""
+        riga, colonna = divmod(i, self._colonne)
+        x0 = int(colonna * self._larghezza_cella + (self._larghezza_cella - self.lato) / 2)
+        y0 = riga * self._altezza_cella + self.margine
+        return x0, y0, x0 + self.lato, y0 + self.lato
+
+    def _bande_in_vista(self, margine=None):
+        margine = self.BANDE_MARGINE if margine is None else margine
+        altezza_banda = self.RIGHE_BANDA * self._altezza_cella
+        totale = -(-len(self._voci) // (self._colonne * self.RIGHE_BANDA))
+        prima = int(self.canvas.canvasy(0) // altezza_banda) - margine
+        ultima = int(self.canvas.canvasy(self.canvas.winfo_height()) // altezza_banda) + margine
+        return range(max(0, prima), min(totale, ultima + 1))
+
+    # --- Bande ---
+
+    def _componi_banda(self, b):
+        """Crea l'immagine atlante della banda b con le miniature già pronte e i nomi come testo."""
+        primo = b * self.RIGHE_BANDA * self._colonne
+        ultimo = min(len(self._voci), primo + self.RIGHE_BANDA * self._colonne)
+        y_banda = b * self.RIGHE_BANDA * self._altezza_cella
+        righe = -(-(ultimo - primo) // self._colonne)
+        immagine = Image.new("RGB", (max(1, self.canvas.winfo_width()), righe * self._altezza_cella), self.colori["sfondo"])
+        disegno = ImageDraw.Draw(immagine)
+        tag = f"banda{b}"
+        for i in range(primo, ultimo):
+            path, chiave = self._voci[i]
+            x0, y0, x1, y1 = self._riquadro(i)
+            y0 -= y_banda; y1 -= y_banda
+            disegno.rectangle((x0 - 4, y0 - 4, x1 + 3, y1 + self.ALTEZZA_NOME), outline=self.colori["bordo"])
+            if not self._incolla(immagine, i, y_banda):
+                self._richiedi(path, chiave or path) # Senza processi separati la miniatura è già pronta
+                self._incolla(immagine, i, y_banda)
+            nome = os.path.basename(path)
+            self.canvas.create_text((x0 + x1) // 2, y_banda + y1 + 4, text=(nome[:20] + '...') if len(nome) > 23 else nome,
+                                    anchor=tk.N, width=self.lato, justify=tk.CENTER, fill=self.colori["testo"], tags=("atlante", tag))
+        photo = ImageTk.PhotoImage(immagine)
+        self.canvas.create_image(0, y_banda, anchor=tk.NW, image=photo, tags=("atlante", tag, "atlante_immagine"))
+        self.canvas.tag_lower("atlante_immagine") # I nomi restano sopra le immagini
+        self._bande[b] = {"immagine": immagine, "photo": photo}
+
+    def _incolla(self, immagine, i, y_banda):
+        """Disegna nella banda la miniatura della cella i (o il riquadro di errore).
+        False se manca o se è solo un'anteprima ingrandita da un livello più piccolo.
+        """
+        path, chiave = self._voci[i]
+        chiave = chiave or path
+        x0, y0, x1, y1 = self._riquadro(i)
+        y0 -= y_banda; y1 -= y_banda
+        disegno = ImageDraw.Draw(immagine)
+        if chiave in self._errori:
+            disegno.rectangle((x0, y0, x1 - 1, y1 - 1), fill=self.colori["errore"])
+            disegno.text(((x0 + x1) // 2, (y0 + y1) // 2), "ERRORE", fill="#ffffff", anchor="mm")
+            return True
+        miniatura, esatta = self._livelli.miniatura(chiave, self.lato)
+        if miniatura is None: return False
+        disegno.rectangle((x0, y0, x1 - 1, y1 - 1), fill=self.colori["sfondo"]) # Toglie l'eventuale anteprima
+        posizione = (x0 + (self.lato - miniatura.width) // 2, y0 + (self.lato - miniatura.height) // 2)
+        immagine.paste(miniatura, posizione, miniatura if miniatura.mode == "RGBA" else None)
+        return esatta
+
+    def _rimuovi_banda(self, b):
+        self.canvas.delete(f"banda{b}")
+        del self._bande[b]
+
+    def _svuota_bande(self):
+        self.canvas.delete("atlante")
+        self._bande.clear()
+
+    # --- Miniature ---
+
+    def _richiedi(self, path, chiave):
+        """Fa decodificare il livello adatto al lato attuale (in un processo separato se disponibile, altrimenti subito).
+        Se è già in arrivo un livello più piccolo, quello giusto viene richiesto quando arriva.
+        """
+        if chiave in self._in_arrivo: return
+        livello = livello_per(self.lato)
+        if self.decodificatore is not None:
+            try: futuro = self.decodificatore.decodifica(path, ("miniatura", (livello, livello)))
+            except ErroreDecodifica: futuro = None # Processi non disponibili
+            if futuro is not None:
+                self._in_arrivo[chiave] = (futuro, livello)
+                if self._job_ricezione is None:
+                    self._job_ricezione = self.canvas.after(self.INTERVALLO_MINIATURE, self._ricevi)
+                return
+        sorgente = self.decodificatore.apri(path) if self.decodificatore is not None else path
+        try: self._livelli.inserisci(chiave, livello, crea_miniatura(sorgente, (livello, livello)))
+        except Exception as e: self._segna_errore(chiave, e)
+
+    def _segna_errore(self, chiave, errore):
+        print(f"Errore Griglia: Caricamento miniatura {chiave}: {errore}")
+        self._errori.add(chiave)
+
+    def _ricevi(self):
+        """Incolla nelle bande le miniature arrivate dai processi di decodifica."""
+        self._job_ricezione = None
+        da_aggiornare, da_richiedere = set(), []
+        celle = self.RIGHE_BANDA * self._colonne
+        for chiave, (futuro, livello) in list(self._in_arrivo.items()):
+            if not futuro.done(): continue
+            del self._in_arrivo[chiave]
+            if futuro.cancelled(): continue
+            # Il livello viene copiato in RGB/RGBA: l'immagine ricevuta è mappata su un blocco condiviso
+            try: self._livelli.inserisci(chiave, livello, futuro.result())
+            except Exception as e: self._segna_errore(chiave, e)
+            for i in self._indici_per_chiave.get(chiave, ()):
+                b = i // celle
+                if b in self._bande:
+                    if not self._incolla(self._bande[b]["immagine"], i, b * self.RIGHE_BANDA * self._altezza_cella):
+                        da_richiedere.append(self._voci[i]) # Arrivato un livello ormai troppo piccolo
+                    da_aggiornare.add(b)
+        for b in da_aggiornare: # Una sola copia verso Tk per banda, anche se sono arrivate più miniature
+            self._bande[b]["photo"].paste(self._bande[b]["immagine"])
+        for path, chiave in da_richiedere: self._richiedi(path, chiave or path)
+        if self._in_arrivo:
+            self._job_ricezione = self.canvas.after(self.INTERVALLO_MINIATURE, self._ricevi)
+
+    # --- Eventi ---
+
+    def _on_scorrimento(self, *args):
+        self.scrollbar.set(*args)
+        self._pianifica_vista()
+
+    def _on_configure(self, event=None):
+        """Larghezza cambiata: se cambia la disposizione delle celle le bande vanno ricomposte."""
+        vecchia = (self._colonne, self._larghezza_cella)
+        self._aggiorna_geometria()
+        if (self._colonne, self._larghezza_cella) != vecchia: self._svuota_bande()
+        self._pianifica_vista()
+
+    def _pianifica_vista(self):
+        if self._job_vista is None:
+            self._job_vista = self.canvas.after_idle(self._aggiorna_vista)
+
+    def _aggiorna_vista(self):
+        """Crea le bande entrate in vista, rimuove quelle lontane e annulla le decodifiche non più utili."""
+        self._job_vista = None
+        if not self.canvas.winfo_ismapped(): return
+        in_vista = self._bande_in_vista()
+        for b in [b for b in self._bande if b not in in_vista]: self._rimuovi_banda(b)
+        for b in in_vista:
+            if b not in self._bande: self._componi_banda(b)
+        celle = self.RIGHE_BANDA * self._colonne
+        utili = {self._voci[i][1] or self._voci[i][0]
+                 for b in in_vista for i in range(b * celle, min(len(self._voci), (b + 1) * celle))}
+        for chiave in [c for c in self._in_arrivo if c not in utili]:
+            if self._in_arrivo[chiave][0].cancel(): del self._in_arrivo[chiave]
+        if self.decodificatore is not None and in_vista:
+            # Cartelle di rete: legge in anticipo i file della banda successiva
+            prossima = max(in_vista) + 1
+            self.decodificatore.precarica([path for path, chiave in self._voci[prossima * celle:(prossima + 1) * celle]
+                                           if (chiave or path) not in self._livelli])
+
+    def _on_clic(self, event):
+        """Traduce la posizione del clic nell'indice della miniatura (se il clic cade sulla cella)."""
+        x, y = self.canvas.canvasx(event.x), self.canvas.canvasy(event.y)
+        riga, colonna = int(y // self._altezza_cella), int(x // self._larghezza_cella)
+        i = riga * self._colonne + colonna
+        if colonna >= self._colonne or not 0 <= i < len(self._voci): return
+        x0, y0, x1, y1 = self._riquadro(i)
+        if x0 - 4 <= x <= x1 + 3 and y0 - 4 <= y <= y1 + self.ALTEZZA_NOME:
+            self.al_clic(i)
@@ -0,0 +1,66 @@
+# --- Cache LRU ---
+# Cache "least recently used" con limite sul peso totale degli elementi (ad es.
+# numero di tile o byte di pixel): quando il limite viene superato si scartano
+# gli elementi usati meno di recente.
+from collections import OrderedDict # Mantiene l'ordine di utilizzo
+
+
+class CacheLRU:
+    """Cache LRU con un peso massimo complessivo.
+
+    'peso(valore)' restituisce il costo di un elemento (di default 1, cioè il limite
+    è sul numero di elementi). Un elemento più pesante dell'intero limite non viene
+    conservato. 'alla_rimozione(chiave, valore)' viene chiamata per ogni elemento
+    scartato per fare spazio (non per le rimozioni esplicite).
+    """
+
+    def __init__(self, massimo, peso=None, alla_rimozione=None):
+        self.massimo = massimo
+        self._peso = peso or (lambda valore: 1)
+        self._alla_rimozione = alla_rimozione
+        self._dati = OrderedDict() # chiave -> (valore, peso)
+        self.peso_totale = 0
+
+    def get(self, chiave, predefinito=None):
+        """Restituisce il valore (segnandolo come usato di recente) o 'predefinito'."""
+        elemento = self._dati.get(chiave)
+        if elemento is None: return predefinito
+        self._dati.move_to_end(chiave)
+        return elemento[0]
+
+    def inserisci(self, chiave, valore):
+        """Aggiunge (o sostituisce) un elemento e scarta i meno recenti oltre il limite."""
+        self.rimuovi(chiave)
+        peso = self._peso(valore)
+        if peso > self.massimo: return
+        self._dati[chiave] = (valore, peso)
+        self.peso_totale += peso
+        self.riduci(self.massimo)
+
+    def rimuovi(self, chiave):
+        """Rimuove un elemento (se presente)."""
+        elemento = self._dati.pop(chiave, None)
+        if elemento is not None: self.peso_totale -= elemento[1]
+
+    def rimuovi_se(self, condizione):
+        """Rimuove gli elementi la cui chiave soddisfa 'condizione(chiave)'."""
+        for chiave in [c for c in self._dati if condizione(c)]:
+            self.rimuovi(chiave)
+
+    def riduci(self, limite):
+        """Scarta gli elementi meno recenti finché il peso totale non scende entro 'limite'."""
+        while self._dati and self.peso_totale > limite:
+            chiave, (valore, peso) = self._dati.popitem(last=False)
+            self.peso_totale -= peso
+            if self._alla_rimozione: self._alla_rimozione(chiave, valore)
+
+    def svuota(self):
+        """Rimuove tutti gli elementi."""
+        self._dati.clear()
+        self.peso_totale = 0
+
+    def __contains__(self, chiave):
+        return chiave in self._dati
+
+    def __len__(self):
+        return len(self._dati)
@@ -0,0 +1,284 @@
+# --- Catalogo Persistente delle Immagini ---
+# Conserva in un database SQLite (modalità WAL) i metadati di tutte le cartelle
+# aperte dall'utente, così la ricerca non deve ripartire da zero a ogni avvio.
+import os # Per operazioni sul sistema operativo (path, file)
+import sqlite3 # Database locale per il catalogo
+import hashlib # Per calcolare la chiave della cache miniature
+import time # Per convertire le date EXIF in timestamp
+from PIL import Image # Per leggere l'header delle immagini
+
+# Tag EXIF usati per la data di scatto
+EXIF_IFD_POINTER = 0x8769 # Sotto-IFD con i dati di scatto
+EXIF_DATETIME_ORIGINAL = 36867 # "DateTimeOriginal"
+EXIF_DATETIME = 306 # "DateTime" (IFD0, usato come ripiego)
+
+_MASCHERA_64 = (1 << 64) - 1
+
+
+def _con_segno(codice):
+    """Converte un intero senza segno a 64 bit nell'equivalente con segno (per SQLite)."""
+    return codice - (1 << 64) if codice >= (1 << 63) else codice
+
+
+def chiave_miniatura(path, dimensione, mtime):
+    """Restituisce la chiave con cui la miniatura di un file viene memorizzata in cache.
+    Cambia se il file viene modificato (dimensione o data di modifica diverse).
+    """
+    firma = f"{os.path.abspath(path)}|{dimensione}|{mtime:.6f}"
+    return hashlib.sha1(firma.encode("utf-8")).hexdigest()
+
+
+def leggi_data_scatto(img):
+    """Legge la data di scatto dai dati EXIF (se presenti) e la restituisce come timestamp."""
+    try:
+        exif = img.getexif()
+        valore = exif.get_ifd(EXIF_IFD_POINTER).get(EXIF_DATETIME_ORIGINAL) or exif.get(EXIF_DATETIME)
+        if not valore: return None
+        # Formato EXIF standard: "AAAA:MM:GG HH:MM:SS"
+        return time.mktime(time.strptime(str(valore).strip("\x00 ")[:19], "%Y:%m:%d %H:%M:%S"))
+    except Exception:
+        return None # EXIF assente o malformato: nessuna data
+
+
+def leggi_metadati(path, stat_result=None):
+    """Legge i metadati di un'immagine aprendo solo l'header (nessuna decodifica dei pixel)."""
+    st = stat_result or os.stat(path)
+    nome = os.path.basename(path)
+    metadati = {
+        "path": path,
+        "cartella": os.path.dirname(path),
+        "nome": nome,
+        "estensione": os.path.splitext(nome)[1].lower(),
+        "formato": None, "larghezza": None, "altezza": None, "modo": None,
+        "dimensione": st.st_size,
+        "mtime": st.st_mtime,
+        "data_scatto": None,
+        "chiave_miniatura": chiave_miniatura(path, st.st_size, st.st_mtime),
+    }
+    try:
+        with Image.open(path) as img:
+            metadati["larghezza"], metadati["altezza"] = img.size
+            metadati["formato"] = img.format
+            metadati["modo"] = img.mode
+            metadati["data_scatto"] = leggi_data_scatto(img)
+    except Exception as e: # File corrotto o non leggibile: resta in catalogo senza dimensioni
+        print(f"WARN: Impossibile leggere l'header di {path}: {e}")
+    return metadati
+
+
+class CatalogoImmagini:
+    """Catalogo persistente (SQLite) delle immagini di tutte le cartelle aperte.
+
+    Per ogni file conserva percorso, metadati, chiave della cache miniature e verdetto
+    dell'analisi steganografica. I nomi file sono indicizzati con FTS5, mentre
+    dimensioni, peso e data hanno indici B-tree dedicati.
+    """
+
+    # Colonne restituite dalle query (nello stesso ordine della SELECT)
+    COLONNE = ("path", "cartella", "nome", "estensione", "formato", "larghezza", "altezza", "modo",
+               "dimensione", "mtime", "data_scatto", "chiave_miniatura", "verdetto_stegano")
+
+    def __init__(self, db_path):
+        """Apre (o crea) il database del catalogo nel percorso indicato."""
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        # WAL: letture e scritture concorrenti, commit veloci
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.usa_trigrammi = True # Il tokenizer 'trigram' permette la ricerca per sottostringa
+        self._crea_schema()
+
+    def _crea_schema(self):
+        """Crea tabelle, indici e trigger se non esistono già."""
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS immagini (
+                id INTEGER PRIMARY KEY,
+                path TEXT NOT NULL UNIQUE,
+                cartella TEXT NOT NULL,
+                nome TEXT NOT NULL,
+                estensione TEXT NOT NULL,
+                formato TEXT,
+                larghezza INTEGER,
+                altezza INTEGER,
+                modo TEXT,
+                dimensione INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                data_scatto REAL,
+                chiave_miniatura TEXT,
+                verdetto_stegano INTEGER, -- NULL = non analizzata, 0 = nessun testo, 1 = testo trovato
+                dhash INTEGER, -- Hash percettivi a 64 bit (con segno), NULL = non ancora calcolati
+                phash INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS idx_immagini_cartella ON immagini(cartella, nome COLLATE NOCASE);
+            CREATE INDEX IF NOT EXISTS idx_immagini_risoluzione ON immagini(larghezza, altezza);
+            CREATE INDEX IF NOT EXISTS idx_immagini_dimensione ON immagini(dimensione);
+            CREATE INDEX IF NOT EXISTS idx_immagini_data ON immagini(data_scatto);
+        """)
+        # Migrazione dei cataloghi creati prima dell'introduzione degli hash percettivi
+        colonne = {row["name"] for row in self.conn.execute("PRAGMA table_info(immagini)")}
+        for colonna in ("dhash", "phash"):
+            if colonna not in colonne:
+                self.conn.execute(f"ALTER TABLE immagini ADD COLUMN {colonna} INTEGER")
+        try:
+            self.conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS immagini_fts USING fts5("
+                              "nome, content='immagini', content_rowid='id', tokenize='trigram')")
+        except sqlite3.OperationalError:
+            # SQLite < 3.34 non ha il tokenizer trigram: usa quello standard (ricerca per prefisso)
+            self.usa_trigrammi = False
+            self.conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS immagini_fts USING fts5("
+                              "nome, content='immagini', content_rowid='id')")
+        # Trigger che tengono l'indice FTS allineato alla tabella principale
+        self.conn.executescript("""
+            CREATE TRIGGER IF NOT EXISTS immagini_ai AFTER INSERT ON immagini BEGIN
+                INSERT INTO immagini_fts(rowid, nome) VALUES (new.id, new.nome);
+            END;
+            CREATE TRIGGER IF NOT EXISTS immagini_ad AFTER DELETE ON immagini BEGIN
+                INSERT INTO immagini_fts(immagini_fts, rowid, nome) VALUES ('delete', old.id, old.nome);
+            END;
+            CREATE TRIGGER IF NOT EXISTS immagini_au AFTER UPDATE OF nome ON immagini BEGIN
+                INSERT INTO immagini_fts(immagini_fts, rowid, nome) VALUES ('delete', old.id, old.nome);
+                INSERT INTO immagini_fts(rowid, nome) VALUES (new.id, new.nome);
+            END;
+        """)
+        self.conn.commit()
+
+    # --- Indicizzazione ---
+
+    def indicizza_cartella(self, cartella, estensioni):
+        """Sincronizza il catalogo con il contenuto di una cartella.
+        Rilegge l'header solo dei file nuovi o modificati e rimuove quelli spariti.
+        Restituisce il numero di file (ri)letti.
+        """
+        cartella = os.path.abspath(cartella)
+        estensioni = tuple(e.lower() for e in estensioni)
+        # Stato attuale del catalogo per questa cartella: path -> (dimensione, mtime)
+        noti = {row["path"]: (row["dimensione"], row["mtime"]) for row in
+                self.conn.execute("SELECT path, dimensione, mtime FROM immagini WHERE cartella = ?", (cartella,))}
+
+        presenti = set()
+        da_aggiornare = []
+        with os.scandir(cartella) as it:
+            for entry in it:
+                if not entry.name.lower().endswith(estensioni): continue
+                try:
+                    if not entry.is_file(): continue
+                    st = entry.stat()
+                except OSError: continue # File sparito durante la scansione
+                presenti.add(entry.path)
+                # Rilegge l'header solo se il file è nuovo o è cambiato
+                if noti.get(entry.path) != (st.st_size, st.st_mtime):
+                    da_aggiornare.append(leggi_metadati(entry.path, st))
+
+        spariti = [p for p in noti if p not in presenti]
+        with self.conn: # Un'unica transazione per tutta la cartella
+            for metadati in da_aggiornare:
+                self._inserisci(metadati)
+            self.conn.executemany("DELETE FROM immagini WHERE path = ?", [(p,) for p in spariti])
+        return len(da_aggiornare)
+
+    def _inserisci(self, metadati):
+        """Inserisce o aggiorna la riga di un file (azzerando verdetto stegano e hash)."""
+        self.conn.execute("""
+            INSERT INTO immagini (path, cartella, nome, estensione, formato, larghezza, altezza, modo,
+                                  dimensione, mtime, data_scatto, chiave_miniatura, verdetto_stegano)
+            VALUES (:path, :cartella, :nome, :estensione, :formato, :larghezza, :altezza, :modo,
+                    :dimensione, :mtime, :data_scatto, :chiave_miniatura, NULL)
+            ON CONFLICT(path) DO UPDATE SET
+                formato = excluded.formato, larghezza = excluded.larghezza, altezza = excluded.altezza,
+                modo = excluded.modo, dimensione = excluded.dimensione, mtime = excluded.mtime,
+                data_scatto = excluded.data_scatto, chiave_miniatura = excluded.chiave_miniatura,
+                verdetto_stegano = NULL, dhash = NULL, phash = NULL
+        """, metadati)
+
+    def aggiorna_file(self, path):
+        """Rilegge l'header di un singolo file (nuovo o modificato) e restituisce la sua voce aggiornata."""
+        metadati = leggi_metadati(path)
+        with self.conn:
+            self._inserisci(metadati)
+        metadati["verdetto_stegano"] = None
+        return metadati
+
+    def rimuovi_file(self, path):
+        """Rimuove un file dal catalogo (es. cancellato dal disco)."""
+        with self.conn:
+            self.conn.execute("DELETE FROM immagini WHERE path = ?", (path,))
+
+    def aggiorna_verdetto(self, path, verdetto):
+        """Salva l'esito dell'analisi steganografica di un file (True/False)."""
+        with self.conn:
+            self.conn.execute("UPDATE immagini SET verdetto_stegano = ? WHERE path = ?",
+                              (None if verdetto is None else int(bool(verdetto)), path))
+
+    def aggiorna_verdetti(self, verdetti):
+        """Salva in un'unica transazione gli esiti di molte analisi steganografiche: {path: True/False}."""
+        with self.conn:
+            self.conn.executemany("UPDATE immagini SET verdetto_stegano = ? WHERE path = ?",
+                                  [(int(bool(v)), path) for path, v in verdetti.items()])
+
+    def aggiorna_hash(self, hash_per_path):
+        """Salva gli hash percettivi calcolati: {path: (dhash, phash)} come interi senza segno a 64 bit."""
+        # SQLite conserva interi con segno: i codici vengono riportati nell'intervallo int64
+        righe = [(_con_segno(d), _con_segno(p), path) for path, (d, p) in hash_per_path.items()]
+        with self.conn:
+            self.conn.executemany("UPDATE immagini SET dhash = ?, phash = ? WHERE path = ?", righe)
+
+    def leggi_hash(self, paths):
+        """Restituisce {path: (dhash, phash)} per i file del catalogo con hash già calcolati."""
+        risultato = {}
+        paths = list(paths)
+        for inizio in range(0, len(paths), 500): # Limite sui parametri di una singola query
+            blocco = paths[inizio:inizio + 500]
+            for row in self.conn.execute(
+                    f"SELECT path, dhash, phash FROM immagini WHERE dhash IS NOT NULL AND path IN ({','.join('?' * len(blocco))})",
+                    blocco):
+                risultato[row["path"]] = (row["dhash"] & _MASCHERA_64, row["phash"] & _MASCHERA_64)
+        return risultato
+
+    # --- Ricerca ---
+
+    def cerca(self, termine="", cartella=None, estensioni=None):
+        """Cerca le immagini il cui nome contiene 'termine'.
+        Se 'cartella' è None cerca in tutto il catalogo. Restituisce una lista di dizionari
+        ordinata per nome (senza distinzione maiuscole/minuscole).
+        """
+        return self._cerca(self.conn, termine, cartella, estensioni)
+
+    def cerca_separata(self, termine="", cartella=None, estensioni=None):
+        """Come cerca(), ma con una connessione propria: si può chiamare da un altro thread."""
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        try: return self._cerca(conn, termine, cartella, estensioni)
+        finally: conn.close()
+
+    def _cerca(self, conn, termine, cartella, estensioni):
+        condizioni, parametri = [], []
+        termine = (termine or "").strip()
+        if cartella is not None:
+            condizioni.append("cartella = ?"); parametri.append(os.path.abspath(cartella))
+        if estensioni is not None:
+            estensioni = [e.lower() for e in estensioni]
+            if not estensioni: return [] # Nessun formato attivo
+            condizioni.append(f"estensione IN ({','.join('?' * len(estensioni))})"); parametri.extend(estensioni)
+        if termine:
+            if self.usa_trigrammi and len(termine) >= 3:
+                # Ricerca per sottostringa servita dall'indice FTS5 a trigrammi
+                condizioni.append("id IN (SELECT rowid FROM immagini_fts WHERE immagini_fts MATCH ?)")
+                parametri.append('"' + termine.replace('"', '""') + '"')
+            else:
+                # Termini troppo corti per i trigrammi: confronto diretto sul nome
+                condizioni.append("instr(lower(nome), ?) > 0"); parametri.append(termine.lower())
+
+        query = f"SELECT {', '.join(self.COLONNE)} FROM immagini"
+        if condizioni: query += " WHERE " + " AND ".join(condizioni)
+        query += " ORDER BY nome COLLATE NOCASE, path"
+        return [dict(row) for row in conn.execute(query, parametri)]
+
+    def chiudi(self):
+        """Chiude la connessione al database (scrivendo il checkpoint WAL)."""
+        try:
+            self.conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+            self.conn.close()
+        except sqlite3.Error:
+            pass
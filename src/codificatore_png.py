@@ -0,0 +1,148 @@
+# --- Codifica PNG con Profili (per le immagini con testo nascosto) ---
+# Scrive i PNG prodotti dalla steganografia con profili di codifica diversi,
+# da "Veloce" (zlib livello 1, un solo filtro fisso) a "Compatto" (livello 9,
+# ricerca del filtro migliore riga per riga). Le righe vengono compresse a
+# blocchi indipendenti (Z_FULL_FLUSH): con riusa_blocchi=True un blocco identico
+# a uno già compresso (es. la parte di una copertina che il testo nascosto non
+# tocca) viene riusato dalla cache invece di essere compresso di nuovo.
+import os # Per distinguere un percorso da un file già aperto
+import time # Per misurare il tempo di codifica
+import contextlib # File aperti dal chiamante: da non chiudere
+import zlib # Compressione DEFLATE dei dati PNG
+import struct # Intestazioni dei chunk PNG
+import numpy as np # Filtri PNG vettorizzati
+
+from cache import CacheLRU # Cache dei blocchi già compressi
+from miniature import normalizza_modo # Conversione in RGB/RGBA
+
+# Tipi di filtro PNG (specifica PNG, sezione 9)
+FILTRO_NESSUNO, FILTRO_SUB, FILTRO_UP, FILTRO_MEDIA, FILTRO_PAETH = range(5)
+FILTRO_ADATTIVO = -1 # Sceglie per ogni riga il filtro con la somma minima (euristica di libpng)
+
+# Profili di codifica: livello zlib, strategia zlib e filtro delle righe
+PROFILI_PNG = {
+    "Veloce": {"livello": 1, "strategia": zlib.Z_DEFAULT_STRATEGY, "filtro": FILTRO_UP},
+    "Bilanciato": {"livello": 6, "strategia": zlib.Z_DEFAULT_STRATEGY, "filtro": FILTRO_PAETH},
+    "Compatto": {"livello": 9, "strategia": zlib.Z_FILTERED, "filtro": FILTRO_ADATTIVO},
+}
+PROFILO_PREDEFINITO = "Bilanciato"
+
+RIGHE_BLOCCO = 64 # Righe compresse in ogni blocco indipendente
+_FIRMA_PNG = b"\x89PNG\r\n\x1a\n"
+_TIPI_COLORE = {"L": 0, "RGB": 2, "LA": 4, "RGBA": 6} # Modo PIL -> tipo colore PNG (8 bit per canale)
+_MOD_ADLER = 65521
+
+# Blocchi compressi, indicizzati per contenuto (filtrato) e parametri zlib.
+# Usata solo da chi chiede riusa_blocchi (la GUI, che la affida al gestore della memoria)
+_cache_blocchi = CacheLRU(128 * 1024 * 1024, peso=len)
+
+
+def memoria_blocchi():
+    """Byte dei blocchi compressi conservati in cache."""
+    return _cache_blocchi.peso_totale
+
+
+def riduci_blocchi(limite):
+    """Scarta i blocchi usati meno di recente finché la cache non scende entro 'limite' byte."""
+    _cache_blocchi.riduci(limite)
+
+
+def _adler32_combina(adler1, adler2, lunghezza2):
+    """Adler-32 della concatenazione di due dati, dati i checksum delle due parti (come adler32_combine di zlib)."""
+    resto = lunghezza2 % _MOD_ADLER
+    somma1 = adler1 & 0xFFFF
+    somma2 = (resto * somma1) % _MOD_ADLER
+    somma1 = (somma1 + (adler2 & 0xFFFF) + _MOD_ADLER - 1) % _MOD_ADLER
+    somma2 = (somma2 + (adler1 >> 16) + (adler2 >> 16) + _MOD_ADLER - resto) % _MOD_ADLER
+    return somma1 | (somma2 << 16)
+
+
+def _filtra(righe, precedente, canali, filtro):
+    """Applica il filtro PNG a un blocco di righe (array int16 righe x byte).
+    'precedente' è l'ultima riga (non filtrata) del blocco prima, o zeri.
+    Restituisce i byte del blocco con il tipo di filtro in testa a ogni riga.
+    """
+    su = np.vstack([precedente[None, :], righe[:-1]]) # Riga sopra (b)
+    sinistra = np.zeros_like(righe); sinistra[:, canali:] = righe[:, :-canali] # Pixel a sinistra (a)
+    candidati = {}
+    if filtro in (FILTRO_NESSUNO, FILTRO_ADATTIVO): candidati[FILTRO_NESSUNO] = righe
+    if filtro in (FILTRO_SUB, FILTRO_ADATTIVO): candidati[FILTRO_SUB] = righe - sinistra
+    if filtro in (FILTRO_UP, FILTRO_ADATTIVO): candidati[FILTRO_UP] = righe - su
+    if filtro in (FILTRO_MEDIA, FILTRO_ADATTIVO): candidati[FILTRO_MEDIA] = righe - ((sinistra + su) >> 1)
+    if filtro in (FILTRO_PAETH, FILTRO_ADATTIVO):
+        diagonale = np.zeros_like(righe); diagonale[:, canali:] = su[:, :-canali] # In alto a sinistra (c)
+        pa, pb, pc = np.abs(su - diagonale), np.abs(sinistra - diagonale), np.abs(sinistra + su - 2 * diagonale)
+        predetto = np.where((pa <= pb) & (pa <= pc), sinistra, np.where(pb <= pc, su, diagonale))
+        candidati[FILTRO_PAETH] = righe - predetto
+
+    if filtro == FILTRO_ADATTIVO:
+        tipi = list(candidati)
+        # Somma dei valori filtrati letti come byte con segno: più è bassa, meglio comprime
+        somme = np.stack([np.abs(((candidati[t] + 128) & 0xFF) - 128).sum(axis=1) for t in tipi])
+        scelta = somme.argmin(axis=0)
+        filtrati = np.choose(scelta[:, None], [candidati[t] for t in tipi])
+        tipo_righe = np.asarray(tipi, np.uint8)[scelta]
+    else:
+        filtrati = candidati[filtro]
+        tipo_righe = np.full(len(righe), filtro, np.uint8)
+    return np.hstack([tipo_righe[:, None], (filtrati & 0xFF).astype(np.uint8)]).tobytes()
+
+
+def _chunk(tipo, dati):
+    """Costruisce un chunk PNG (lunghezza, tipo, dati, CRC)."""
+    return struct.pack(">I", len(dati)) + tipo + dati + struct.pack(">I", zlib.crc32(tipo + dati))
+
+
+def salva_png(img, path, profilo=PROFILO_PREDEFINITO, riusa_blocchi=False):
+    """Salva un'immagine PIL come PNG con il profilo indicato ('path' può essere anche un file aperto in scrittura).
+    Con riusa_blocchi=True i blocchi compressi restano in cache per i salvataggi successivi della stessa
+    copertina; l'esportazione e il servizio, dove i blocchi non si ripetono, lo lasciano disattivato.
+    Restituisce un rapporto: profilo, secondi, byte, blocchi totali e blocchi riusati dalla cache.
+    """
+    inizio = time.perf_counter()
+    parametri = PROFILI_PNG[profilo]
+    if img.mode not in _TIPI_COLORE: img = normalizza_modo(img)
+    pixel = np.asarray(img, dtype=np.uint8)
+    altezza, larghezza = pixel.shape[:2]
+    canali = 1 if pixel.ndim == 2 else pixel.shape[2]
+    righe = pixel.reshape(altezza, larghezza * canali)
+
+    parti, adler, riusati = [], 1, 0
+    firma_parametri = (parametri["livello"], parametri["strategia"], parametri["filtro"])
+    for r0 in range(0, altezza, RIGHE_BLOCCO):
+        blocco = righe[r0:r0 + RIGHE_BLOCCO].astype(np.int16)
+        precedente = righe[r0 - 1].astype(np.int16) if r0 else np.zeros(larghezza * canali, np.int16)
+        dati = _filtra(blocco, precedente, canali, parametri["filtro"])
+        adler_blocco = zlib.adler32(dati)
+        compresso = None
+        if riusa_blocchi:
+            chiave = (firma_parametri, len(dati), adler_blocco, zlib.crc32(dati))
+            compresso = _cache_blocchi.get(chiave)
+        if compresso is None:
+            # Compressore nuovo per ogni blocco + FULL_FLUSH: nessun riferimento ai blocchi precedenti
+            compressore = zlib.compressobj(parametri["livello"], zlib.DEFLATED, -15, 9, parametri["strategia"])
+            compresso = compressore.compress(dati) + compressore.flush(zlib.Z_FULL_FLUSH)
+            if riusa_blocchi: _cache_blocchi.inserisci(chiave, compresso)
+        else:
+            riusati += 1
+        parti.append(compresso)
+        adler = _adler32_combina(adler, adler_blocco, len(dati))
+    parti.append(b"\x03\x00") # Blocco DEFLATE finale vuoto
+    # Flusso zlib: intestazione (0x78 0x9C), blocchi DEFLATE, Adler-32 dei dati non compressi
+    flusso = b"\x78\x9c" + b"".join(parti) + struct.pack(">I", adler)
+
+    intestazione = struct.pack(">IIBBBBB", larghezza, altezza, 8, _TIPI_COLORE[img.mode], 0, 0, 0)
+    with (open(path, "wb") if isinstance(path, (str, os.PathLike)) else contextlib.nullcontext(path)) as f:
+        f.write(_FIRMA_PNG)
+        f.write(_chunk(b"IHDR", intestazione))
+        for i in range(0, len(flusso), 1 << 20): # IDAT da 1 MB
+            f.write(_chunk(b"IDAT", flusso[i:i + (1 << 20)]))
+        f.write(_chunk(b"IEND", b""))
+        dimensione = f.tell()
+    return {
+        "profilo": profilo,
+        "secondi": time.perf_counter() - inizio,
+        "byte": dimensione,
+        "blocchi": -(-altezza // RIGHE_BLOCCO),
+        "blocchi_riusati": riusati,
+    }
@@ -0,0 +1,309 @@
+# --- Decodifica in Processi Separati ---
+# Le immagini vengono decodificate da un piccolo gruppo di processi di lavoro:
+# un file corrotto o enorme può bloccare o far terminare solo il suo processo,
+# mai la finestra Tk, e la decodifica usa più core senza contendersi il GIL.
+# I pixel tornano al processo principale in un blocco di memoria condivisa che
+# PIL mappa direttamente (Image.frombuffer): nel passaggio non vengono copiati.
+# Ogni lavoro ha un tempo massimo; un processo che lo supera o che termina
+# viene sostituito e il lavoro fallisce con ErroreDecodifica.
+# Con un lettore di file remoti (io_remoto) i file delle cartelle di rete vengono
+# letti dal processo principale e passati ai processi di lavoro come byte.
+import io # I file già letti arrivano ai processi di lavoro come byte
+import os # Per il numero di core e la dimensione delle pagine
+import time # Orologio monotono per le scadenze
+import threading # Il coordinatore dei processi gira in un thread separato
+import multiprocessing # Processi di lavoro ('spawn') e pipe
+from multiprocessing import shared_memory # Blocchi di pixel condivisi
+from multiprocessing.connection import wait # Attesa su pipe e processi insieme
+from collections import deque # Lavori in attesa
+from concurrent.futures import Future # Risultato consegnato al chiamante
+from PIL import Image # Per manipolazione immagini
+
+from miniature import crea_miniatura, adatta_immagine, decodifica_livello, normalizza_modo
+
+try:
+    import resource # Solo Unix: limite di memoria dei processi di lavoro
+except ImportError:
+    resource = None
+
+TIMEOUT_DECODIFICA = 20.0 # Secondi massimi per un singolo lavoro
+MEMORIA_LAVORATORE = 1536 * 1024 * 1024 # Byte che un processo può allocare oltre a quelli usati all'avvio
+
+
+class ErroreDecodifica(Exception):
+    """Decodifica fallita, scaduta o interrotta dalla terminazione del processo di lavoro."""
+
+
+# --- Lato processo di lavoro ---
+
+def _limita_memoria(memoria_massima):
+    """Linux: limita lo spazio di indirizzamento del processo a quello già in uso più 'memoria_massima'."""
+    if resource is None or not memoria_massima: return
+    try:
+        with open("/proc/self/statm") as f:
+            in_uso = int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+        _, massimo = resource.getrlimit(resource.RLIMIT_AS)
+        limite = in_uso + memoria_massima
+        if massimo != resource.RLIM_INFINITY: limite = min(limite, massimo)
+        resource.setrlimit(resource.RLIMIT_AS, (limite, massimo))
+    except (OSError, ValueError, AttributeError):
+        pass # Altri sistemi: resta il controllo sulle dimensioni dichiarate nell'header
+
+
+def _sorgente(path):
+    """Il percorso, o un buffer nuovo (posizionato all'inizio) per i byte di un file già letto."""
+    return io.BytesIO(path) if isinstance(path, bytes) else path
+
+
+def _scala_jpeg(img, ricetta):
+    """Scala per lato (1, 2, 4 o 8) a cui draft() farà decodificare il JPEG per la ricetta; 1 per gli altri formati."""
+    if img.format != "JPEG" or len(img.tile) != 1: return 1 # Senza un unico tile draft() non riduce
+    tipo, parametro = ricetta
+    larghezza, altezza = img.size
+    if tipo == "livello":
+        richiesta = (larghezza >> parametro, altezza >> parametro)
+    else:
+        rapporto = min(parametro[0] / larghezza, parametro[1] / altezza)
+        if tipo == "miniatura": rapporto = min(rapporto, 1.0) * 2 # thumbnail() chiede il doppio (reducing_gap)
+        richiesta = (int(larghezza * rapporto), int(altezza * rapporto))
+    # Stesso calcolo di JpegImageFile.draft()
+    scala = min(larghezza // max(1, richiesta[0]), altezza // max(1, richiesta[1]))
+    return next(s for s in (8, 4, 2, 1) if scala >= s or s == 1)
+
+
+def _controlla_dimensioni(path, ricetta, memoria_massima):
+    """Rifiuta prima di decodificarle le immagini i cui pixel non starebbero nel limite di memoria."""
+    with Image.open(_sorgente(path)) as img:
+        larghezza, altezza = img.size
+        scala = _scala_jpeg(img, ricetta) # I JPEG ridotti vengono decodificati in scala (fino a 1/8 per lato)
+    if memoria_massima and larghezza * altezza * 4 // (scala * scala) > memoria_massima:
+        raise MemoryError(f"immagine troppo grande ({larghezza}x{altezza})")
+
+
+def _esegui(path, ricetta):
+    """Decodifica secondo la ricetta: ("miniatura", dimensione), ("adatta", dimensione) o ("livello", k)."""
+    tipo, parametro = ricetta
+    path = _sorgente(path)
+    if tipo == "miniatura": img = crea_miniatura(path, parametro)
+    elif tipo == "adatta": img = adatta_immagine(path, parametro)
+    elif tipo == "livello": img = decodifica_livello(path, parametro)
+    else: raise ValueError(f"Ricetta di decodifica sconosciuta: {tipo}")
+    # 4 byte per pixel (RGBX o RGBA): sono i modi che PIL sa mappare da un buffer senza copiarlo
+    return img if img.mode in ("RGBX", "RGBA") else normalizza_modo(img, opaco="RGBX")
+
+
+def _lavoratore(conn, memoria_massima):
+    """Ciclo di un processo di lavoro: riceve (path o byte del file, ricetta), risponde con il blocco condiviso o l'errore."""
+    _limita_memoria(memoria_massima)
+    while True:
+        try: lavoro = conn.recv()
+        except (EOFError, OSError): return # Il processo principale è terminato
+        if lavoro is None: return
+        path, ricetta = lavoro
+        try:
+            _controlla_dimensioni(path, ricetta, memoria_massima)
+            img = _esegui(path, ricetta)
+            dati = img.tobytes()
+            blocco = shared_memory.SharedMemory(create=True, size=max(1, len(dati)))
+            blocco.buf[:len(dati)] = dati
+            del dati
+            risposta = ("ok", blocco.name, img.mode, img.size)
+            blocco.close() # Il blocco resta nel sistema: lo rimuove il processo principale dopo averlo aperto
+        except MemoryError as e:
+            risposta = ("errore", f"Memoria insufficiente per decodificare il file: {e}")
+        except Exception as e:
+            risposta = ("errore", f"{type(e).__name__}: {e}")
+        conn.send(risposta)
+
+
+# --- Lato processo principale ---
+
+class _BloccoCondiviso(shared_memory.SharedMemory):
+    """Blocco condiviso che tollera la chiusura mentre PIL ne usa ancora il buffer
+    (all'uscita del programma gli oggetti vengono distrutti in ordine qualsiasi).
+    """
+
+    def close(self):
+        try: super().close()
+        except BufferError: pass # Ancora mappato da un'immagine: la memoria viene liberata con il processo
+
+
+def _apri_blocco(nome, modo, dimensione):
+    """Mappa il blocco condiviso come immagine PIL (senza copiarlo) e lo rimuove dal sistema.
+    La mappatura resta valida finché l'immagine esiste.
+    """
+    blocco = _BloccoCondiviso(name=nome)
+    try: blocco.unlink() # Nessun altro deve aprirlo: la memoria viene liberata con l'ultima mappatura
+    except FileNotFoundError: pass # Windows: i blocchi spariscono da soli
+    img = Image.frombuffer(modo, dimensione, blocco.buf, "raw", modo, 0, 1)
+    img._blocco_condiviso = blocco # Riferimento: il blocco vive quanto l'immagine (e viene chiuso dopo di lei)
+    return img
+
+
+class DecodificatoreEsterno:
+    """Gruppo di processi che decodificano immagini su richiesta.
+
+    decodifica(path, ricetta) restituisce subito un Future con l'immagine PIL (o
+    ErroreDecodifica). I processi partono alla prima richiesta; se non è possibile
+    avviarli 'disponibile' diventa False e i chiamanti decodificano in proprio.
+    Con un 'lettore' (LettoreFileRemoti) i file delle cartelle di rete vengono prima
+    letti in parallelo (o presi dalla sua cache) e decodificati dai byte in memoria.
+    """
+
+    def __init__(self, processi=None, timeout=TIMEOUT_DECODIFICA, memoria_massima=MEMORIA_LAVORATORE, lettore=None):
+        self.processi = processi or min(4, os.cpu_count() or 1)
+        self.timeout = timeout
+        self.memoria_massima = memoria_massima
+        self.disponibile = True
+        self.lettore = lettore
+        self.riavvii = 0 # Processi sostituiti dopo una terminazione o un timeout
+        self._contesto = multiprocessing.get_context("spawn") # Nessun fork() di un processo con Tk e thread
+        self._attesa = deque() # (Future, path, ricetta) non ancora assegnati
+        self._lock = threading.Lock()
+        self._lavoratori = []
+        self._thread = None
+        self._chiuso = False
+        self._sveglia_lettura, self._sveglia_scrittura = self._contesto.Pipe(duplex=False)
+
+    def decodifica(self, path, ricetta):
+        """Accoda una decodifica e restituisce il suo Future (annullabile finché non è iniziata)."""
+        futuro = Future()
+        with self._lock:
+            if self._chiuso or not self.disponibile: raise ErroreDecodifica("Decodificatore non disponibile")
+            if not self._lavoratori:
+                try:
+                    self._lavoratori = [self._avvia_lavoratore() for _ in range(self.processi)]
+                except Exception as e: # Es. ambiente senza processi: i chiamanti decodificano in proprio
+                    self.disponibile = False
+                    print(f"WARN: Impossibile avviare i processi di decodifica: {e}")
+                    raise ErroreDecodifica(str(e))
+                self._thread = threading.Thread(target=self._coordina, daemon=True)
+                self._thread.start()
+            if self.lettore is None or not self.lettore.e_remoto(path):
+                self._attesa.append((futuro, path, ricetta))
+                self._sveglia()
+                return futuro
+        # Cartella di rete: il lavoro viene accodato quando i byte del file sono pronti
+        self.lettore.leggi_async(path).add_done_callback(lambda lettura: self._accoda(futuro, path, ricetta, lettura))
+        return futuro
+
+    def _accoda(self, futuro, path, ricetta, lettura):
+        """Accoda un lavoro la cui lettura è terminata (dai byte letti, o dal percorso se non è stato possibile)."""
+        dati = None if lettura.cancelled() or lettura.exception() else lettura.result()
+        with self._lock:
+            if self._chiuso:
+                if futuro.set_running_or_notify_cancel(): futuro.set_exception(ErroreDecodifica("Decodificatore chiuso"))
+                return
+            self._attesa.append((futuro, dati if dati is not None else path, ricetta))
+            self._sveglia()
+
+    def apri(self, path):
+        """Sorgente per Image.open() nelle decodifiche fatte in proprio (dalla cache del lettore se il file è remoto)."""
+        return self.lettore.apri(path) if self.lettore is not None else path
+
+    def precarica(self, percorsi):
+        """Anticipa la lettura dei file che serviranno a breve (solo quelli delle cartelle di rete)."""
+        if self.lettore is not None: self.lettore.precarica(percorsi)
+
+    def chiudi(self):
+        """Ferma i processi; i lavori in attesa falliscono."""
+        with self._lock:
+            if self._chiuso: return
+            self._chiuso = True
+            self._sveglia()
+        if self._thread is not None: self._thread.join(timeout=2)
+
+    def _sveglia(self):
+        """Interrompe l'attesa del coordinatore (da chiamare con il lock)."""
+        try: self._sveglia_scrittura.send_bytes(b"!")
+        except OSError: pass
+
+    def _avvia_lavoratore(self):
+        conn, conn_figlio = self._contesto.Pipe()
+        processo = self._contesto.Process(target=_lavoratore, args=(conn_figlio, self.memoria_massima), daemon=True)
+        processo.start()
+        conn_figlio.close() # Resta solo nel processo di lavoro
+        return {"processo": processo, "conn": conn, "lavoro": None} # lavoro: (Future, scadenza)
+
+    def _sostituisci(self, lavoratore, motivo):
+        """Termina un processo bloccato o già morto, fa fallire il suo lavoro e ne avvia uno nuovo."""
+        if lavoratore["lavoro"] is not None:
+            lavoratore["lavoro"][0].set_exception(ErroreDecodifica(motivo))
+            lavoratore["lavoro"] = None
+        processo = lavoratore["processo"]
+        if processo.is_alive(): processo.kill()
+        processo.join(timeout=1)
+        lavoratore["conn"].close()
+        self.riavvii += 1
+        print(f"WARN: Processo di decodifica sostituito: {motivo}")
+        if not self._chiuso: lavoratore.update(self._avvia_lavoratore())
+
+    def _prossimo(self):
+        """Prossimo lavoro in attesa non annullato, o None."""
+        with self._lock:
+            while self._attesa:
+                futuro, path, ricetta = self._attesa.popleft()
+                if futuro.set_running_or_notify_cancel(): return futuro, path, ricetta
+        return None
+
+    def _completa(self, lavoratore, risposta):
+        futuro, _ = lavoratore["lavoro"]
+        lavoratore["lavoro"] = None
+        if risposta[0] == "ok":
+            try: futuro.set_result(_apri_blocco(*risposta[1:]))
+            except Exception as e: futuro.set_exception(ErroreDecodifica(f"Blocco condiviso non leggibile: {e}"))
+        else:
+            futuro.set_exception(ErroreDecodifica(risposta[1]))
+
+    def _coordina(self):
+        """Assegna i lavori ai processi liberi, raccoglie le risposte e sorveglia scadenze e terminazioni."""
+        try:
+            while not self._chiuso:
+                for lavoratore in self._lavoratori:
+                    if lavoratore["lavoro"] is not None: continue
+                    elemento = self._prossimo()
+                    if elemento is None: break
+                    futuro, path, ricetta = elemento
+                    lavoratore["lavoro"] = (futuro, time.monotonic() + self.timeout)
+                    try: lavoratore["conn"].send((path, ricetta))
+                    except OSError: self._sostituisci(lavoratore, "Processo di decodifica non raggiungibile")
+
+                scadenze = [l["lavoro"][1] for l in self._lavoratori if l["lavoro"] is not None]
+                attesa = max(0.0, min(scadenze) - time.monotonic()) if scadenze else None
+                oggetti = [self._sveglia_lettura] + [l["conn"] for l in self._lavoratori] + [l["processo"].sentinel for l in self._lavoratori]
+                pronti = wait(oggetti, attesa)
+                if self._sveglia_lettura in pronti:
+                    while self._sveglia_lettura.poll(): self._sveglia_lettura.recv_bytes()
+
+                ora = time.monotonic()
+                for lavoratore in self._lavoratori:
+                    if lavoratore["conn"] in pronti:
+                        try: risposta = lavoratore["conn"].recv()
+                        except (EOFError, OSError):
+                            self._sostituisci(lavoratore, "Processo di decodifica terminato (file corrotto?)"); continue
+                        if lavoratore["lavoro"] is not None: self._completa(lavoratore, risposta)
+                    elif lavoratore["processo"].sentinel in pronti:
+                        self._sostituisci(lavoratore, "Processo di decodifica terminato (file corrotto?)")
+                    elif lavoratore["lavoro"] is not None and ora >= lavoratore["lavoro"][1]:
+                        self._sostituisci(lavoratore, f"Decodifica oltre il tempo massimo ({self.timeout:g} s)")
+        except Exception as e: # Es. impossibile riavviare un processo: da qui in poi si decodifica in proprio
+            self.disponibile = False
+            print(f"WARN: Decodifica in processi separati disattivata: {e}")
+        finally:
+            for lavoratore in self._lavoratori:
+                if lavoratore["lavoro"] is not None:
+                    # Lavoro in corso: raccoglie la risposta per non lasciare il blocco condiviso nel sistema
+                    try:
+                        if lavoratore["conn"].poll(1): self._completa(lavoratore, lavoratore["conn"].recv())
+                    except (EOFError, OSError): pass
+                    if lavoratore["lavoro"] is not None:
+                        lavoratore["lavoro"][0].set_exception(ErroreDecodifica("Decodificatore chiuso"))
+                try: lavoratore["conn"].send(None)
+                except OSError: pass
+            for lavoratore in self._lavoratori:
+                lavoratore["processo"].join(timeout=1)
+                if lavoratore["processo"].is_alive(): lavoratore["processo"].kill()
+            with self._lock:
+                while self._attesa:
+                    futuro, _, _ = self._attesa.popleft()
+                    if futuro.set_running_or_notify_cancel(): futuro.set_exception(ErroreDecodifica("Decodificatore chiuso"))
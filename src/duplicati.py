@@ -0,0 +1,214 @@
+# --- Ricerca di Duplicati con Hash Percettivi ---
+# dHash e pHash a 64 bit calcolati in modo vettorizzato (NumPy) su interi lotti di
+# immagini, e una tabella multi-indice per trovare i codici vicini in distanza di
+# Hamming senza confrontare ogni coppia. Le copie con testo nascosto (LSB) hanno
+# hash identici o quasi all'originale, quindi finiscono nello stesso gruppo.
+import os # Per il numero di core disponibili
+import threading # Il calcolo per la GUI gira in un thread separato
+from concurrent.futures import ThreadPoolExecutor # Decodifica parallela (PIL rilascia il GIL)
+import numpy as np # Calcoli vettorizzati
+from PIL import Image # Per manipolazione immagini
+
+from miniature import crea_miniatura # Stessa decodifica ridotta usata dalla griglia
+
+DIMENSIONE_DECODIFICA = (64, 64) # Decodifica ridotta sufficiente per gli hash
+LATO_PHASH = 32 # Lato dell'immagine su cui si calcola la DCT del pHash
+SOGLIA_MASSIMA = 7 # Distanza massima supportata dall'indice (4 blocchi, varianti a un bit)
+
+
+def _matrice_dct(n):
+    """Matrice della DCT-II ortonormale n x n."""
+    k = np.arange(n)[:, None]; i = np.arange(n)[None, :]
+    d = np.sqrt(2.0 / n) * np.cos(np.pi * (2 * i + 1) * k / (2 * n))
+    d[0] /= np.sqrt(2.0)
+    return d
+
+_DCT = _matrice_dct(LATO_PHASH)
+
+
+def _impacchetta(bit):
+    """Converte una matrice (n, 64) di booleani in un array di n codici uint64."""
+    return np.packbits(bit, axis=1).view(">u8").ravel().astype(np.uint64)
+
+
+def popcount(x):
+    """Numero di bit a 1 di ogni elemento di un array uint64."""
+    if hasattr(np, "bitwise_count"): return np.bitwise_count(x) # NumPy >= 2.0
+    return np.unpackbits(np.ascontiguousarray(x).view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+
+def matrici_hash(img):
+    """Prepara da un'immagine PIL le due matrici in scala di grigi usate dagli hash."""
+    grigia = img.convert("L")
+    piccola_d = np.asarray(grigia.resize((9, 8), Image.Resampling.BILINEAR), np.float32)
+    piccola_p = np.asarray(grigia.resize((LATO_PHASH, LATO_PHASH), Image.Resampling.BILINEAR), np.float32)
+    return piccola_d, piccola_p
+
+
+def hash_lotto(matrici_d, matrici_p):
+    """Calcola dHash e pHash per un lotto di immagini in un colpo solo.
+    matrici_d: (n, 8, 9); matrici_p: (n, 32, 32). Restituisce due array uint64.
+    """
+    n = len(matrici_d)
+    # dHash: ogni pixel è più luminoso del vicino a sinistra?
+    dhash = _impacchetta((matrici_d[:, :, 1:] > matrici_d[:, :, :-1]).reshape(n, 64))
+    # pHash: DCT 2D di tutto il lotto con due prodotti matriciali, poi le 8x8 frequenze più basse
+    dct = _DCT @ matrici_p @ _DCT.T
+    basse = dct[:, :8, :8].reshape(n, 64)
+    mediana = np.median(basse[:, 1:], axis=1) # Esclude la componente continua
+    phash = _impacchetta(basse > mediana[:, None])
+    return dhash, phash
+
+
+def calcola_hash_file(percorsi, lotto=64, avanzamento=None, annulla=None):
+    """Calcola (dhash, phash) per ogni file; None per i file illeggibili.
+    La decodifica ridotta gira in parallelo su un pool di thread, gli hash per lotti.
+    'avanzamento(fatti, totale)' viene chiamata dopo ogni lotto. Se l'evento 'annulla'
+    viene impostato il calcolo si ferma dopo il lotto in corso (i file rimasti restano None).
+    """
+    def _prepara(path):
+        # Niente miniature EXIF: dopo una modifica possono essere rimaste quelle dell'originale.
+        # Pixel nel verso salvato, come gli hash già conservati nel catalogo
+        try: return matrici_hash(crea_miniatura(path, DIMENSIONE_DECODIFICA, usa_incorporata=False, orienta=False))
+        except Exception as e:
+            print(f"WARN: Impossibile calcolare l'hash di {path}: {e}")
+            return None
+
+    risultati = [None] * len(percorsi)
+    with ThreadPoolExecutor(max_workers=os.cpu_count() or 4) as pool:
+        for inizio in range(0, len(percorsi), lotto):
+            if annulla is not None and annulla.is_set(): break
+            matrici = list(pool.map(_prepara, percorsi[inizio:inizio + lotto]))
+            validi = [i for i, m in enumerate(matrici) if m is not None]
+            if validi:
+                dhash, phash = hash_lotto(np.stack([matrici[i][0] for i in validi]),
+                                          np.stack([matrici[i][1] for i in validi]))
+                for k, i in enumerate(validi):
+                    risultati[inizio + i] = (int(dhash[k]), int(phash[k]))
+            if avanzamento: avanzamento(min(inizio + lotto, len(percorsi)), len(percorsi))
+    return risultati
+
+
+class CalcoloImpronte:
+    """Calcola in background (calcola_hash_file) gli hash di una lista di file.
+
+    Il thread della GUI legge 'fatti' e 'terminato' per l'avanzamento, chiama annulla()
+    per interrompere dopo il lotto in corso e, alla fine, legge 'hash': {path: (dhash, phash)}
+    dei file calcolati (solo una parte se il calcolo è stato annullato).
+    """
+
+    def __init__(self, percorsi):
+        self.percorsi = list(percorsi)
+        self.fatti = 0
+        self.hash = {}
+        self.annullato = False
+        self.terminato = False
+        self._annulla = threading.Event()
+
+    @property
+    def totale(self):
+        return len(self.percorsi)
+
+    def avvia(self):
+        """Avvia il calcolo in background."""
+        threading.Thread(target=self._esegui, daemon=True).start()
+
+    def _esegui(self):
+        try:
+            risultati = calcola_hash_file(self.percorsi, avanzamento=self._avanzamento, annulla=self._annulla)
+            self.hash = {p: h for p, h in zip(self.percorsi, risultati) if h}
+        except Exception as e: # Non deve lasciare la GUI in attesa
+            print(f"WARN: Calcolo delle impronte interrotto: {e}")
+        finally:
+            self.terminato = True
+
+    def _avanzamento(self, fatti, totale):
+        self.fatti = fatti
+
+    def annulla(self):
+        """Interrompe il calcolo dopo il lotto in corso (gli hash già calcolati restano validi)."""
+        self.annullato = True
+        self._annulla.set()
+
+
+class IndiceMultiHash:
+    """Tabella multi-indice per codici a 64 bit divisi in 4 blocchi da 16 bit.
+
+    Se due codici distano al massimo 7 bit, per il principio dei cassetti almeno uno
+    dei 4 blocchi differisce al più di un bit: basta cercare, blocco per blocco, il
+    valore stesso e le sue 16 varianti a un bit di distanza. Con 65536 valori per
+    blocco i "secchi" restano minuscoli anche su centinaia di migliaia di immagini.
+    """
+
+    BLOCCHI = 4
+    BIT_BLOCCO = 16
+
+    def __init__(self, codici):
+        self.codici = np.asarray(codici, np.uint64)
+        self._tabelle = [] # Per blocco: (valori del blocco, posizioni ordinate per valore, valori ordinati)
+        maschera = np.uint64((1 << self.BIT_BLOCCO) - 1)
+        for b in range(self.BLOCCHI):
+            blocco = ((self.codici >> np.uint64(self.BIT_BLOCCO * b)) & maschera).astype(np.int64)
+            ordine = np.argsort(blocco, kind="stable")
+            self._tabelle.append((blocco, ordine, blocco[ordine]))
+        # Varianti da cercare in ogni blocco: il valore stesso e quelli a un bit di distanza
+        self._varianti = [0] + [1 << k for k in range(self.BIT_BLOCCO)]
+
+    def vicini(self, i, soglia):
+        """Posizioni dei codici a distanza di Hamming <= soglia dal codice in posizione i (incluso i)."""
+        soglia = min(soglia, SOGLIA_MASSIMA)
+        secchi = []
+        for blocco, ordine, ordinati in self._tabelle:
+            chiavi = blocco[i] ^ np.asarray(self._varianti, np.int64)
+            inizi = np.searchsorted(ordinati, chiavi, "left"); fini = np.searchsorted(ordinati, chiavi, "right")
+            secchi.extend(ordine[a:z] for a, z in zip(inizi.tolist(), fini.tolist()))
+        candidati = np.unique(np.concatenate(secchi))
+        distanze = popcount(self.codici[candidati] ^ self.codici[i])
+        return candidati[distanze <= soglia]
+
+    def coppie_vicine(self, soglia):
+        """Tutte le coppie (i, j), i < j, a distanza di Hamming <= soglia, calcolate per blocchi
+        e varianti con operazioni vettoriali (nessun ciclo Python per singola immagine).
+        Una coppia può comparire più volte (trovata da blocchi diversi).
+        """
+        soglia = min(soglia, SOGLIA_MASSIMA)
+        risultati_i, risultati_j = [], []
+        for blocco, ordine, ordinati in self._tabelle:
+            for variante in self._varianti:
+                chiavi = blocco ^ variante
+                inizi = np.searchsorted(ordinati, chiavi, "left")
+                conteggi = np.searchsorted(ordinati, chiavi, "right") - inizi
+                if not conteggi.any(): continue
+                # Espande ogni codice nei candidati del suo secchio
+                sorgenti = np.repeat(np.arange(len(self.codici)), conteggi)
+                scostamenti = np.arange(len(sorgenti)) - np.repeat(np.cumsum(conteggi) - conteggi, conteggi)
+                destinazioni = ordine[np.repeat(inizi, conteggi) + scostamenti]
+                valide = sorgenti < destinazioni
+                sorgenti, destinazioni = sorgenti[valide], destinazioni[valide]
+                vicine = popcount(self.codici[sorgenti] ^ self.codici[destinazioni]) <= soglia
+                risultati_i.append(sorgenti[vicine]); risultati_j.append(destinazioni[vicine])
+        if not risultati_i: return np.empty((0, 2), np.int64)
+        return np.stack([np.concatenate(risultati_i), np.concatenate(risultati_j)], axis=1)
+
+
+def raggruppa_duplicati(codici, soglia=6):
+    """Raggruppa i codici (hash) a distanza di Hamming <= soglia (massimo SOGLIA_MASSIMA).
+    Restituisce una lista di gruppi (liste di posizioni) con almeno due elementi.
+    """
+    if len(codici) < 2: return []
+    coppie = IndiceMultiHash(codici).coppie_vicine(soglia)
+    genitore = list(range(len(codici))) # Union-find
+
+    def radice(x):
+        while genitore[x] != x:
+            genitore[x] = genitore[genitore[x]]; x = genitore[x]
+        return x
+
+    for i, j in coppie.tolist():
+        ri, rj = radice(i), radice(j)
+        if ri != rj: genitore[rj] = ri
+
+    gruppi = {}
+    for i in {x for coppia in coppie.tolist() for x in coppia}:
+        gruppi.setdefault(radice(i), []).append(i)
+    return [sorted(g) for g in gruppi.values() if len(g) > 1]
@@ -0,0 +1,178 @@
+# --- Esportazione e Conversione in Blocco ---
+# Converte molte immagini in un altro formato (con ridimensionamento e qualità
+# opzionali) distribuendo il lavoro su un pool di processi, così la codifica usa
+# tutti i core. La GUI legge avanzamento e risultati da una coda, senza bloccarsi.
+import os # Per operazioni sul sistema operativo (path, file)
+import time # Per misurare la durata dell'esportazione
+import queue # Coda dei risultati verso il thread della GUI
+import threading # Il coordinatore del pool gira in un thread separato
+import multiprocessing # Contesto 'spawn' per i processi di lavoro
+from concurrent.futures import ProcessPoolExecutor, as_completed # Pool di processi
+from PIL import Image # Per manipolazione immagini
+
+from codificatore_png import salva_png # PNG con profili di codifica
+
+# Formati di destinazione: nome -> estensione dei file prodotti
+FORMATI_ESPORTAZIONE = {
+    "JPEG": ".jpg",
+    "PNG": ".png",
+    "BMP": ".bmp",
+    "GIF": ".gif",
+}
+QUALITA_PREDEFINITA = 90 # Qualità JPEG predefinita (1-95)
+
+
+def prepara_per_formato(img, estensione):
+    """Restituisce un'immagine salvabile nel formato indicato dall'estensione.
+    JPEG non supporta la trasparenza (viene appiattita su sfondo bianco), BMP nemmeno.
+    """
+    estensione = estensione.lower()
+    if estensione in ('.jpg', '.jpeg'):
+        if img.mode == 'RGBA' or 'A' in img.mode:
+            # Crea sfondo bianco e incolla immagine sopra usando maschera alpha
+            sfondo = Image.new("RGB", img.size, (255, 255, 255))
+            try:
+                sfondo.paste(img, mask=img.convert("RGBA").split()[3]) # Indice 3 è il canale Alpha
+                return sfondo
+            except Exception: return img.convert('RGB') # Fallback: conversione semplice
+        if img.mode != 'RGB' and img.mode != 'L': # Converti altri modi (es. P, CMYK) a RGB
+            return img.convert('RGB')
+    elif estensione == '.bmp':
+        if img.mode == 'RGBA' or 'A' in img.mode: # BMP non supporta la trasparenza
+            return img.convert('RGB')
+    if img.mode == 'CMYK': # PNG, BMP e GIF non supportano CMYK
+        return img.convert('RGB')
+    return img
+
+
+def pianifica_destinazioni(percorsi, cartella, estensione):
+    """Assegna a ogni file un nome di destinazione unico in 'cartella' (nome_1, nome_2, ...),
+    senza sovrascrivere file esistenti né altri file dello stesso lotto.
+    """
+    esistenti = {nome.lower() for nome in os.listdir(cartella)} if os.path.isdir(cartella) else set()
+    destinazioni = []
+    for path in percorsi:
+        base = os.path.splitext(os.path.basename(path))[0]
+        nome, n = base + estensione, 1
+        while nome.lower() in esistenti:
+            nome = f"{base}_{n}{estensione}"; n += 1
+        esistenti.add(nome.lower())
+        destinazioni.append(os.path.join(cartella, nome))
+    return destinazioni
+
+
+def esporta_file(path, destinazione, dimensione_massima=None, qualita=QUALITA_PREDEFINITA, profilo_png=None):
+    """Converte un singolo file (eseguita nei processi del pool).
+    Con 'profilo_png' i PNG vengono scritti con il codificatore a profili invece che con PIL.
+    Restituisce (path, destinazione, byte scritti, errore o None).
+    """
+    try:
+        with Image.open(path) as img:
+            if dimensione_massima:
+                # thumbnail() su un file appena aperto usa la decodifica ridotta dei JPEG (draft)
+                img.thumbnail(dimensione_massima, Image.Resampling.LANCZOS)
+            estensione = os.path.splitext(destinazione)[1].lower()
+            da_salvare = prepara_per_formato(img, estensione)
+            opzioni = {}
+            if estensione in ('.jpg', '.jpeg'):
+                opzioni["quality"] = qualita
+                if img.info.get("exif"): opzioni["exif"] = img.info["exif"] # Conserva data di scatto ecc.
+            if estensione == '.png' and profilo_png:
+                salva_png(da_salvare, destinazione, profilo_png)
+            else:
+                da_salvare.save(destinazione, **opzioni)
+        return path, destinazione, os.path.getsize(destinazione), None
+    except Exception as e:
+        # File parziale lasciato da un salvataggio fallito: meglio rimuoverlo
+        try:
+            if os.path.exists(destinazione): os.remove(destinazione)
+        except OSError: pass
+        return path, destinazione, 0, f"{type(e).__name__}: {e}"
+
+
+class EsportazioneBatch:
+    """Esporta una lista di file su un pool di processi.
+
+    Il thread della GUI chiama risultati_pronti() (non bloccante) per l'avanzamento,
+    annulla() per interrompere e riepilogo() alla fine.
+    """
+
+    def __init__(self, percorsi, cartella, formato, dimensione_massima=None, qualita=QUALITA_PREDEFINITA,
+                 profilo_png=None, processi=None):
+        self.percorsi = list(percorsi)
+        self.cartella = cartella
+        self.estensione = FORMATI_ESPORTAZIONE[formato]
+        self.dimensione_massima = dimensione_massima
+        self.qualita = qualita
+        self.profilo_png = profilo_png # None = codifica PNG predefinita di PIL
+        self.processi = processi or os.cpu_count() or 1
+        self.completati = [] # (path, destinazione, byte, errore)
+        self.annullata = False
+        self.terminata = False
+        self._coda = queue.Queue()
+        self._annulla = threading.Event()
+        self._inizio = self._fine = None
+
+    @property
+    def totale(self):
+        return len(self.percorsi)
+
+    def avvia(self):
+        """Avvia l'esportazione in background."""
+        os.makedirs(self.cartella, exist_ok=True)
+        self._inizio = time.perf_counter()
+        threading.Thread(target=self._coordina, daemon=True).start()
+
+    def _coordina(self):
+        destinazioni = pianifica_destinazioni(self.percorsi, self.cartella, self.estensione)
+        # 'spawn' evita di duplicare con fork() un processo con Tk e altri thread attivi
+        contesto = multiprocessing.get_context("spawn")
+        pool = ProcessPoolExecutor(max_workers=self.processi, mp_context=contesto)
+        futuri, riportati = [], set()
+        try:
+            futuri = [pool.submit(esporta_file, p, d, self.dimensione_massima, self.qualita, self.profilo_png)
+                      for p, d in zip(self.percorsi, destinazioni)]
+            for futuro in as_completed(futuri):
+                if self._annulla.is_set(): break
+                self._riporta(futuro); riportati.add(futuro)
+        finally:
+            # In caso di annullamento i file non ancora iniziati vengono scartati...
+            pool.shutdown(wait=True, cancel_futures=True)
+            # ...mentre quelli già in lavorazione sono stati completati e vanno contati
+            for futuro in futuri:
+                if futuro not in riportati and futuro.done() and not futuro.cancelled(): self._riporta(futuro)
+            self._fine = time.perf_counter()
+            self._coda.put(None) # Segnale di fine
+
+    def _riporta(self, futuro):
+        try: self._coda.put(futuro.result())
+        except Exception as e: # Processo di lavoro terminato in modo anomalo
+            self._coda.put((None, None, 0, f"{type(e).__name__}: {e}"))
+
+    def risultati_pronti(self):
+        """Restituisce i risultati arrivati dall'ultima chiamata (e segna la fine quando arriva)."""
+        nuovi = []
+        while True:
+            try: elemento = self._coda.get_nowait()
+            except queue.Empty: break
+            if elemento is None: self.terminata = True; break
+            nuovi.append(elemento)
+        self.completati.extend(nuovi)
+        return nuovi
+
+    def annulla(self):
+        """Interrompe l'esportazione: i file già in lavorazione vengono completati, gli altri saltati."""
+        self.annullata = True
+        self._annulla.set()
+
+    def riepilogo(self):
+        """Dizionario con i numeri finali dell'esportazione."""
+        errori = [(p, e) for p, _, _, e in self.completati if e]
+        return {
+            "esportati": len(self.completati) - len(errori),
+            "errori": errori,
+            "saltati": self.totale - len(self.completati),
+            "byte_originali": sum(os.path.getsize(p) for p, _, _, e in self.completati if p and not e and os.path.exists(p)),
+            "byte_scritti": sum(b for _, _, b, e in self.completati if not e),
+            "secondi": (self._fine or time.perf_counter()) - (self._inizio or time.perf_counter()),
+        }
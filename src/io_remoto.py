@@ -0,0 +1,173 @@
+# --- Lettura dei File da Cartelle di Rete ---
+# Su NFS o SMB ogni Image.open() fa molte piccole letture, ognuna con la latenza
+# della rete, e si ripete a ogni ridisegno. Per i file che stanno su una cartella
+# di rete questo modulo legge l'intero file con una sola lettura sequenziale, in
+# parallelo su più thread, e ne conserva i byte in una cache LRU locale (in memoria)
+# validata da dimensione e data di modifica. I decoder leggono poi da un buffer
+# in memoria (io.BytesIO) invece che dalla cartella montata.
+# I file su dischi locali non passano da qui: la cache del sistema operativo basta.
+import io # Buffer in memoria per PIL
+import os # Per operazioni sul sistema operativo (path, file)
+import sys # Per riconoscere il sistema operativo
+import threading # La cache è usata dalla GUI e dai thread di lettura
+from concurrent.futures import ThreadPoolExecutor, Future # Letture parallele (attese di I/O, non calcolo)
+
+from cache import CacheLRU # Byte dei file letti
+
+MEMORIA_FILE_REMOTI = 256 * 1024 * 1024 # Byte massimi dei file conservati
+FILE_MASSIMO = 64 * 1024 * 1024 # File più grandi vengono letti direttamente dalla cartella, senza cache
+LETTURE_PARALLELE = 8 # Thread di lettura (la rete rende molto di più con più richieste in volo)
+# Tipi di file system di rete (Linux, /proc/mounts)
+FILE_SYSTEM_RETE = {"nfs", "nfs4", "cifs", "smb3", "smbfs", "ncpfs", "afs", "9p", "ceph",
+                    "glusterfs", "fuse.sshfs", "fuse.rclone", "davfs", "fuse.davfs2"}
+
+
+def _punti_di_montaggio_rete():
+    """Linux: punti di montaggio dei file system di rete (letti da /proc/mounts)."""
+    punti = []
+    try:
+        with open("/proc/mounts", encoding="utf-8") as f:
+            for riga in f:
+                campi = riga.split()
+                if len(campi) >= 3 and campi[2] in FILE_SYSTEM_RETE:
+                    punti.append(campi[1].replace("\\040", " ")) # Gli spazi sono codificati come \040
+    except OSError:
+        pass # Non Linux o /proc non disponibile
+    return punti
+
+
+def e_cartella_remota(cartella):
+    """Indica se 'cartella' si trova su un file system di rete (NFS, SMB, ...)."""
+    cartella = os.path.abspath(cartella)
+    if sys.platform == "win32":
+        if cartella.startswith("\\\\"): return True # Percorso UNC (\\server\condivisione)
+        try:
+            import ctypes
+            DRIVE_REMOTE = 4
+            return ctypes.windll.kernel32.GetDriveTypeW(os.path.splitdrive(cartella)[0] + "\\") == DRIVE_REMOTE
+        except Exception:
+            return False
+    return any(cartella == punto or cartella.startswith(punto.rstrip("/") + "/") for punto in _punti_di_montaggio_rete())
+
+
+class LettoreFileRemoti:
+    """Cache a lettura passante dei byte dei file che stanno su cartelle di rete.
+
+    leggi_async(path) restituisce un Future con i byte (None per i file locali o troppo
+    grandi): più richieste dello stesso file condividono un'unica lettura. apri(path)
+    restituisce la sorgente da passare a PIL, precarica(percorsi) anticipa le letture
+    dei file che serviranno a breve. La validità è controllata con os.stat().
+    """
+
+    def __init__(self, massimo=MEMORIA_FILE_REMOTI, letture_parallele=LETTURE_PARALLELE):
+        self._cache = CacheLRU(massimo, peso=lambda valore: len(valore[1])) # path -> (firma, byte)
+        self._lock = threading.Lock()
+        self._letture_parallele = letture_parallele
+        self._pool = None # Avviato alla prima lettura remota
+        self._in_lettura = {} # path -> Future della lettura in corso (letture accorpate)
+        self._precaricati = set() # Letture anticipate che nessuno ha ancora chiesto (annullabili)
+        self._remote = {} # cartella -> bool (risultato di e_cartella_remota)
+        self.letture = 0 # File letti dalla rete
+        self.riusi = 0 # Richieste servite dalla cache o da una lettura già in corso
+
+    def e_remoto(self, path):
+        """Il file sta su una cartella di rete? (il controllo viene fatto una volta per cartella)"""
+        cartella = os.path.dirname(os.path.abspath(path))
+        remota = self._remote.get(cartella)
+        if remota is None: remota = self._remote[cartella] = e_cartella_remota(cartella)
+        return remota
+
+    def leggi_async(self, path):
+        """Future con i byte del file (None se il file non va in cache: locale, troppo grande o illeggibile)."""
+        if not self.e_remoto(path):
+            futuro = Future(); futuro.set_result(None)
+            return futuro
+        with self._lock:
+            self._precaricati.discard(path) # Ora serve davvero: non va più annullata
+            return self._avvia_lettura(path)
+
+    def apri(self, path):
+        """Sorgente da dare a Image.open(): i byte del file in memoria per le cartelle di rete, altrimenti il percorso.
+        Attende la lettura se il file non è ancora in cache.
+        """
+        dati = self.leggi_async(path).result()
+        return io.BytesIO(dati) if dati is not None else path
+
+    def precarica(self, percorsi):
+        """Anticipa in parallelo la lettura dei file che serviranno a breve (nell'ordine dato).
+        Le letture anticipate chieste prima e non ancora iniziate, se non più elencate, vengono annullate.
+        """
+        percorsi = [p for p in percorsi if p and self.e_remoto(p)]
+        with self._lock:
+            nuovi = set(percorsi)
+            for path in [p for p in self._precaricati if p not in nuovi]:
+                futuro = self._in_lettura.get(path)
+                if futuro is not None and futuro.cancel(): del self._in_lettura[path]
+                self._precaricati.discard(path)
+            for path in percorsi:
+                if path in self._in_lettura or path in self._cache: continue # La validità si controlla all'uso
+                self._avvia_lettura(path)
+                self._precaricati.add(path)
+
+    def dimentica(self, path):
+        """Scarta i byte di un file (modificato o rimosso)."""
+        with self._lock: self._cache.rimuovi(path)
+
+    def memoria_occupata(self):
+        return self._cache.peso_totale
+
+    def libera_memoria(self, limite):
+        with self._lock: self._cache.riduci(limite)
+
+    def chiudi(self):
+        """Annulla le letture in attesa e ferma i thread."""
+        if self._pool is not None: self._pool.shutdown(wait=False, cancel_futures=True)
+
+    # --- Interni (da chiamare con il lock) ---
+
+    def _valido(self, path):
+        """Byte in cache se il file non è cambiato da quando è stato letto, altrimenti None."""
+        elemento = self._cache.get(path)
+        if elemento is None: return None
+        try: st = os.stat(path)
+        except OSError: st = None
+        if st is None or elemento[0] != (st.st_size, st.st_mtime_ns):
+            self._cache.rimuovi(path) # Modificato (o rimosso) dopo la lettura
+            return None
+        return elemento[1]
+
+    def _avvia_lettura(self, path):
+        futuro = self._in_lettura.get(path)
+        if futuro is not None:
+            self.riusi += 1
+            return futuro
+        dati = self._valido(path)
+        if dati is not None:
+            self.riusi += 1
+            futuro = Future(); futuro.set_result(dati)
+            return futuro
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self._letture_parallele, thread_name_prefix="lettura_rete")
+        futuro = self._pool.submit(self._leggi, path)
+        self._in_lettura[path] = futuro
+        return futuro
+
+    # --- Thread di lettura ---
+
+    def _leggi(self, path):
+        try:
+            with open(path, "rb") as f:
+                st = os.fstat(f.fileno())
+                if st.st_size > FILE_MASSIMO: return None # Troppo grande per la cache: il decoder legge dal percorso
+                dati = f.read() # Una sola lettura sequenziale: il client di rete la spezza in richieste grandi
+            with self._lock:
+                self.letture += 1
+                self._cache.inserisci(path, ((st.st_size, st.st_mtime_ns), dati))
+            return dati
+        except OSError as e:
+            print(f"WARN: Lettura da cartella di rete fallita per {path}: {e}")
+            return None # Il decoder riproverà dal percorso e riporterà l'errore
+        finally:
+            with self._lock:
+                self._in_lettura.pop(path, None)
+                self._precaricati.discard(path)
@@ -0,0 +1,87 @@
+# --- Gestione della Memoria ---
+# Un unico contabile conosce quanti byte occupano le immagini decodificate, le
+# PhotoImage e le cache dell'applicazione. Ogni componente si registra come
+# "consumatore" dicendo come misurarsi e come ridursi; quando il totale supera
+# il budget il gestore riduce prima i consumatori con priorità più bassa (quelli
+# meno costosi da ricostruire), e ogni consumatore scarta prima ciò che non è in vista.
+
+MB = 1024 * 1024
+BUDGET_PREDEFINITO = 1024 * MB # Byte massimi per immagini e cache
+BUDGET_DISPONIBILI = (256 * MB, 512 * MB, 1024 * MB, 2048 * MB, 4096 * MB) # Scelte offerte nel menu
+
+# Byte per pixel dei modi PIL a banda singola (i modi a più bande occupano 4 byte per pixel)
+_BYTE_PER_PIXEL = {"1": 1, "L": 1, "P": 1, "I;16": 2, "I": 4, "F": 4}
+
+
+def byte_immagine(img):
+    """Byte occupati in memoria dai pixel di un'immagine PIL (RGB viene conservato su 4 byte per pixel)."""
+    if img is None: return 0
+    return img.width * img.height * _BYTE_PER_PIXEL.get(img.mode, 4)
+
+
+def byte_photo(photo):
+    """Byte occupati da una PhotoImage di Tkinter (pixel RGBA a 32 bit)."""
+    if photo is None: return 0
+    try: return photo.width() * photo.height() * 4
+    except Exception: return 0 # Immagine già distrutta
+
+
+def formatta_byte(byte):
+    """Dimensione leggibile (es. '312 MB')."""
+    if byte >= 10 * MB: return f"{byte / MB:.0f} MB"
+    if byte >= MB: return f"{byte / MB:.1f} MB"
+    return f"{byte / 1024:.0f} KB"
+
+
+class GestoreMemoria:
+    """Contabilità centrale della memoria dei consumatori registrati.
+
+    'occupazione()' restituisce i byte attuali di un consumatore, 'riduci(limite)'
+    deve portarlo entro 'limite' byte per quanto può (ciò che è visibile resta).
+    """
+
+    def __init__(self, budget=BUDGET_PREDEFINITO):
+        self.budget = budget
+        self._consumatori = {} # nome -> (occupazione, riduci, priorità)
+
+    def registra(self, nome, occupazione, riduci=None, priorita=0):
+        """Aggiunge un consumatore; senza 'riduci' viene solo contato (ha già un suo limite)."""
+        self._consumatori[nome] = (occupazione, riduci, priorita)
+
+    def rimuovi(self, nome):
+        self._consumatori.pop(nome, None)
+
+    def utilizzo(self):
+        """Dizionario nome -> byte occupati."""
+        risultato = {}
+        for nome, (occupazione, _, _) in self._consumatori.items():
+            try: risultato[nome] = occupazione()
+            except Exception as e:
+                print(f"WARN: Memoria, impossibile misurare '{nome}': {e}")
+                risultato[nome] = 0
+        return risultato
+
+    @property
+    def totale(self):
+        return sum(self.utilizzo().values())
+
+    def applica(self):
+        """Se il totale supera il budget riduce i consumatori, dalla priorità più bassa. Restituisce i byte liberati."""
+        utilizzo = self.utilizzo()
+        eccesso = sum(utilizzo.values()) - self.budget
+        if eccesso <= 0: return 0
+        liberati = 0
+        for nome, (occupazione, riduci, _) in sorted(self._consumatori.items(), key=lambda c: c[1][2]):
+            attuale = utilizzo[nome]
+            if riduci is None or attuale <= 0: continue
+            try:
+                riduci(max(0, attuale - (eccesso - liberati)))
+                liberati += max(0, attuale - occupazione())
+            except Exception as e:
+                print(f"WARN: Memoria, impossibile ridurre '{nome}': {e}")
+            if liberati >= eccesso: break
+        return liberati
+
+    def descrizione(self):
+        """Testo per la barra di stato (es. 'Memoria: 312 MB / 1024 MB')."""
+        return f"Memoria: {formatta_byte(self.totale)} / {formatta_byte(self.budget)}"
@@ -0,0 +1,215 @@
+# --- Creazione delle Miniature ---
+# Decodifica ridotta condivisa da griglia e calcolo degli hash percettivi:
+# per i JPEG il decoder produce direttamente un'immagine scalata (1/2, 1/4, 1/8)
+# invece di decodificare tutti i megapixel per poi buttarli via. Se il JPEG
+# contiene già una miniatura (EXIF o JFIF) abbastanza grande, si usa quella e
+# l'immagine vera non viene decodificata affatto: bastano i pochi KB dell'intestazione.
+import io # Per aprire la miniatura incorporata dai byte in memoria
+from PIL import Image, ExifTags # Per manipolazione immagini
+
+from cache import CacheLRU # Livelli di risoluzione delle miniature
+from memoria import byte_immagine # Peso dei livelli in cache
+
+TOLLERANZA_PROPORZIONI = 0.02 # Differenza relativa massima tra le proporzioni di miniatura e immagine
+# Lati dei livelli di risoluzione conservati per ogni file. 160 è il lato delle miniature EXIF standard
+# (160x120): al lato predefinito della griglia basta quella incorporata, senza decodificare l'immagine
+LIVELLI_MINIATURA = (96, 160, 192, 384)
+_TAG_INIZIO_MINIATURA = 0x0201 # JPEGInterchangeFormat (IFD1)
+_TAG_LUNGHEZZA_MINIATURA = 0x0202 # JPEGInterchangeFormatLength (IFD1)
+_TAG_ORIENTAMENTO = 0x0112 # Orientation (IFD0)
+# Orientamento EXIF -> trasposizione che porta i pixel salvati nel verso giusto (come ImageOps.exif_transpose)
+_TRASPOSIZIONI = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT, 3: Image.Transpose.ROTATE_180, 4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE, 6: Image.Transpose.ROTATE_270, 7: Image.Transpose.TRANSVERSE, 8: Image.Transpose.ROTATE_90,
+}
+
+
+def _orientamento(img):
+    """Valore del tag EXIF Orientation (1 = nessuna rotazione, anche se manca o non è leggibile)."""
+    try: return img.getexif().get(_TAG_ORIENTAMENTO) or 1
+    except Exception: return 1
+
+
+def _orienta(img, orientamento):
+    """Ruota/ribalta l'immagine secondo l'orientamento EXIF."""
+    trasposizione = _TRASPOSIZIONI.get(orientamento)
+    return img.transpose(trasposizione) if trasposizione is not None else img
+
+
+def _miniatura_incorporata(img):
+    """Restituisce la miniatura incorporata in un JPEG (EXIF IFD1 o APP0 JFIF/JFXX), o None.
+    Legge solo i segmenti dell'intestazione già caricati da Image.open().
+    """
+    if img.format != "JPEG": return None
+    exif = img.info.get("exif")
+    if exif:
+        try:
+            ifd1 = img.getexif().get_ifd(ExifTags.IFD.IFD1)
+            inizio, lunghezza = ifd1.get(_TAG_INIZIO_MINIATURA), ifd1.get(_TAG_LUNGHEZZA_MINIATURA)
+            if inizio and lunghezza:
+                dati = exif[6 + inizio:6 + inizio + lunghezza] # Offset relativi all'intestazione TIFF, dopo "Exif\0\0"
+                if len(dati) == lunghezza: return Image.open(io.BytesIO(dati))
+        except Exception as e:
+            print(f"WARN: Miniatura EXIF non leggibile: {e}")
+    for marcatore, dati in getattr(img, "applist", []):
+        if marcatore != "APP0": continue
+        if dati[:5] == b"JFXX\x00" and dati[5:6] == b"\x10": # Estensione JFIF con miniatura JPEG
+            return Image.open(io.BytesIO(dati[6:]))
+        if dati[:5] == b"JFIF\x00" and len(dati) >= 14: # Miniatura JFIF RGB non compressa
+            larghezza, altezza = dati[12], dati[13]
+            if larghezza and altezza and len(dati) >= 14 + 3 * larghezza * altezza:
+                return Image.frombytes("RGB", (larghezza, altezza), dati[14:14 + 3 * larghezza * altezza])
+    return None
+
+
+def _miniatura_utilizzabile(img, dimensione, orientamento):
+    """Miniatura incorporata, già orientata e ridotta a 'dimensione', se basta per la resa richiesta; altrimenti None.
+    Come i pixel dell'immagine, la miniatura EXIF è salvata nel verso del sensore: riceve la stessa
+    rotazione prima dei controlli. Viene scartata se è più piccola del risultato o se le proporzioni
+    non sono quelle dell'immagine orientata (bande nere aggiunte dalla fotocamera, o miniatura salvata
+    già ruotata, o non aggiornata dopo una rotazione).
+    """
+    miniatura = _miniatura_incorporata(img)
+    if miniatura is None: return None
+    try: miniatura.load()
+    except Exception as e:
+        print(f"WARN: Miniatura incorporata corrotta: {e}")
+        return None
+    miniatura = _orienta(miniatura, orientamento)
+    larghezza, altezza = _orienta_dimensioni(img.size, orientamento)
+    rapporto = min(dimensione[0] / larghezza, dimensione[1] / altezza, 1.0)
+    if miniatura.width < round(larghezza * rapporto) or miniatura.height < round(altezza * rapporto):
+        return None # Troppo piccola: andrebbe ingrandita
+    proporzioni, proporzioni_miniatura = larghezza / altezza, miniatura.width / miniatura.height
+    if abs(proporzioni_miniatura - proporzioni) > TOLLERANZA_PROPORZIONI * proporzioni:
+        return None
+    miniatura.thumbnail(dimensione, Image.Resampling.LANCZOS)
+    return miniatura
+
+
+def _orienta_dimensioni(dimensione, orientamento):
+    """Dimensioni dopo _orienta(): gli orientamenti 5-8 scambiano larghezza e altezza."""
+    return (dimensione[1], dimensione[0]) if orientamento in (5, 6, 7, 8) else tuple(dimensione)
+
+
+def crea_miniatura(path, dimensione, usa_incorporata=True, orienta=True):
+    """Restituisce una miniatura PIL (proporzioni mantenute) grande al massimo 'dimensione'.
+    Con 'usa_incorporata' prova prima la miniatura EXIF/JFIF del file; altrimenti
+    thumbnail() sull'immagine appena aperta attiva draft()/reduce(): il file non viene
+    mai decodificato a piena risoluzione quando il formato lo permette. Con 'orienta'
+    la miniatura segue il tag EXIF Orientation (come la mostrano le fotocamere); senza,
+    resta nel verso dei pixel salvati (es. per gli hash percettivi).
+    """
+    with Image.open(path) as img:
+        orientamento = _orientamento(img) if orienta else 1
+        if usa_incorporata:
+            miniatura = _miniatura_utilizzabile(img, dimensione, orientamento)
+            if miniatura is not None: return miniatura
+        # Decodifica ridotta + ridimensionamento finale (nel verso salvato, poi orientata)
+        img.thumbnail(_orienta_dimensioni(dimensione, orientamento), Image.Resampling.LANCZOS)
+        return _orienta(img.copy(), orientamento) # Copia piccola: l'originale viene chiuso all'uscita dal 'with'
+
+
+def normalizza_modo(img, opaco="RGB"):
+    """Converte l'immagine nel modo usato per il disegno ('opaco', o RGBA se ha trasparenza)."""
+    trasparente = img.mode in ("RGBA", "LA", "PA") or "transparency" in img.info
+    return img.convert("RGBA" if trasparente else opaco)
+
+
+def adatta_immagine(path, dimensione):
+    """Restituisce l'immagine ridimensionata (anche ingrandita) per riempire 'dimensione'
+    mantenendo le proporzioni. Per i JPEG la decodifica avviene già in scala ridotta.
+    """
+    with Image.open(path) as img:
+        larghezza, altezza = img.size
+        rapporto = min(dimensione[0] / larghezza, dimensione[1] / altezza)
+        finale = (max(1, int(larghezza * rapporto)), max(1, int(altezza * rapporto)))
+        img.draft(None, finale) # Solo JPEG: sceglie la scala di decodifica più piccola che basta
+        return normalizza_modo(img).resize(finale, Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+
+def decodifica_livello(path, k):
+    """Restituisce l'immagine ridotta di un fattore 2^k (livello k della piramide di zoom).
+    I JPEG fino a 1/8 vengono decodificati direttamente in scala (draft), gli altri
+    formati vengono decodificati interi e poi ridotti con la media di blocchi (reduce).
+    """
+    with Image.open(path) as img:
+        larghezza, altezza = img.size
+        if k > 0: img.draft(None, (max(1, larghezza >> k), max(1, altezza >> k))) # Solo JPEG
+        immagine = normalizza_modo(img)
+    fattore = min(immagine.width // max(1, larghezza >> k), immagine.height // max(1, altezza >> k))
+    return immagine.reduce(fattore) if fattore > 1 else immagine
+
+
+def livello_per(lato):
+    """Il livello più piccolo da cui si ricava (riducendo) una miniatura di lato 'lato'."""
+    return next((livello for livello in LIVELLI_MINIATURA if livello >= lato), LIVELLI_MINIATURA[-1])
+
+
+class CacheMultiRisoluzione:
+    """Miniature di ogni file a più livelli di risoluzione (LIVELLI_MINIATURA).
+
+    Qualsiasi lato viene servito riducendo il livello più vicino tra quelli più
+    grandi già in cache: cambiare la dimensione delle miniature non richiede di
+    rileggere i file finché il livello adatto (o uno più grande) è in memoria.
+    """
+
+    def __init__(self, massimo):
+        self._livelli = CacheLRU(massimo, peso=lambda valore: byte_immagine(valore[0]),
+                                 alla_rimozione=lambda chiave, valore: self._scarta(chiave))
+        self._per_chiave = {} # chiave -> lati dei livelli in cache
+
+    @property
+    def peso_totale(self):
+        return self._livelli.peso_totale
+
+    def inserisci(self, chiave, livello, img):
+        """Conserva la miniatura decodificata per il livello 'livello' (lato massimo richiesto al decoder).
+        Se l'immagine è più piccola del livello, il file originale è piccolo: vale per qualsiasi lato.
+        """
+        completa = max(img.size) < livello
+        self._livelli.inserisci((chiave, livello), (normalizza_modo(img), completa))
+        if (chiave, livello) in self._livelli: self._per_chiave.setdefault(chiave, set()).add(livello)
+
+    def miniatura(self, chiave, lato):
+        """Restituisce (immagine, esatta) per una miniatura di lato 'lato', o (None, False).
+        Con esatta=False l'immagine è stata ingrandita da un livello più piccolo (va richiesto quello giusto).
+        """
+        livelli = sorted(self._per_chiave.get(chiave, ()))
+        for livello in livelli:
+            img, completa = self._livelli.get((chiave, livello))
+            if livello >= lato or completa: return self._adatta(img, lato, completa), True
+        if not livelli: return None, False
+        img, _ = self._livelli.get((chiave, livelli[-1]))
+        return self._adatta(img, lato, False), False
+
+    @staticmethod
+    def _adatta(img, lato, completa):
+        rapporto = lato / max(img.size)
+        if completa: rapporto = min(1.0, rapporto) # Come thumbnail(): i file piccoli non vengono ingranditi
+        dimensione = (max(1, round(img.width * rapporto)), max(1, round(img.height * rapporto)))
+        if dimensione == img.size: return img
+        filtro = Image.Resampling.LANCZOS if rapporto < 1 else Image.Resampling.BILINEAR
+        return img.resize(dimensione, filtro)
+
+    def dimentica(self, chiave):
+        """Scarta tutti i livelli di un file (modificato o rimosso)."""
+        for livello in self._per_chiave.pop(chiave, ()):
+            self._livelli.rimuovi((chiave, livello))
+
+    def riduci(self, limite):
+        self._livelli.riduci(limite)
+
+    def rimuovi_se(self, condizione):
+        """Scarta i livelli dei file la cui chiave soddisfa 'condizione(chiave)'."""
+        for chiave in [c for c in self._per_chiave if condizione(c)]: self.dimentica(chiave)
+
+    def __contains__(self, chiave):
+        return chiave in self._per_chiave
+
+    def _scarta(self, chiave_livello):
+        chiave, livello = chiave_livello
+        livelli = self._per_chiave.get(chiave)
+        if livelli is None: return
+        livelli.discard(livello)
+        if not livelli: del self._per_chiave[chiave]
@@ -0,0 +1,171 @@
+# --- Osservatore della Cartella Corrente ---
+# Segnala file aggiunti, rimossi o modificati nella cartella aperta, così la
+# galleria può aggiornare solo le voci coinvolte invece di riscansionare tutto.
+# Su Linux usa inotify (tramite ctypes); altrove ripiega su un polling periodico.
+import os # Per operazioni sul sistema operativo (path, file)
+import sys # Per riconoscere la piattaforma
+import queue # Coda thread-safe verso il thread della GUI
+import select # Attesa degli eventi inotify con timeout
+import struct # Decodifica degli eventi inotify
+import threading # L'osservatore gira in un thread separato
+import ctypes # Accesso alle funzioni inotify della libc
+import ctypes.util
+
+# Tipi di evento prodotti dall'osservatore
+AGGIUNTO = "aggiunto"
+RIMOSSO = "rimosso"
+MODIFICATO = "modificato"
+
+# Costanti inotify (da <sys/inotify.h>)
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENTO_INOTIFY = struct.Struct("iIII") # wd, mask, cookie, len
+
+
+def istantanea_cartella(cartella, estensioni):
+    """Restituisce {path: (dimensione, mtime)} dei file immagine nella cartella."""
+    estensioni = tuple(e.lower() for e in estensioni)
+    stato = {}
+    try:
+        with os.scandir(cartella) as it:
+            for entry in it:
+                if not entry.name.lower().endswith(estensioni): continue
+                try:
+                    if entry.is_file():
+                        st = entry.stat(); stato[entry.path] = (st.st_size, st.st_mtime)
+                except OSError: pass # File sparito durante la scansione
+    except OSError: pass # Cartella non raggiungibile (es. disco di rete scollegato)
+    return stato
+
+
+def confronta_istantanee(precedente, attuale):
+    """Eventi (tipo, path) che portano dall'istantanea 'precedente' ad 'attuale'."""
+    eventi = []
+    for path, firma in attuale.items():
+        if path not in precedente: eventi.append((AGGIUNTO, path))
+        elif precedente[path] != firma: eventi.append((MODIFICATO, path))
+    eventi.extend((RIMOSSO, path) for path in precedente.keys() - attuale.keys())
+    return eventi
+
+
+class OsservatoreCartella:
+    """Osserva una cartella (non ricorsivamente) e accoda gli eventi sui file immagine.
+
+    Gli eventi vengono letti dal thread della GUI con eventi_pendenti(), che li
+    restituisce già accorpati: al massimo un evento per file.
+    """
+
+    def __init__(self, cartella, estensioni, intervallo_polling=2.0):
+        self.cartella = os.path.abspath(cartella)
+        self.estensioni = tuple(e.lower() for e in estensioni)
+        self.intervallo_polling = intervallo_polling # Secondi tra due scansioni (solo polling)
+        self._coda = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = None
+        self.modalita = None # "inotify" o "polling", deciso all'avvio
+
+    def avvia(self):
+        """Avvia il thread di osservazione (inotify se disponibile, altrimenti polling)."""
+        fd = self._apri_inotify() if sys.platform.startswith("linux") else None
+        if fd is not None:
+            self.modalita = "inotify"
+            self._thread = threading.Thread(target=self._ciclo_inotify, args=(fd,), daemon=True)
+        else:
+            self.modalita = "polling"
+            self._thread = threading.Thread(target=self._ciclo_polling, daemon=True)
+        self._thread.start()
+
+    def ferma(self):
+        """Ferma il thread di osservazione (ritorna entro circa mezzo secondo)."""
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+
+    def eventi_pendenti(self):
+        """Svuota la coda e restituisce una lista di (tipo, path), un solo evento per file."""
+        eventi = {}
+        while True:
+            try: tipo, path = self._coda.get_nowait()
+            except queue.Empty: break
+            precedente = eventi.get(path)
+            # Un file creato e poi modificato resta "aggiunto"; aggiunto e poi rimosso sparisce del tutto
+            if precedente == AGGIUNTO and tipo == MODIFICATO: continue
+            if precedente == AGGIUNTO and tipo == RIMOSSO: del eventi[path]; continue
+            if precedente == RIMOSSO and tipo == AGGIUNTO: tipo = MODIFICATO
+            eventi[path] = tipo
+        return [(tipo, path) for path, tipo in eventi.items()]
+
+    def _e_immagine(self, nome):
+        return nome.lower().endswith(self.estensioni)
+
+    # --- Implementazione inotify (Linux) ---
+
+    def _apri_inotify(self):
+        """Crea un descrittore inotify sulla cartella; None se non disponibile."""
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd < 0: return None
+            maschera = (IN_CREATE | IN_CLOSE_WRITE | IN_ATTRIB | IN_DELETE |
+                        IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF)
+            if libc.inotify_add_watch(fd, os.fsencode(self.cartella), maschera) < 0:
+                os.close(fd); return None
+            return fd
+        except (OSError, AttributeError): # libc senza inotify
+            return None
+
+    def _ciclo_inotify(self, fd):
+        """Legge gli eventi inotify e li traduce in aggiunto/rimosso/modificato."""
+        in_scrittura = set() # File creati ma non ancora chiusi dopo la scrittura
+        try:
+            while not self._stop.is_set():
+                pronti, _, _ = select.select([fd], [], [], 0.5)
+                if not pronti: continue
+                try: dati = os.read(fd, 64 * 1024)
+                except BlockingIOError: continue
+                offset = 0
+                while offset + _EVENTO_INOTIFY.size <= len(dati):
+                    _, mask, _, lunghezza = _EVENTO_INOTIFY.unpack_from(dati, offset)
+                    nome = dati[offset + _EVENTO_INOTIFY.size: offset + _EVENTO_INOTIFY.size + lunghezza]
+                    offset += _EVENTO_INOTIFY.size + lunghezza
+                    if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED): return # Cartella sparita
+                    nome = os.fsdecode(nome.rstrip(b"\0"))
+                    if not nome or mask & IN_ISDIR or not self._e_immagine(nome): continue
+                    path = os.path.join(self.cartella, nome)
+                    if mask & IN_CREATE:
+                        in_scrittura.add(path) # Aspetta la chiusura prima di leggerlo
+                    elif mask & IN_CLOSE_WRITE:
+                        self._coda.put((AGGIUNTO if path in in_scrittura else MODIFICATO, path))
+                        in_scrittura.discard(path)
+                    elif mask & IN_MOVED_TO:
+                        self._coda.put((AGGIUNTO, path))
+                    elif mask & (IN_DELETE | IN_MOVED_FROM):
+                        in_scrittura.discard(path)
+                        self._coda.put((RIMOSSO, path))
+                    elif mask & IN_ATTRIB and path not in in_scrittura:
+                        self._coda.put((MODIFICATO, path)) # Es. 'touch' o cambio data
+        finally:
+            os.close(fd)
+
+    # --- Implementazione a polling (altri sistemi) ---
+
+    def _istantanea(self):
+        return istantanea_cartella(self.cartella, self.estensioni)
+
+    def _ciclo_polling(self):
+        """Confronta periodicamente due istantanee della cartella."""
+        precedente = self._istantanea()
+        while not self._stop.wait(self.intervallo_polling):
+            attuale = self._istantanea()
+            for evento in confronta_istantanee(precedente, attuale): self._coda.put(evento)
+            precedente = attuale
@@ -0,0 +1,229 @@
+# --- Proiezione Automatica (Slideshow) ---
+# Le diapositive vengono decodificate e adattate allo schermo in anticipo da un
+# pool di thread: la pipeline misura quanto impiega ogni decodifica e, se i file
+# sono lenti (immagini enormi, dischi di rete), allunga da sola il numero di
+# immagini preparate in anticipo, così ogni diapositiva è pronta prima della
+# sua scadenza.
+import os # Per il numero di core disponibili
+import math # Per arrotondare l'anticipo
+import time # Orologio monotono per scadenze e latenze
+import tkinter as tk
+from collections import deque # Ultime latenze misurate
+from concurrent.futures import ThreadPoolExecutor # Decodifica parallela (PIL rilascia il GIL)
+from PIL import Image, ImageColor, ImageTk # Per manipolazione immagini
+
+from miniature import adatta_immagine # Decodifica ridotta e adattamento alla vista
+from memoria import byte_immagine # Contabilità della memoria
+from decodifica import ErroreDecodifica # Decodifica in processi separati
+
+TRANSIZIONI = ("Nessuna", "Dissolvenza")
+
+
+class PipelineDecodifica:
+    """Prepara in anticipo le prossime diapositive (immagini già adattate e centrate).
+
+    L'anticipo (quante immagini oltre quella corrente) parte da ANTICIPO_MINIMO e
+    cresce quando la latenza misurata lo richiede o quando una diapositiva arriva
+    in ritardo; non scende mai durante la stessa proiezione.
+    """
+
+    ANTICIPO_MINIMO = 2
+    ANTICIPO_MASSIMO = 12
+    MARGINE = 1.5 # Sicurezza sulla latenza peggiore osservata
+    CAMPIONI_LATENZA = 8 # Decodifiche considerate per stimare la latenza
+
+    def __init__(self, percorsi, dimensione, intervallo, sfondo="#000000", lavoratori=None, decodificatore=None):
+        self.percorsi = list(percorsi)
+        self.dimensione = dimensione
+        self.intervallo = intervallo # Secondi tra due diapositive
+        self.sfondo = sfondo
+        self.decodificatore = decodificatore # Se presente i thread attendono i processi di decodifica
+        self.anticipo = self.ANTICIPO_MINIMO
+        self.ritardi = 0 # Diapositive non pronte alla loro scadenza
+        self._latenze = deque(maxlen=self.CAMPIONI_LATENZA)
+        self._futuri = {} # indice -> Future con l'immagine pronta
+        self._pool = ThreadPoolExecutor(max_workers=lavoratori or min(4, os.cpu_count() or 2))
+
+    @property
+    def latenza(self):
+        """Latenza di decodifica peggiore tra le ultime misurate (secondi)."""
+        return max(self._latenze, default=0.0)
+
+    def _prepara(self, path):
+        """Eseguita nel pool: decodifica, adatta e centra l'immagine su uno sfondo grande come la vista."""
+        inizio = time.perf_counter()
+        try:
+            img = self._adatta(path)
+            fotogramma = Image.new("RGB", self.dimensione, self.sfondo)
+            posizione = ((self.dimensione[0] - img.width) // 2, (self.dimensione[1] - img.height) // 2)
+            fotogramma.paste(img, posizione, img if img.mode == "RGBA" else None)
+            return fotogramma
+        finally:
+            self._latenze.append(time.perf_counter() - inizio)
+
+    def _adatta(self, path):
+        """Immagine adattata alla vista, decodificata in un processo separato se disponibile."""
+        if self.decodificatore is not None:
+            try: futuro = self.decodificatore.decodifica(path, ("adatta", self.dimensione))
+            except ErroreDecodifica: futuro = None # Processi non disponibili: decodifica nel thread
+            if futuro is not None: return futuro.result()
+        return adatta_immagine(self.decodificatore.apri(path) if self.decodificatore is not None else path, self.dimensione)
+
+    def posiziona(self, indice):
+        """La proiezione è arrivata a 'indice': prepara le immagini della finestra e scarta le altre."""
+        necessario = math.ceil(self.latenza * self.MARGINE / self.intervallo) + 1
+        self.anticipo = max(self.anticipo, min(self.ANTICIPO_MASSIMO, necessario))
+        n = len(self.percorsi)
+        finestra = [(indice + k) % n for k in range(min(n, self.anticipo + 1))]
+        for i in [i for i in self._futuri if i not in finestra]:
+            self._futuri.pop(i).cancel() # Ancora in coda: non verrà decodificata
+        for i in finestra:
+            if i not in self._futuri:
+                self._futuri[i] = self._pool.submit(self._prepara, self.percorsi[i])
+
+    def pronta(self, indice):
+        futuro = self._futuri.get(indice)
+        return futuro is not None and futuro.done()
+
+    def risultato(self, indice):
+        """Immagine preparata (solleva l'eccezione della decodifica se il file non è leggibile)."""
+        return self._futuri[indice].result()
+
+    def memoria_occupata(self):
+        """Byte delle diapositive già preparate."""
+        return sum(byte_immagine(futuro.result()) for futuro in list(self._futuri.values())
+                   if futuro.done() and not futuro.cancelled() and futuro.exception() is None)
+
+    def segnala_ritardo(self):
+        """Una diapositiva non era pronta in tempo: allunga subito l'anticipo."""
+        self.ritardi += 1
+        self.anticipo = min(self.ANTICIPO_MASSIMO, self.anticipo + 1)
+
+    def chiudi(self):
+        for futuro in self._futuri.values(): futuro.cancel()
+        self._futuri.clear()
+        self._pool.shutdown(wait=False)
+
+
+class Proiezione:
+    """Proiezione a tempo su un Canvas, con dissolvenza opzionale tra le diapositive.
+
+    'al_cambio(indice)' viene chiamata ogni volta che viene mostrata una nuova diapositiva.
+    """
+
+    DURATA_TRANSIZIONE = 0.4 # Secondi di dissolvenza
+    PASSI_TRANSIZIONE = 8
+    ATTESA_DECODIFICA = 20 # ms tra due controlli se la diapositiva non è ancora pronta
+
+    def __init__(self, canvas, al_cambio, decodificatore=None):
+        self.canvas = canvas
+        self.al_cambio = al_cambio
+        self.decodificatore = decodificatore
+        self.pipeline = None
+        self.indice = -1
+        self.transizione = TRANSIZIONI[1]
+        self._job = None
+        self._scadenza = 0.0
+        self._precedente = None # Immagine PIL della diapositiva visibile (per la dissolvenza)
+        self._photo = None # Riferimento al PhotoImage visibile
+        canvas.bind("<Configure>", self._on_configure, add="+")
+
+    @property
+    def attiva(self):
+        return self.pipeline is not None
+
+    def avvia(self, percorsi, indice, intervallo, transizione=TRANSIZIONI[1]):
+        """Avvia la proiezione da 'indice' (la prima diapositiva viene mostrata appena pronta)."""
+        self.ferma()
+        self.canvas.update_idletasks()
+        dimensione = (max(1, self.canvas.winfo_width()), max(1, self.canvas.winfo_height()))
+        sfondo = self.canvas.cget("background")
+        try: ImageColor.getrgb(sfondo)
+        except ValueError: sfondo = "#000000" # Colore di sistema non riconosciuto da PIL
+        self.pipeline = PipelineDecodifica(percorsi, dimensione, intervallo, sfondo=sfondo, decodificatore=self.decodificatore)
+        self.transizione = transizione
+        self.vai_a(indice)
+
+    def memoria_occupata(self):
+        """Byte delle diapositive preparate e di quella visibile (il numero è limitato dall'anticipo)."""
+        if not self.attiva: return 0
+        return self.pipeline.memoria_occupata() + byte_immagine(self._precedente)
+
+    def vai_a(self, indice):
+        """Mostra subito 'indice' (appena pronto) e riparte da lì con il timer."""
+        if not self.attiva: return
+        self.indice = indice - 1
+        self._scadenza = 0.0 # Nessuna scadenza: va mostrata appena pronta
+        self._pianifica(0)
+
+    def ferma(self):
+        """Ferma la proiezione e rimuove le diapositive dal canvas."""
+        if self._job is not None:
+            self.canvas.after_cancel(self._job)
+            self._job = None
+        if self.pipeline: self.pipeline.chiudi()
+        self.pipeline = None
+        self._precedente = self._photo = None
+        self.canvas.delete("proiezione")
+
+    def _on_configure(self, event=None):
+        """Il canvas ha cambiato dimensione: ricomincia a preparare le diapositive alla nuova misura."""
+        if not self.attiva: return
+        dimensione = (max(1, self.canvas.winfo_width()), max(1, self.canvas.winfo_height()))
+        if dimensione != self.pipeline.dimensione:
+            pipeline = self.pipeline
+            self.avvia(pipeline.percorsi, max(0, self.indice), pipeline.intervallo, self.transizione)
+
+    def _pianifica(self, ms, funzione=None):
+        if self._job is not None: self.canvas.after_cancel(self._job)
+        self._job = self.canvas.after(max(0, int(ms)), funzione or self._avanza)
+
+    def _avanza(self):
+        """Alla scadenza mostra la diapositiva successiva; se non è pronta riprova tra poco."""
+        self._job = None
+        pipeline = self.pipeline
+        prossimo = (self.indice + 1) % len(pipeline.percorsi)
+        pipeline.posiziona(prossimo)
+        ora = time.monotonic()
+        if ora < self._scadenza:
+            self._pianifica((self._scadenza - ora) * 1000); return
+        if not pipeline.pronta(prossimo):
+            if self._scadenza and ora - self._scadenza < self.ATTESA_DECODIFICA / 1000:
+                pipeline.segnala_ritardo() # Appena scaduta e non pronta: serve più anticipo
+            self._pianifica(self.ATTESA_DECODIFICA); return
+        try:
+            immagine = pipeline.risultato(prossimo)
+        except Exception as e: # File illeggibile: la proiezione passa oltre
+            print(f"WARN: Proiezione, impossibile mostrare {pipeline.percorsi[prossimo]}: {e}")
+            self.indice = prossimo
+            self._pianifica(0); return
+        self.indice = prossimo
+        # Le scadenze restano a passo fisso; dopo un salto o un'attesa lunga si riparte da adesso
+        base = self._scadenza if 0 <= ora - self._scadenza < pipeline.intervallo else ora
+        self._scadenza = base + pipeline.intervallo
+        self.al_cambio(prossimo)
+        pipeline.posiziona((prossimo + 1) % len(pipeline.percorsi)) # Prepara già le successive
+        if self.transizione == "Dissolvenza" and self._precedente is not None and self._precedente.size == immagine.size:
+            self._dissolvenza(self._precedente, immagine, 1)
+        else:
+            self._disegna(immagine)
+            self._pianifica((self._scadenza - time.monotonic()) * 1000)
+        self._precedente = immagine
+
+    def _dissolvenza(self, da, a, passo):
+        """Disegna un passo della dissolvenza tra due diapositive."""
+        self._job = None
+        self._disegna(Image.blend(da, a, passo / self.PASSI_TRANSIZIONE) if passo < self.PASSI_TRANSIZIONE else a)
+        if passo < self.PASSI_TRANSIZIONE:
+            durata = min(self.DURATA_TRANSIZIONE, self.pipeline.intervallo / 2) # Mai più lunga della diapositiva
+            self._pianifica(durata * 1000 / self.PASSI_TRANSIZIONE,
+                            lambda: self._dissolvenza(da, a, passo + 1))
+        else:
+            self._pianifica((self._scadenza - time.monotonic()) * 1000)
+
+    def _disegna(self, immagine):
+        self._photo = ImageTk.PhotoImage(immagine)
+        elementi = self.canvas.find_withtag("proiezione")
+        if elementi: self.canvas.itemconfigure(elementi[0], image=self._photo)
+        else: self.canvas.create_image(0, 0, anchor=tk.NW, image=self._photo, tags="proiezione")
+        self.canvas.tag_raise("proiezione")
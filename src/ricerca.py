@@ -0,0 +1,498 @@
+# --- Query Strutturate e Ordinamenti sui Metadati ---
+# Interpreta query come "tokyo width>3000 size<2MB taken:2024 has:payload" e le
+# risolve su indici ordinati precalcolati in memoria: nessuna lettura da disco.
+import re # Per riconoscere i filtri nella query
+import time # Per convertire le date dei filtri "taken:" in timestamp
+import threading # L'indice a trigrammi viene costruito in un thread separato
+from concurrent.futures import Future # Indice a trigrammi pronto, letto dal thread della GUI
+from bisect import bisect_left, bisect_right # Ricerca binaria sugli indici ordinati
+import numpy as np # Conteggi vettorizzati per l'indice a trigrammi
+
+
+class ErroreQuery(ValueError):
+    """Query di ricerca non valida (es. 'size<abc')."""
+
+
+# Nomi accettati per ogni campo (inglese e italiano) -> chiave interna
+CAMPI = {
+    "width": "larghezza", "w": "larghezza", "larghezza": "larghezza",
+    "height": "altezza", "h": "altezza", "altezza": "altezza",
+    "size": "dimensione", "peso": "dimensione", "dimensione": "dimensione",
+    "taken": "data", "date": "data", "data": "data", "scatto": "data",
+    "has": "has", "ha": "has",
+}
+# Valori accettati per "has:" -> attributo richiesto
+ATTRIBUTI = {"payload": "payload", "testo": "payload", "text": "payload"}
+# Moltiplicatori per le unità di misura del peso (stessa base 1024 dei dettagli)
+UNITA = {"": 1, "b": 1, "k": 1024, "kb": 1024, "m": 1024 ** 2, "mb": 1024 ** 2, "g": 1024 ** 3, "gb": 1024 ** 3}
+
+_RE_FILTRO = re.compile(r"^(?P<neg>[-!])?(?P<campo>[a-z]+)(?P<op>>=|<=|>|<|=|:)(?P<valore>.+)$", re.IGNORECASE)
+_RE_PESO = re.compile(r"^(?P<numero>\d+(?:\.\d+)?)\s*(?P<unita>[a-z]*)$", re.IGNORECASE)
+_RE_DATA = re.compile(r"^(?P<anno>\d{4})(?:-(?P<mese>\d{1,2})(?:-(?P<giorno>\d{1,2}))?)?$")
+_RE_PAROLE = re.compile(r"[^\W_]+") # Parole alfanumeriche di un nome file
+
+
+class Query:
+    """Risultato dell'analisi di una query: testo libero sul nome + filtri strutturati."""
+
+    def __init__(self):
+        self.testo = "" # Parte libera della query (cercata nel nome file)
+        self.intervalli = [] # Tuple (chiave, minimo, massimo, includi_min, includi_max)
+        self.attributi = [] # Tuple (attributo, valore_richiesto), es. ("payload", True)
+
+    @property
+    def richiede_verdetto(self):
+        """True se la query usa 'has:payload' (serve l'analisi steganografica dei file)."""
+        return any(nome == "payload" for nome, _ in self.attributi)
+
+    @property
+    def vuota(self):
+        return not (self.testo or self.intervalli or self.attributi)
+
+
+def _intervallo_data(valore):
+    """Converte 'AAAA', 'AAAA-MM' o 'AAAA-MM-GG' nell'intervallo di timestamp [inizio, fine)."""
+    m = _RE_DATA.match(valore)
+    if not m: raise ErroreQuery(f"data non valida '{valore}' (usa AAAA, AAAA-MM o AAAA-MM-GG)")
+    anno, mese, giorno = int(m["anno"]), int(m["mese"] or 0), int(m["giorno"] or 0)
+    try:
+        if giorno:
+            inizio = (anno, mese, giorno); fine = (anno, mese, giorno + 1)
+        elif mese:
+            inizio = (anno, mese, 1); fine = (anno + mese // 12, mese % 12 + 1, 1)
+        else:
+            inizio = (anno, 1, 1); fine = (anno + 1, 1, 1)
+        # mktime normalizza da solo i giorni fuori mese (es. 31 + 1)
+        return (time.mktime(inizio + (0, 0, 0, 0, 0, -1)), time.mktime(fine + (0, 0, 0, 0, 0, -1)))
+    except (OverflowError, ValueError) as e:
+        raise ErroreQuery(f"data non valida '{valore}': {e}")
+
+
+def _valore_numerico(chiave, valore):
+    """Converte il valore di un filtro numerico (pixel, peso con unità o data)."""
+    if chiave == "dimensione":
+        m = _RE_PESO.match(valore)
+        if not m or m["unita"].lower() not in UNITA:
+            raise ErroreQuery(f"peso non valido '{valore}' (es. 500KB, 2MB)")
+        return float(m["numero"]) * UNITA[m["unita"].lower()]
+    if chiave == "data":
+        return _intervallo_data(valore)[0]
+    if not valore.isdigit(): raise ErroreQuery(f"valore non valido '{valore}' per {chiave}")
+    return int(valore)
+
+
+def analizza_query(testo):
+    """Interpreta una query di ricerca e restituisce un oggetto Query.
+    I token non riconosciuti come filtri formano il testo libero cercato nel nome.
+    """
+    query = Query()
+    parole = []
+    for token in (testo or "").split():
+        m = _RE_FILTRO.match(token)
+        chiave = CAMPI.get(m["campo"].lower()) if m else None
+        if not chiave: # Non è un filtro: fa parte del nome cercato
+            parole.append(token); continue
+
+        op, valore, negato = m["op"], m["valore"], bool(m["neg"])
+        if chiave == "has":
+            attributo = ATTRIBUTI.get(valore.lower())
+            if op != ":" or not attributo: raise ErroreQuery(f"filtro sconosciuto '{token}' (es. has:payload)")
+            query.attributi.append((attributo, not negato)); continue
+        if negato: raise ErroreQuery(f"la negazione è ammessa solo con has: ('{token}')")
+
+        if chiave == "data" and op in (":", "="):
+            # "taken:2024" -> tutto l'anno (o mese/giorno) indicato
+            inizio, fine = _intervallo_data(valore)
+            query.intervalli.append((chiave, inizio, fine, True, False)); continue
+        if chiave == "data" and op in (">", "<="):
+            # "taken>2023" -> dopo la fine del periodo indicato
+            numero = _intervallo_data(valore)[1]
+            op = ">=" if op == ">" else "<"
+        else:
+            numero = _valore_numerico(chiave, valore)
+
+        if op in (":", "="): query.intervalli.append((chiave, numero, numero, True, True))
+        elif op == ">": query.intervalli.append((chiave, numero, None, False, True))
+        elif op == ">=": query.intervalli.append((chiave, numero, None, True, True))
+        elif op == "<": query.intervalli.append((chiave, None, numero, True, False))
+        elif op == "<=": query.intervalli.append((chiave, None, numero, True, True))
+    query.testo = " ".join(parole).lower()
+    return query
+
+
+def _forma_parole(testo):
+    """Riscrive il testo come sequenza di parole con bordi di spazi ("  tokyo   jpg "),
+    così anche inizio e fine parola producono trigrammi (tolleranza agli errori di battitura).
+    """
+    return "  " + "   ".join(_RE_PAROLE.findall(testo)) + " "
+
+
+def _codici_trigrammi(stringhe):
+    """Calcola in modo vettorizzato i trigrammi di una lista di stringhe.
+    Restituisce (codici, righe): ogni trigramma è codificato in un int64 (3 code point da 21 bit)
+    e 'righe' indica la stringa di provenienza. I trigrammi che attraversano un carattere NUL sono scartati.
+    """
+    if not stringhe: return np.empty(0, np.int64), np.empty(0, np.int64)
+    testo = "\0".join(stringhe) + "\0"
+    cp = np.frombuffer(testo.encode("utf-32-le"), dtype=np.uint32).astype(np.int64)
+    if len(cp) < 3: return np.empty(0, np.int64), np.empty(0, np.int64)
+    codici = (cp[:-2] << 42) | (cp[1:-1] << 21) | cp[2:]
+    validi = (cp[:-2] != 0) & (cp[1:-1] != 0) & (cp[2:] != 0)
+    lunghezze = np.fromiter((len(s) + 1 for s in stringhe), np.int64, len(stringhe))
+    righe = np.repeat(np.arange(len(stringhe)), lunghezze)[:-2]
+    return codici[validi], righe[validi]
+
+
+class IndiceTrigrammi:
+    """Indice a trigrammi sui nomi file per la ricerca istantanea e tollerante agli errori.
+
+    Le liste di posizioni sono memorizzate in formato compatto (un unico array ordinato
+    per trigramma, con gli offset di inizio): una query somma con np.bincount le liste dei
+    suoi trigrammi e ordina i risultati per pertinenza. I nomi aggiunti dopo la costruzione
+    finiscono in un piccolo indice di appoggio, riassorbito quando diventa troppo grande.
+    """
+
+    SOGLIA_SIMILARITA = 0.5 # Frazione minima di trigrammi della query presenti nel nome
+    MAX_DELTA = 0.1 # Oltre questa frazione di nomi aggiunti l'indice compatto viene ricostruito
+
+    def __init__(self, nomi):
+        """'nomi' è la lista dei nomi per posizione (None per le posizioni rimosse)."""
+        self._nomi = [n.lower() if n is not None else None for n in nomi]
+        self._costruisci()
+
+    def _costruisci(self):
+        """Costruisce l'indice compatto su tutti i nomi correnti."""
+        stringhe = [self._stringa_indicizzata(n) if n is not None else "" for n in self._nomi]
+        codici, righe = _codici_trigrammi(stringhe)
+        # Ordina per trigramma (ordinamento stabile: le posizioni restano crescenti)
+        # e rimuove i duplicati all'interno dello stesso nome
+        ordine = np.argsort(codici, kind="stable")
+        codici, righe = codici[ordine], righe[ordine]
+        if len(codici):
+            distinti = np.ones(len(codici), bool)
+            distinti[1:] = (codici[1:] != codici[:-1]) | (righe[1:] != righe[:-1])
+            codici, righe = codici[distinti], righe[distinti]
+        self._codici, inizi = np.unique(codici, return_index=True)
+        self._inizi = np.append(inizi, len(codici)).astype(np.int64)
+        self._posizioni = righe.astype(np.int32)
+        self._delta = {} # trigramma -> posizioni aggiunte dopo la costruzione
+        self._n_delta = 0
+        self._vivi = np.array([n is not None for n in self._nomi], bool)
+        self._lunghezze = np.array([len(n) if n is not None else 0 for n in self._nomi], np.int32)
+
+    @staticmethod
+    def _stringa_indicizzata(nome):
+        """Testo indicizzato per un nome: il nome grezzo (sottostringhe esatte) seguito da due
+        caratteri di riempimento, così ogni carattere inizia almeno un trigramma (query di 1-2
+        caratteri), e la forma a parole con bordi (ricerca approssimata).
+        """
+        return f"{nome}\x01\x01\0{_forma_parole(nome)}"
+
+    # --- Aggiornamenti incrementali ---
+
+    def aggiungi(self, posizione, nome):
+        """Aggiunge il nome di una nuova posizione (le posizioni crescono sempre in coda)."""
+        nome = nome.lower()
+        self._nomi.extend([None] * (posizione + 1 - len(self._nomi)))
+        self._nomi[posizione] = nome
+        if (self._n_delta + 1) > self.MAX_DELTA * max(1, len(self._nomi)):
+            self._costruisci(); return # Indice di appoggio troppo grande: ricostruisce tutto
+        codici, _ = _codici_trigrammi([self._stringa_indicizzata(nome)])
+        for codice in np.unique(codici).tolist():
+            self._delta.setdefault(codice, []).append(posizione)
+        self._n_delta += 1
+        self._vivi = np.append(self._vivi, np.zeros(len(self._nomi) - len(self._vivi), bool))
+        self._lunghezze = np.append(self._lunghezze, np.zeros(len(self._nomi) - len(self._lunghezze), np.int32))
+        self._vivi[posizione] = True
+        self._lunghezze[posizione] = len(nome)
+
+    def rimuovi(self, posizione):
+        """Segna come rimossa una posizione (le liste di trigrammi non vengono toccate)."""
+        if 0 <= posizione < len(self._nomi):
+            self._nomi[posizione] = None
+            self._vivi[posizione] = False
+
+    # --- Ricerca ---
+
+    def _lista(self, codice):
+        """Posizioni dei nomi che contengono il trigramma indicato."""
+        k = np.searchsorted(self._codici, codice)
+        if k < len(self._codici) and self._codici[k] == codice:
+            base = self._posizioni[self._inizi[k]:self._inizi[k + 1]]
+        else:
+            base = self._posizioni[:0]
+        extra = self._delta.get(codice)
+        return np.concatenate([base, np.array(extra, np.int32)]) if extra else base
+
+    def _conteggi(self, codici):
+        """Per ogni posizione, quanti dei trigrammi indicati contiene."""
+        liste = [self._lista(c) for c in np.unique(codici).tolist()]
+        return np.bincount(np.concatenate(liste), minlength=len(self._nomi)) if liste else np.zeros(len(self._nomi), np.int64)
+
+    def _cerca_corto(self, testo):
+        """Ricerca di 1-2 caratteri: i trigrammi che iniziano con quel testo sono un blocco
+        contiguo dell'indice ordinato, quindi basta una ricerca binaria e un'unione.
+        """
+        cp = [ord(c) for c in testo]
+        inizio = cp[0] << 42 if len(cp) == 1 else (cp[0] << 42) | (cp[1] << 21)
+        fine = inizio + (1 << (42 if len(cp) == 1 else 21))
+        k0, k1 = np.searchsorted(self._codici, [inizio, fine])
+        trovati = np.zeros(len(self._nomi), bool) # Marcatura invece di np.unique: nessun ordinamento
+        trovati[self._posizioni[self._inizi[k0]:self._inizi[k1]]] = True
+        for codice, posizioni in self._delta.items():
+            if inizio <= codice < fine: trovati[posizioni] = True
+        candidati = np.nonzero(trovati & self._vivi)[0]
+        # A parità di corrispondenza, prima i nomi più corti (ordinamento stabile su 16 bit)
+        lunghezze = np.minimum(self._lunghezze[candidati], 65535).astype(np.uint16)
+        return candidati[np.argsort(lunghezze, kind="stable")]
+
+    def cerca(self, testo):
+        """Restituisce le posizioni dei nomi che corrispondono al testo, dalla più pertinente.
+        Prima le sottostringhe esatte, poi le corrispondenze approssimate (a parità, i nomi più corti).
+        """
+        return self.posizioni(testo).tolist()
+
+    def posizioni(self, testo):
+        """Come cerca(), ma restituisce un array NumPy (senza conversione in lista)."""
+        testo = (testo or "").strip().lower()
+        if not testo: return np.nonzero(self._vivi)[0]
+        if len(testo) < 3: return self._cerca_corto(testo)
+
+        interni, _ = _codici_trigrammi([testo])
+        parole, _ = _codici_trigrammi([_forma_parole(testo)])
+        n_interni, n_parole = len(np.unique(interni)), len(np.unique(parole))
+        # Contiene tutti i trigrammi del testo: (quasi certamente) sottostringa esatta
+        esatti = self._conteggi(interni) >= n_interni if n_interni else np.zeros(len(self._nomi), bool)
+        # Similarità approssimata: frazione di trigrammi delle parole della query presenti nel nome
+        copertura = self._conteggi(parole) / max(1, n_parole)
+        candidati = np.nonzero(((copertura >= self.SOGLIA_SIMILARITA) | esatti) & self._vivi)[0]
+        punteggio = copertura[candidati] + esatti[candidati] # Le corrispondenze esatte vengono prima
+        ordine = np.lexsort((candidati, self._lunghezze[candidati], -punteggio))
+        return candidati[ordine]
+
+
+def costruisci_indice_async(leggi_voci, *chiavi):
+    """Future di un IndiceMetadati sulle voci restituite da leggi_voci(), costruito in un thread
+    separato insieme agli ordinamenti indicati (la prima query non deve ordinare nulla).
+    """
+    futuro = Future()
+    def costruisci():
+        try:
+            indice = IndiceMetadati(leggi_voci())
+            indice.prepara(*chiavi)
+            futuro.set_result(indice)
+        except Exception as e:
+            futuro.set_exception(e)
+    threading.Thread(target=costruisci, daemon=True).start()
+    return futuro
+
+
+class IndiceMetadati:
+    """Indice in memoria sui metadati delle immagini (dizionari del catalogo).
+
+    Per ogni chiave di ordinamento mantiene la lista dei valori ordinati e delle
+    posizioni corrispondenti: filtri a intervallo e cambi di ordinamento diventano
+    ricerche binarie e scansioni di liste già pronte. Estensione e verdetto di ogni
+    posizione stanno in array NumPy: una query combina maschere e ranghi precalcolati
+    invece di visitare le voci una per una. L'indice a trigrammi sui nomi viene
+    costruito subito in background; finché non è pronto la ricerca per nome
+    confronta le sottostringhe esatte.
+    """
+
+    # Funzioni che estraggono il valore di ordinamento da una voce
+    CHIAVI = {
+        "nome": lambda v: (v.get("nome") or "").lower(),
+        "data": lambda v: v.get("data_scatto") or v.get("mtime") or 0,
+        "dimensione": lambda v: v.get("dimensione") or 0,
+        "risoluzione": lambda v: (v.get("larghezza") or 0) * (v.get("altezza") or 0),
+        "larghezza": lambda v: v.get("larghezza") or 0,
+        "altezza": lambda v: v.get("altezza") or 0,
+    }
+
+    def __init__(self, voci):
+        self.voci = list(voci) # Le voci rimosse diventano None (le posizioni restano stabili)
+        self._posizioni = {v["path"]: i for i, v in enumerate(self.voci)} # path -> posizione in self.voci
+        self._ordini = {} # chiave -> (valori_ordinati, terne_ordinate), costruiti al primo uso
+        self._sequenze = {} # chiave -> array delle posizioni nell'ordine della chiave (ricalcolato dopo le modifiche)
+        self._ranghi = {} # chiave -> array posizione -> rango nell'ordine della chiave
+        self._array_voci = None # self.voci come array di oggetti (per estrarre i risultati in blocco)
+        self._codici_estensione = {} # estensione -> codice usato in self._estensioni
+        self._estensioni = np.array([self._codice_estensione(v) for v in self.voci], np.int16)
+        self._verdetti = np.array([self._codice_verdetto(v) for v in self.voci], np.int8)
+        self._vive = np.array([v is not None for v in self.voci], bool)
+        self._trigrammi = None # Indice a trigrammi sui nomi, quando la costruzione è terminata
+        self._modifiche_nomi = [] # (posizione, nome o None) arrivate durante la costruzione
+        self._costruzione = Future()
+        nomi = [v.get("nome") if v is not None else None for v in self.voci]
+        threading.Thread(target=self._costruisci_trigrammi, args=(nomi,), daemon=True).start()
+
+    def _codice_estensione(self, voce):
+        if voce is None: return -1
+        return self._codici_estensione.setdefault(voce.get("estensione"), len(self._codici_estensione))
+
+    @staticmethod
+    def _codice_verdetto(voce):
+        """-1 = analisi non ancora fatta, altrimenti 0/1."""
+        verdetto = voce.get("verdetto_stegano") if voce is not None else None
+        return -1 if verdetto is None else int(bool(verdetto))
+
+    def _costruisci_trigrammi(self, nomi):
+        try: self._costruzione.set_result(IndiceTrigrammi(nomi))
+        except Exception as e: # Resta la ricerca per sottostringa esatta
+            print(f"WARN: Impossibile costruire l'indice a trigrammi: {e}")
+
+    def _indice_nomi(self):
+        """L'indice a trigrammi se è pronto (con le modifiche arrivate nel frattempo), altrimenti None."""
+        if self._trigrammi is None and self._costruzione.done():
+            self._trigrammi = self._costruzione.result()
+            for posizione, nome in self._modifiche_nomi:
+                if nome is None: self._trigrammi.rimuovi(posizione)
+                else: self._trigrammi.aggiungi(posizione, nome)
+            self._modifiche_nomi = []
+        return self._trigrammi
+
+    def _modifica_nome(self, posizione, nome):
+        """Riporta sull'indice a trigrammi (o accoda, se non è ancora pronto) un nome aggiunto o rimosso (None)."""
+        indice = self._indice_nomi()
+        if indice is None: self._modifiche_nomi.append((posizione, nome))
+        elif nome is None: indice.rimuovi(posizione)
+        else: indice.aggiungi(posizione, nome)
+
+    def _terna(self, chiave, i):
+        """Elemento dell'ordinamento: (valore, nome, posizione). A parità di valore vale l'ordine per nome."""
+        voce = self.voci[i]
+        return (self.CHIAVI[chiave](voce), (voce.get("nome") or "").lower(), i)
+
+    def _ordine(self, chiave):
+        """Restituisce (valori, terne) ordinati per la chiave indicata (calcolati una sola volta)."""
+        if chiave not in self._ordini:
+            terne = sorted(self._terna(chiave, i) for i, v in enumerate(self.voci) if v is not None)
+            self._ordini[chiave] = ([t[0] for t in terne], terne)
+        return self._ordini[chiave]
+
+    def _sequenza(self, chiave):
+        """Array delle posizioni delle voci nell'ordine della chiave."""
+        sequenza = self._sequenze.get(chiave)
+        if sequenza is None:
+            terne = self._ordine(chiave)[1]
+            sequenza = self._sequenze[chiave] = np.fromiter((t[2] for t in terne), np.int64, len(terne))
+        return sequenza
+
+    def _rango(self, chiave):
+        """Array posizione -> rango nell'ordine della chiave (per riordinare un sottoinsieme di posizioni)."""
+        rango = self._ranghi.get(chiave)
+        if rango is None:
+            sequenza = self._sequenza(chiave)
+            rango = self._ranghi[chiave] = np.zeros(len(self.voci), np.int64)
+            rango[sequenza] = np.arange(len(sequenza))
+        return rango
+
+    def prepara(self, *chiavi):
+        """Calcola in anticipo gli ordinamenti indicati (es. da un thread, prima del primo uso)."""
+        for chiave in chiavi: self._rango(chiave)
+        self.interroga(Query()) # Prepara anche l'array delle voci
+
+    def _maschera_intervallo(self, chiave, minimo, massimo, includi_min, includi_max):
+        """Maschera delle posizioni con valore nell'intervallo indicato (ricerca binaria)."""
+        valori = self._ordine(chiave)[0]
+        inizio = 0 if minimo is None else (bisect_left if includi_min else bisect_right)(valori, minimo)
+        fine = len(valori) if massimo is None else (bisect_right if includi_max else bisect_left)(valori, massimo)
+        maschera = np.zeros(len(self.voci), bool)
+        maschera[self._sequenza(chiave)[inizio:fine]] = True
+        return maschera
+
+    # --- Aggiornamenti incrementali (file aggiunti, modificati o rimossi) ---
+
+    def aggiorna_voce(self, voce):
+        """Aggiunge una voce o sostituisce quella con lo stesso path, aggiornando gli ordinamenti già calcolati."""
+        self.rimuovi_voce(voce["path"])
+        i = len(self.voci)
+        self.voci.append(voce)
+        self._posizioni[voce["path"]] = i
+        for chiave, (valori, terne) in self._ordini.items():
+            terna = self._terna(chiave, i)
+            k = bisect_left(terne, terna)
+            terne.insert(k, terna); valori.insert(k, terna[0])
+        self._sequenze.clear(); self._ranghi.clear(); self._array_voci = None
+        self._estensioni = np.append(self._estensioni, np.int16(self._codice_estensione(voce)))
+        self._verdetti = np.append(self._verdetti, np.int8(self._codice_verdetto(voce)))
+        self._vive = np.append(self._vive, True)
+        self._modifica_nome(i, voce.get("nome") or "")
+
+    def rimuovi_voce(self, path):
+        """Rimuove la voce con il path indicato (se presente). Restituisce la voce rimossa o None."""
+        i = self._posizioni.pop(path, None)
+        if i is None: return None
+        for chiave, (valori, terne) in self._ordini.items():
+            k = bisect_left(terne, self._terna(chiave, i))
+            del terne[k]; del valori[k]
+        self._sequenze.clear(); self._ranghi.clear(); self._array_voci = None
+        self._vive[i] = False
+        self._modifica_nome(i, None)
+        voce, self.voci[i] = self.voci[i], None
+        return voce
+
+    def voce(self, path):
+        """Restituisce la voce con il path indicato (o None)."""
+        i = self._posizioni.get(path)
+        return None if i is None else self.voci[i]
+
+    def imposta_verdetto(self, path, verdetto):
+        """Registra il verdetto steganografico (0/1) di una voce, se presente."""
+        i = self._posizioni.get(path)
+        if i is None: return
+        self.voci[i]["verdetto_stegano"] = verdetto
+        self._verdetti[i] = self._codice_verdetto(self.voci[i])
+
+    @property
+    def trigrammi_pronti(self):
+        """True quando la ricerca per nome tollera gli errori di battitura (indice a trigrammi costruito)."""
+        return self._indice_nomi() is not None
+
+    def cerca_nome(self, testo):
+        """Posizioni delle voci il cui nome corrisponde al testo (anche in modo approssimato), per pertinenza."""
+        return self._posizioni_nome(testo).tolist()
+
+    def _posizioni_nome(self, testo):
+        """Come cerca_nome(), ma restituisce un array NumPy."""
+        indice = self._indice_nomi()
+        if indice is not None: return indice.posizioni(testo)
+        # Indice ancora in costruzione: solo sottostringhe esatte (a parità, i nomi più corti)
+        testo = (testo or "").strip().lower()
+        nomi = ((i, (v.get("nome") or "").lower()) for i, v in enumerate(self.voci) if v is not None)
+        trovate = [(len(nome), i) for i, nome in nomi if testo in nome]
+        return np.array([i for _, i in sorted(trovate)], np.int64)
+
+    def interroga(self, query, estensioni=None, ordina_per="nome", decrescente=False):
+        """Restituisce le voci che soddisfano la query, nell'ordine richiesto.
+        Con ordina_per="pertinenza" e un testo libero, l'ordine è quello dell'indice a trigrammi.
+        """
+        ammesse = self._vive.copy()
+        if estensioni is not None:
+            codici = [self._codici_estensione[e] for e in set(e.lower() for e in estensioni) if e in self._codici_estensione]
+            ammesse &= np.isin(self._estensioni, codici)
+        for nome, valore in query.attributi:
+            # Verdetto -1 (analisi ancora in corso): escluso finché non è noto
+            if nome == "payload": ammesse &= self._verdetti == int(valore)
+        for chiave, minimo, massimo, includi_min, includi_max in query.intervalli:
+            ammesse &= self._maschera_intervallo(chiave, minimo, massimo, includi_min, includi_max)
+
+        if query.testo:
+            # Il nome viene cercato nell'indice a trigrammi (tollerante agli errori di battitura):
+            # si visitano solo i suoi candidati, già in ordine di pertinenza
+            candidati = self._posizioni_nome(query.testo)
+            sequenza = candidati[ammesse[candidati]]
+            if ordina_per != "pertinenza":
+                sequenza = sequenza[np.argsort(self._rango(ordina_per)[sequenza], kind="stable")]
+        else:
+            sequenza = self._sequenza("nome" if ordina_per == "pertinenza" else ordina_per)
+            sequenza = sequenza[ammesse[sequenza]]
+        if decrescente: sequenza = sequenza[::-1]
+        if self._array_voci is None:
+            self._array_voci = np.empty(len(self.voci), object)
+            self._array_voci[:] = self.voci
+        return self._array_voci[sequenza].tolist()
+
+    def invalida_ordini(self):
+        """Scarta gli ordinamenti precalcolati (da chiamare se cambiano i metadati delle voci)."""
+        self._ordini.clear(); self._sequenze.clear(); self._ranghi.clear()
@@ -0,0 +1,367 @@
+# --- Servizio HTTP Locale (asyncio) ---
+# Espone ad altri programmi della stessa macchina le operazioni della galleria:
+# nascondere e rivelare un testo, ispezionare un'immagine e crearne la miniatura.
+# Il server ascolta solo su localhost (o su un socket Unix), legge e scrive i corpi
+# a blocchi e affida il lavoro di calcolo a un pool di processi. Oltre un certo
+# numero di richieste in corso risponde subito 503 invece di accumularle.
+#
+# Avvio:   python src/servizio.py [--porta 8765] [--socket /tmp/galleria.sock] [--processi N]
+# Esempio: curl --data-binary @foto.png "http://127.0.0.1:8765/nascondi?testo=ciao" -o foto_con_testo.png
+# Con l'intestazione "X-Chiave: <frase>" /nascondi e /rivela usano la modalità con chiave.
+import io # Le immagini arrivano e ripartono come byte in memoria
+import os # Per operazioni sul sistema operativo (path, file)
+import sys # Per l'uscita dalla riga di comando
+import json # Risposte di /sonda e /stato
+import time # Per misurare le fasi di ogni richiesta (intestazione Server-Timing)
+import asyncio # Server e connessioni concorrenti
+import argparse # Opzioni della riga di comando
+import multiprocessing # Contesto 'spawn' per i processi di lavoro
+from urllib.parse import urlsplit, parse_qs # Percorso e parametri delle richieste
+from concurrent.futures import ProcessPoolExecutor # Pool di processi per il calcolo
+from concurrent.futures.process import BrokenProcessPool # Processo di lavoro terminato in modo anomalo
+from PIL import Image, UnidentifiedImageError # Per manipolazione immagini
+
+from steganografia import rileva_payload, nascondi_con_chiave, rivela_con_chiave, capacita_testo, capacita_con_chiave # Testo nascosto (anche con chiave)
+from miniature import crea_miniatura # Decodifica ridotta per le miniature
+from codificatore_png import salva_png, PROFILI_PNG, PROFILO_PREDEFINITO # PNG con profili di codifica
+
+HOST_PREDEFINITO = "127.0.0.1" # Solo connessioni dalla stessa macchina
+PORTA_PREDEFINITA = 8765
+CORPO_MASSIMO = 256 * 1024 * 1024 # Byte massimi del corpo di una richiesta
+BLOCCO = 64 * 1024 # Byte letti o scritti alla volta
+INTESTAZIONI_MASSIME = 64 * 1024 # Byte massimi della riga di richiesta più le intestazioni
+TIMEOUT_LETTURA = 30 # Secondi di attesa massima per intestazioni e blocchi del corpo
+TIMEOUT_LAVORO = 120 # Secondi massimi di calcolo per una richiesta
+LATO_MINIATURA = 256 # Lato predefinito di /miniatura
+LATO_MINIATURA_MASSIMO = 4096
+QUALITA_MINIATURA = 85 # Qualità JPEG delle miniature opache
+
+_MOTIVI = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 408: "Request Timeout",
+           411: "Length Required", 413: "Payload Too Large", 415: "Unsupported Media Type",
+           422: "Unprocessable Entity", 500: "Internal Server Error", 503: "Service Unavailable",
+           504: "Gateway Timeout"}
+
+
+class ErroreRichiesta(Exception):
+    """Richiesta non valida: viene restituita al client con il codice di stato indicato."""
+    def __init__(self, stato, messaggio):
+        super().__init__(messaggio)
+        self.stato = stato
+
+    def __reduce__(self): # Deve attraversare il confine tra processi
+        return type(self), (self.stato, str(self))
+
+
+# --- Lavori (eseguiti nei processi del pool) ---
+# Ricevono i byte dell'immagine e i parametri, restituiscono (tipo di contenuto, byte).
+
+def lavoro_nascondi(dati, testo, profilo, chiave):
+    with Image.open(io.BytesIO(dati)) as img:
+        # Dalle dimensioni nell'header: un testo che non ci sta viene rifiutato prima di decodificare i pixel
+        capacita = (capacita_con_chiave if chiave else capacita_testo)(img.width, img.height)
+        occupati = len(testo.encode("utf-8"))
+        if occupati > capacita:
+            raise ErroreRichiesta(413, f"Il testo occupa {occupati} byte, l'immagine ({img.width}x{img.height}) ne può contenere {capacita}")
+        if chiave: immagine = nascondi_con_chiave(img, testo, chiave)
+    if not chiave:
+        from stegano import lsb # Importata solo nei processi di lavoro che la usano
+        immagine = lsb.hide(io.BytesIO(dati), testo, auto_convert_rgb=True) # Niente domanda su console per i modi non RGB
+    uscita = io.BytesIO()
+    salva_png(immagine, uscita, profilo)
+    return "image/png", uscita.getvalue()
+
+
+def lavoro_rivela(dati, chiave):
+    if chiave:
+        with Image.open(io.BytesIO(dati)) as img: testo = rivela_con_chiave(img, chiave)
+    else:
+        from stegano import lsb
+        testo = None
+        # Senza un'intestazione plausibile stegano scorrerebbe l'intera immagine pixel per pixel
+        if rileva_payload(io.BytesIO(dati)):
+            try: testo = lsb.reveal(io.BytesIO(dati))
+            except (IndexError, ValueError): pass # Così stegano segnala un'immagine senza intestazione valida
+    if not testo: raise ErroreRichiesta(404, "Nessun testo nascosto trovato nell'immagine")
+    return "text/plain; charset=utf-8", testo.encode("utf-8")
+
+
+def lavoro_sonda(dati):
+    with Image.open(io.BytesIO(dati)) as img:
+        info = {"formato": img.format, "larghezza": img.width, "altezza": img.height, "modo": img.mode,
+                "animata": getattr(img, "n_frames", 1) > 1}
+    info["byte"] = len(dati)
+    info["testo_nascosto"] = rileva_payload(io.BytesIO(dati))
+    return "application/json", json.dumps(info).encode("utf-8")
+
+
+def lavoro_miniatura(dati, lato):
+    miniatura = crea_miniatura(io.BytesIO(dati), (lato, lato))
+    uscita = io.BytesIO()
+    if miniatura.mode in ("RGBA", "LA", "PA") or "transparency" in miniatura.info:
+        miniatura.convert("RGBA").save(uscita, "PNG")
+        return "image/png", uscita.getvalue()
+    miniatura.convert("RGB").save(uscita, "JPEG", quality=QUALITA_MINIATURA)
+    return "image/jpeg", uscita.getvalue()
+
+
+def _parametro(parametri, nome, predefinito=None):
+    valori = parametri.get(nome)
+    return valori[0] if valori else predefinito
+
+
+def _chiave(intestazioni):
+    # Nell'intestazione e non nell'indirizzo: la frase segreta non finisce nei log né nella cronologia
+    chiave = intestazioni.get("x-chiave")
+    if not chiave: return None
+    try: return chiave.encode("latin-1").decode("utf-8") # Le intestazioni sono lette come latin-1
+    except UnicodeError: raise ErroreRichiesta(400, "X-Chiave deve essere in UTF-8")
+
+
+def _prepara_nascondi(parametri, intestazioni):
+    testo = _parametro(parametri, "testo")
+    if not testo: raise ErroreRichiesta(400, "Parametro 'testo' mancante")
+    profilo = _parametro(parametri, "profilo", PROFILO_PREDEFINITO)
+    if profilo not in PROFILI_PNG: raise ErroreRichiesta(400, f"Profilo sconosciuto: {profilo} (disponibili: {', '.join(PROFILI_PNG)})")
+    return testo, profilo, _chiave(intestazioni)
+
+
+def _prepara_miniatura(parametri, intestazioni):
+    try: lato = int(_parametro(parametri, "lato", LATO_MINIATURA))
+    except ValueError: raise ErroreRichiesta(400, "Il parametro 'lato' deve essere un numero intero")
+    if not 1 <= lato <= LATO_MINIATURA_MASSIMO: raise ErroreRichiesta(400, f"'lato' deve essere tra 1 e {LATO_MINIATURA_MASSIMO}")
+    return (lato,)
+
+
+# Percorso -> (lavoro, funzione che ricava da parametri e intestazioni gli argomenti dopo i byte dell'immagine)
+OPERAZIONI = {
+    "/nascondi": (lavoro_nascondi, _prepara_nascondi),
+    "/rivela": (lavoro_rivela, lambda parametri, intestazioni: (_chiave(intestazioni),)),
+    "/sonda": (lavoro_sonda, lambda parametri, intestazioni: ()),
+    "/miniatura": (lavoro_miniatura, _prepara_miniatura),
+}
+
+
+class ServizioGalleria:
+    """Server HTTP/1.1 minimale su asyncio per le OPERAZIONI (sempre POST con l'immagine come corpo).
+
+    Al massimo 'processi' lavori vengono calcolati insieme; altri 'processi' * 3
+    possono attendere il proprio turno. Oltre questo limite la richiesta viene
+    rifiutata con 503 prima di leggerne il corpo. Ogni risposta riporta la durata
+    delle fasi (lettura, attesa, calcolo) nell'intestazione Server-Timing.
+    """
+
+    def __init__(self, processi=None):
+        self.processi = processi or os.cpu_count() or 1
+        self.limite_richieste = self.processi * 4 # In calcolo + in attesa
+        self.richieste_attive = 0
+        self.completate = 0
+        self.rifiutate = 0
+        self._calcolo = asyncio.Semaphore(self.processi)
+        self._pool = self._crea_pool()
+        self._server = None
+
+    def _crea_pool(self):
+        # 'spawn' come per l'esportazione: processi puliti, senza stato ereditato
+        return ProcessPoolExecutor(max_workers=self.processi, mp_context=multiprocessing.get_context("spawn"))
+
+    async def avvia(self, host=HOST_PREDEFINITO, porta=PORTA_PREDEFINITA, socket_unix=None):
+        """Inizia ad accettare connessioni (su 'socket_unix' se indicato, altrimenti su host:porta)."""
+        if socket_unix:
+            if os.path.exists(socket_unix): os.remove(socket_unix) # Socket rimasto da un avvio precedente
+            self._server = await asyncio.start_unix_server(self._gestisci_connessione, socket_unix, limit=INTESTAZIONI_MASSIME)
+        else:
+            self._server = await asyncio.start_server(self._gestisci_connessione, host, porta, limit=INTESTAZIONI_MASSIME)
+        return self._server
+
+    async def chiudi(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    async def _gestisci_connessione(self, lettore, scrittore):
+        try:
+            while await self._gestisci_richiesta(lettore, scrittore): pass # Connessioni persistenti (keep-alive)
+        except (ConnectionError, asyncio.IncompleteReadError): pass # Client disconnesso
+        except Exception as e:
+            print(f"WARN: Servizio, errore sulla connessione: {e}")
+        finally:
+            scrittore.close()
+            try: await scrittore.wait_closed()
+            except Exception: pass
+
+    async def _gestisci_richiesta(self, lettore, scrittore):
+        """Serve una richiesta; restituisce True se la connessione può restare aperta."""
+        try: testa = await asyncio.wait_for(lettore.readuntil(b"\r\n\r\n"), TIMEOUT_LETTURA)
+        except asyncio.IncompleteReadError as e:
+            if e.partial.strip(): print("WARN: Servizio, richiesta interrotta prima della fine delle intestazioni")
+            return False
+        except asyncio.LimitOverrunError:
+            await self._rispondi_errore(scrittore, 400, "Intestazioni troppo lunghe", False)
+            return False
+        except asyncio.TimeoutError:
+            return False
+
+        inizio = time.perf_counter()
+        try:
+            metodo, destinazione, versione = testa.decode("latin-1").split("\r\n", 1)[0].split(" ", 2)
+        except ValueError:
+            await self._rispondi_errore(scrittore, 400, "Riga di richiesta non valida", False)
+            return False
+        intestazioni = {}
+        for riga in testa.decode("latin-1").split("\r\n")[1:]:
+            if ":" in riga:
+                nome, valore = riga.split(":", 1)
+                intestazioni[nome.strip().lower()] = valore.strip()
+        connessione = intestazioni.get("connection", "").lower()
+        persistente = connessione != "close" if versione == "HTTP/1.1" else connessione == "keep-alive"
+        indirizzo = urlsplit(destinazione)
+        parametri = parse_qs(indirizzo.query)
+
+        if metodo == "GET" and indirizzo.path == "/stato":
+            await self._rispondi(scrittore, 200, "application/json", json.dumps(self.stato()).encode("utf-8"), {}, persistente)
+            return persistente
+        if indirizzo.path not in OPERAZIONI:
+            await self._rispondi_errore(scrittore, 404, f"Operazione sconosciuta: {indirizzo.path}", False)
+            return False
+        if metodo != "POST":
+            await self._rispondi_errore(scrittore, 405, "Usa POST con l'immagine come corpo della richiesta", False)
+            return False
+
+        # Controllo di carico prima di leggere il corpo: il client non invia megabyte che verrebbero scartati
+        if self.richieste_attive >= self.limite_richieste:
+            self.rifiutate += 1
+            await self._rispondi_errore(scrittore, 503, "Servizio occupato, riprova tra poco", False, {"Retry-After": "1"})
+            return False
+        self.richieste_attive += 1
+        try:
+            lavoro, prepara = OPERAZIONI[indirizzo.path]
+            try:
+                argomenti = prepara(parametri, intestazioni)
+                dati = await self._leggi_corpo(lettore, scrittore, intestazioni)
+            except ErroreRichiesta as e:
+                # Il corpo non letto resterebbe nel flusso: la connessione va chiusa
+                await self._rispondi_errore(scrittore, e.stato, str(e), False)
+                return False
+            letto = time.perf_counter()
+
+            async with self._calcolo:
+                in_calcolo = time.perf_counter()
+                try:
+                    tipo, risultato = await asyncio.wait_for(self._esegui(lavoro, dati, *argomenti), TIMEOUT_LAVORO)
+                    stato = 200
+                except ErroreRichiesta as e:
+                    stato, tipo, risultato = e.stato, "text/plain; charset=utf-8", str(e).encode("utf-8")
+                except asyncio.TimeoutError:
+                    stato, tipo, risultato = 504, "text/plain; charset=utf-8", f"Calcolo oltre {TIMEOUT_LAVORO} s".encode("utf-8")
+                except UnidentifiedImageError:
+                    stato, tipo, risultato = 415, "text/plain; charset=utf-8", b"Il corpo non e' un'immagine riconosciuta"
+                except ValueError as e: # Es. testo troppo lungo per l'immagine
+                    stato, tipo, risultato = 422, "text/plain; charset=utf-8", str(e).encode("utf-8")
+                except Exception as e:
+                    print(f"WARN: Servizio, errore in {indirizzo.path}: {type(e).__name__}: {e}")
+                    stato, tipo, risultato = 500, "text/plain; charset=utf-8", f"{type(e).__name__}: {e}".encode("utf-8")
+                finito = time.perf_counter()
+
+            tempi = {"Server-Timing": f"lettura;dur={(letto - inizio) * 1000:.1f}, attesa;dur={(in_calcolo - letto) * 1000:.1f}, "
+                                      f"calcolo;dur={(finito - in_calcolo) * 1000:.1f}"}
+            await self._rispondi(scrittore, stato, tipo, risultato, tempi, persistente)
+            self.completate += 1
+            return persistente
+        finally:
+            self.richieste_attive -= 1
+
+    async def _esegui(self, lavoro, *argomenti):
+        try:
+            return await asyncio.wrap_future(self._pool.submit(lavoro, *argomenti))
+        except BrokenProcessPool:
+            # Un processo di lavoro è morto (es. memoria esaurita): il pool va ricreato per le prossime richieste
+            print("WARN: Servizio, processo di lavoro terminato in modo anomalo: pool ricreato")
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = self._crea_pool()
+            raise RuntimeError("Processo di lavoro terminato durante il calcolo")
+
+    async def _leggi_corpo(self, lettore, scrittore, intestazioni):
+        """Legge il corpo a blocchi (Content-Length o chunked), fino a CORPO_MASSIMO byte."""
+        a_pezzi = "chunked" in intestazioni.get("transfer-encoding", "").lower()
+        lunghezza = intestazioni.get("content-length")
+        if not a_pezzi:
+            if lunghezza is None: raise ErroreRichiesta(411, "Serve Content-Length o Transfer-Encoding: chunked")
+            try: lunghezza = int(lunghezza)
+            except ValueError: raise ErroreRichiesta(400, "Content-Length non valido")
+            if lunghezza > CORPO_MASSIMO: raise ErroreRichiesta(413, f"Corpo oltre {CORPO_MASSIMO // (1024 * 1024)} MB")
+        if intestazioni.get("expect", "").lower() == "100-continue":
+            scrittore.write(b"HTTP/1.1 100 Continue\r\n\r\n") # Il client aspetta questo prima di inviare il corpo
+            await scrittore.drain()
+
+        dati = bytearray()
+        async def leggi(n):
+            try: return await asyncio.wait_for(lettore.readexactly(n), TIMEOUT_LETTURA)
+            except asyncio.TimeoutError: raise ErroreRichiesta(408, "Corpo della richiesta non ricevuto in tempo")
+
+        if not a_pezzi:
+            while len(dati) < lunghezza: dati += await leggi(min(BLOCCO, lunghezza - len(dati)))
+            return bytes(dati)
+        while True:
+            try: riga = await asyncio.wait_for(lettore.readuntil(b"\r\n"), TIMEOUT_LETTURA)
+            except asyncio.TimeoutError: raise ErroreRichiesta(408, "Corpo della richiesta non ricevuto in tempo")
+            try: dimensione = int(riga.split(b";", 1)[0], 16) # Eventuali estensioni del pezzo vengono ignorate
+            except ValueError: raise ErroreRichiesta(400, "Dimensione del pezzo non valida")
+            if dimensione == 0:
+                while (await lettore.readuntil(b"\r\n")) != b"\r\n": pass # Intestazioni finali (trailer) ignorate
+                return bytes(dati)
+            if len(dati) + dimensione > CORPO_MASSIMO: raise ErroreRichiesta(413, f"Corpo oltre {CORPO_MASSIMO // (1024 * 1024)} MB")
+            while dimensione:
+                blocco = await leggi(min(BLOCCO, dimensione))
+                dati += blocco; dimensione -= len(blocco)
+            await leggi(2) # CRLF dopo ogni pezzo
+
+    async def _rispondi(self, scrittore, stato, tipo, corpo, intestazioni, persistente):
+        """Invia la risposta a pezzi (chunked), aspettando che il client legga ogni blocco (drain)."""
+        righe = [f"HTTP/1.1 {stato} {_MOTIVI.get(stato, '')}", f"Content-Type: {tipo}",
+                 "Transfer-Encoding: chunked", f"Connection: {'keep-alive' if persistente else 'close'}"]
+        righe += [f"{nome}: {valore}" for nome, valore in intestazioni.items()]
+        scrittore.write(("\r\n".join(righe) + "\r\n\r\n").encode("latin-1"))
+        vista = memoryview(corpo)
+        for i in range(0, len(vista), BLOCCO):
+            pezzo = vista[i:i + BLOCCO]
+            scrittore.write(b"%x\r\n" % len(pezzo)); scrittore.write(pezzo); scrittore.write(b"\r\n")
+            await scrittore.drain() # Contropressione: non si accumula in memoria ciò che il client non legge
+        scrittore.write(b"0\r\n\r\n")
+        await scrittore.drain()
+
+    async def _rispondi_errore(self, scrittore, stato, messaggio, persistente, intestazioni=None):
+        await self._rispondi(scrittore, stato, "text/plain; charset=utf-8", messaggio.encode("utf-8"), intestazioni or {}, persistente)
+
+    def stato(self):
+        """Contatori del servizio (restituiti da GET /stato)."""
+        return {"processi": self.processi, "richieste_attive": self.richieste_attive,
+                "limite_richieste": self.limite_richieste, "completate": self.completate, "rifiutate": self.rifiutate}
+
+
+async def _esegui_servizio(opzioni):
+    servizio = ServizioGalleria(opzioni.processi)
+    await servizio.avvia(opzioni.host, opzioni.porta, opzioni.socket)
+    dove = opzioni.socket or f"http://{opzioni.host}:{opzioni.porta}"
+    print(f"Servizio Galleria in ascolto su {dove} ({servizio.processi} processi). Operazioni: {', '.join(OPERAZIONI)}, GET /stato")
+    try:
+        await asyncio.Event().wait() # Fino a Ctrl+C
+    finally:
+        await servizio.chiudi()
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    analizzatore = argparse.ArgumentParser(description="Servizio HTTP locale per steganografia e miniature.")
+    analizzatore.add_argument("--host", default=HOST_PREDEFINITO, help="Indirizzo di ascolto (predefinito: solo localhost)")
+    analizzatore.add_argument("--porta", type=int, default=PORTA_PREDEFINITA)
+    analizzatore.add_argument("--socket", help="Ascolta su questo socket Unix invece che su host:porta")
+    analizzatore.add_argument("--processi", type=int, help="Processi di calcolo (predefinito: tutti i core)")
+    opzioni = analizzatore.parse_args()
+    if opzioni.host not in ("127.0.0.1", "localhost", "::1"):
+        print(f"WARN: Il servizio non ha autenticazione: in ascolto su {opzioni.host} è raggiungibile da altre macchine")
+    try:
+        asyncio.run(_esegui_servizio(opzioni))
+    except KeyboardInterrupt:
+        print("Servizio terminato.")
+        sys.exit(0)
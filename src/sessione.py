@@ -0,0 +1,98 @@
+# --- Istantanea della Sessione ---
+# Alla chiusura salva in DATA_DIR un'istantanea compatta della sessione: cartella,
+# filtri, ricerca, posizione di scorrimento, immagine selezionata, le voci dei
+# metadati e le miniature che erano in vista. All'avvio l'istantanea viene mostrata
+# subito (senza scansione né decodifica); un thread confronta poi la cartella con
+# le voci salvate e la galleria applica solo i file aggiunti, rimossi o modificati.
+import os # Per operazioni sul sistema operativo (path, file)
+import json # Formato dell'istantanea
+import threading # La verifica della cartella gira in un thread separato
+from concurrent.futures import Future # Risultato della verifica, letto dal thread della GUI
+from PIL import Image # Per salvare e rileggere le miniature
+
+from catalogo import CatalogoImmagini # Colonne delle voci dei metadati
+from osservatore import istantanea_cartella, confronta_istantanee # Differenze rispetto alla cartella
+
+FILE_SESSIONE = "sessione.json" # Nome dell'istantanea dentro DATA_DIR
+CARTELLA_MINIATURE = "miniature_sessione" # Miniature in vista alla chiusura (una per file, nome = chiave)
+VERSIONE_SESSIONE = 1 # Istantanee di versioni diverse vengono ignorate
+MINIATURE_MASSIME = 200 # Miniature salvate al massimo
+QUALITA_MINIATURE = 85 # Qualità JPEG delle miniature opache
+
+
+def salva_sessione(cartella_dati, stato, voci, miniature):
+    """Scrive l'istantanea: 'stato' (dizionario di impostazioni), le voci dei metadati
+    della cartella e le miniature [(chiave, immagine PIL)] da mostrare al riavvio.
+    """
+    os.makedirs(cartella_dati, exist_ok=True)
+    cartella_miniature = os.path.join(cartella_dati, CARTELLA_MINIATURE)
+    os.makedirs(cartella_miniature, exist_ok=True)
+
+    salvate = {}
+    for chiave, img in miniature[:MINIATURE_MASSIME]:
+        if not chiave or chiave in salvate or os.path.basename(chiave) != chiave: continue # Solo chiavi della cache
+        nome = chiave + (".png" if img.mode == "RGBA" else ".jpg")
+        destinazione = os.path.join(cartella_miniature, nome)
+        try:
+            # Le miniature non cambiano finché non cambia la chiave: quelle già su disco restano
+            if not os.path.exists(destinazione):
+                if img.mode == "RGBA": img.save(destinazione)
+                else: img.convert("RGB").save(destinazione, quality=QUALITA_MINIATURE)
+            salvate[chiave] = nome
+        except Exception as e:
+            print(f"WARN: Sessione, impossibile salvare la miniatura {chiave}: {e}")
+    # Le miniature di sessioni precedenti non più in vista vengono rimosse
+    for nome in os.listdir(cartella_miniature):
+        if nome not in salvate.values():
+            try: os.remove(os.path.join(cartella_miniature, nome))
+            except OSError: pass
+
+    colonne = CatalogoImmagini.COLONNE
+    contenuto = dict(stato, versione=VERSIONE_SESSIONE, miniature=salvate,
+                     colonne=list(colonne), voci=[[v.get(c) for c in colonne] for v in voci if v])
+    # Scrittura atomica: un'interruzione a metà lascia l'istantanea precedente
+    temporaneo = os.path.join(cartella_dati, FILE_SESSIONE + ".tmp")
+    with open(temporaneo, "w", encoding="utf-8") as f:
+        json.dump(contenuto, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(temporaneo, os.path.join(cartella_dati, FILE_SESSIONE))
+
+
+def carica_sessione(cartella_dati):
+    """Legge l'istantanea. Restituisce (stato, voci) oppure None se manca o non è utilizzabile."""
+    path = os.path.join(cartella_dati, FILE_SESSIONE)
+    if not os.path.exists(path): return None
+    try:
+        with open(path, encoding="utf-8") as f: contenuto = json.load(f)
+        if contenuto.get("versione") != VERSIONE_SESSIONE: return None
+        colonne = contenuto.pop("colonne")
+        voci = [dict(zip(colonne, riga)) for riga in contenuto.pop("voci")]
+        return contenuto, voci
+    except Exception as e:
+        print(f"WARN: Sessione precedente non leggibile, avvio senza: {e}")
+        return None
+
+
+def carica_miniature(cartella_dati, stato):
+    """Restituisce {chiave: immagine PIL} delle miniature salvate con l'istantanea."""
+    cartella_miniature = os.path.join(cartella_dati, CARTELLA_MINIATURE)
+    miniature = {}
+    for chiave, nome in stato.get("miniature", {}).items():
+        try:
+            with Image.open(os.path.join(cartella_miniature, nome)) as img:
+                img.load()
+                miniature[chiave] = img.convert("RGBA" if img.mode == "RGBA" else "RGB")
+        except Exception: pass # Miniatura mancante: verrà decodificata come le altre
+    return miniature
+
+
+def verifica_sessione(cartella, voci, estensioni):
+    """Confronta in un thread separato la cartella con le voci dell'istantanea.
+    Restituisce un Future con la lista di eventi (tipo, path) come quelli dell'osservatore.
+    """
+    futuro = Future()
+    salvate = {v["path"]: (v.get("dimensione"), v.get("mtime")) for v in voci}
+    def esegui():
+        try: futuro.set_result(confronta_istantanee(salvate, istantanea_cartella(os.path.abspath(cartella), estensioni)))
+        except Exception as e: futuro.set_exception(e)
+    threading.Thread(target=esegui, daemon=True).start()
+    return futuro
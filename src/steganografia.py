@@ -0,0 +1,302 @@
+# --- Funzioni di Supporto per la Steganografia LSB ---
+# Strumenti leggeri compatibili con il formato usato da stegano.lsb:
+# il messaggio è preceduto dall'intestazione "<lunghezza in byte>:" e i bit
+# sono scritti nell'LSB dei canali R, G, B dei pixel, riga per riga.
+#
+# Modalità con chiave: una frase segreta stabilisce una permutazione pseudo-casuale
+# degli "slot" (un canale R, G o B di un pixel). I bit vengono sparsi su tutta
+# l'immagine invece di occupare le prime righe. La permutazione è una rete di
+# Feistel con chiave (con "cycle walking"): si calcola con NumPy la posizione
+# dei soli slot usati, senza generare né conservare la permutazione intera.
+import os # Per il numero di core disponibili
+import zlib # CRC32 del messaggio: riconosce una chiave sbagliata
+import queue # Verdetti dell'analisi in background verso il thread della GUI
+import hashlib # Derivazione delle chiavi di round dalla frase segreta
+import threading # Il coordinatore dell'analisi gira in un thread separato
+import multiprocessing # Contesto 'spawn' per i processi di analisi
+from concurrent.futures import ProcessPoolExecutor # La decodifica dei file tiene il GIL: processi, non thread
+import numpy as np # Scrittura e lettura vettorizzata degli slot
+from PIL import Image # Per leggere i pixel delle immagini
+
+from cache import CacheLRU # Chiavi di round già derivate
+
+# Cifre massime ammesse nell'intestazione (lunghezze fino a 10^12 byte)
+MAX_CIFRE_INTESTAZIONE = 12
+CANALI_USATI = 3 # R, G, B (l'alfa non viene toccato; gli altri modi vengono convertiti in RGB)
+BIT_PER_CANALE = 1 # stegano.lsb scrive un solo bit per canale
+BIT_INTESTAZIONE_CHIAVE = 64 # Modalità con chiave: lunghezza (32 bit) e CRC32 (32 bit) del messaggio
+ROUND_FEISTEL = 6 # Round della permutazione con chiave
+ITERAZIONI_CHIAVE = 100_000 # PBKDF2: rende costoso provare molte frasi segrete
+BLOCCO_PERMUTAZIONE = 1 << 18 # Slot calcolati per volta
+LOTTO_ANALISI = 8 # File inviati insieme a ogni processo di AnalisiPayload (pochi: l'annullamento resta rapido)
+SLOT_PUNTUALI = 1 << 16 # Fino a questi slot i pixel si leggono e scrivono uno per uno, senza convertire l'immagine in array
+CHIAVI_IN_CACHE = 16 # Chiavi di round conservate per la sessione (per frase segreta e numero di slot)
+_SALE_CHIAVE = b"galleria-steganografia-lsb"
+
+# (frase segreta, n) -> chiavi di round: PBKDF2 è lento di proposito, si paga una volta per sessione
+_chiavi_round = CacheLRU(CHIAVI_IN_CACHE)
+
+
+def rileva_payload(path):
+    """Indica se l'immagine contiene (probabilmente) un testo nascosto con stegano.lsb.
+    Legge solo i bit dell'intestazione "<n>:" senza estrarre il messaggio.
+    """
+    try:
+        with Image.open(path) as img:
+            if img.mode not in ("RGB", "RGBA"): return False # stegano lavora solo su RGB/RGBA
+            larghezza, altezza = img.size
+            # Pixel necessari per leggere l'intestazione più lunga possibile (3 bit per pixel)
+            n_pixel = min(larghezza * altezza, ((MAX_CIFRE_INTESTAZIONE + 1) * 8 + 2) // 3)
+            righe = -(-n_pixel // larghezza) # Divisione arrotondata per eccesso
+            pixel = list(img.crop((0, 0, larghezza, righe)).getdata())[:n_pixel]
+    except Exception:
+        return False # File non leggibile: nessun testo rilevabile
+
+    # Ricostruisce i byte dai bit meno significativi (R, G, B)
+    bit = [canale & 1 for p in pixel for canale in p[:3]]
+    cifre = ""
+    for i in range(0, len(bit) - 7, 8):
+        byte = int("".join(map(str, bit[i:i + 8])), 2)
+        if byte == ord(":"):
+            # Intestazione completa: la lunghezza deve essere plausibile per l'immagine
+            if not cifre: return False
+            lunghezza = int(cifre)
+            return 0 < lunghezza and (len(cifre) + 1 + lunghezza) * 8 <= larghezza * altezza * 3
+        if not chr(byte).isdigit(): return False
+        cifre += chr(byte)
+    return False # Nessun ':' entro il numero massimo di cifre
+
+
+class AnalisiPayload:
+    """Applica rileva_payload() a una lista di file su un pool di processi.
+
+    Il thread della GUI chiama risultati_pronti() (non bloccante) per raccogliere i
+    verdetti arrivati e annulla() per interrompere; 'terminata' diventa True quando
+    non arriveranno altri verdetti.
+    """
+
+    def __init__(self, percorsi, processi=None):
+        self.percorsi = list(percorsi)
+        self._insieme = set(self.percorsi)
+        self.processi = processi or os.cpu_count() or 1
+        self.fatti = 0
+        self.terminata = False
+        self._coda = queue.Queue()
+        self._annulla = threading.Event()
+
+    @property
+    def totale(self):
+        return len(self.percorsi)
+
+    def copre(self, percorsi):
+        """True se tutti i file indicati fanno parte di questa analisi."""
+        return self._insieme.issuperset(percorsi)
+
+    def avvia(self):
+        """Avvia l'analisi in background."""
+        threading.Thread(target=self._coordina, daemon=True).start()
+
+    def _coordina(self):
+        # 'spawn' evita di duplicare con fork() un processo con Tk e altri thread attivi
+        pool = ProcessPoolExecutor(max_workers=self.processi, mp_context=multiprocessing.get_context("spawn"))
+        fatti = 0
+        try:
+            for path, verdetto in zip(self.percorsi, pool.map(rileva_payload, self.percorsi, chunksize=LOTTO_ANALISI)):
+                self._coda.put((path, int(verdetto))); fatti += 1
+                if self._annulla.is_set(): break
+        except Exception as e: # Processi non avviabili o terminati: i file rimasti vengono analizzati in questo thread
+            print(f"WARN: Analisi steganografica in processi separati interrotta ({type(e).__name__}: {e})")
+            pool.shutdown(wait=False, cancel_futures=True)
+            for path in self.percorsi[fatti:]:
+                if self._annulla.is_set(): break
+                self._coda.put((path, int(rileva_payload(path))))
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True) # Annullata: i file non ancora iniziati vengono saltati
+            self._coda.put(None) # Segnale di fine
+
+    def risultati_pronti(self):
+        """Restituisce {path: verdetto (0/1)} arrivati dall'ultima chiamata (e segna la fine quando arriva)."""
+        nuovi = {}
+        while True:
+            try: elemento = self._coda.get_nowait()
+            except queue.Empty: break
+            if elemento is None: self.terminata = True; break
+            nuovi[elemento[0]] = elemento[1]
+        self.fatti += len(nuovi)
+        return nuovi
+
+    def annulla(self):
+        """Interrompe l'analisi: i file non ancora iniziati vengono saltati."""
+        self._annulla.set()
+
+
+def capacita_testo(larghezza, altezza, bit_per_canale=BIT_PER_CANALE):
+    """Byte (UTF-8) massimi del messaggio nascondibile in un'immagine larghezza x altezza.
+    Tiene conto dell'intestazione "<n>:" scritta prima del messaggio.
+    """
+    byte_disponibili = larghezza * altezza * CANALI_USATI * bit_per_canale // 8
+    capacita = 0
+    for cifre in range(1, MAX_CIFRE_INTESTAZIONE + 1):
+        # Messaggio più lungo la cui lunghezza si scrive con 'cifre' cifre
+        lunghezza = min(byte_disponibili - cifre - 1, 10 ** cifre - 1)
+        if lunghezza >= 10 ** (cifre - 1): capacita = lunghezza
+    return capacita
+
+
+def capacita_con_chiave(larghezza, altezza):
+    """Byte massimi del messaggio nella modalità con chiave (intestazione binaria di lunghezza fissa)."""
+    return max(0, (larghezza * altezza * CANALI_USATI - BIT_INTESTAZIONE_CHIAVE) // 8)
+
+
+def capacita_voce(voce, con_chiave=False):
+    """Capacità (byte) dell'immagine descritta dai metadati 'voce', o None se non è leggibile.
+    Usa le dimensioni già nel catalogo (lette dall'header) e conserva il risultato nella voce.
+    """
+    if "capacita" not in voce:
+        larghezza, altezza = voce.get("larghezza"), voce.get("altezza")
+        if not larghezza or not altezza:
+            try:
+                with Image.open(voce["path"]) as img: larghezza, altezza = img.size # Solo l'header
+            except Exception:
+                larghezza = altezza = None
+        voce["capacita"] = (capacita_testo(larghezza, altezza), capacita_con_chiave(larghezza, altezza)) if larghezza else None
+    return voce["capacita"] and voce["capacita"][1 if con_chiave else 0]
+
+
+def miglior_contenitore(voci, byte_necessari, escludi=None, con_chiave=False):
+    """Tra le 'voci' che possono contenere 'byte_necessari', la più adatta (o None):
+    i PNG prima degli altri formati, poi quella con più capacità (meno pixel modificati in proporzione).
+    """
+    migliore, punteggio_migliore = None, None
+    for voce in voci:
+        if voce.get("path") == escludi: continue
+        capacita = capacita_voce(voce, con_chiave)
+        if capacita is None or capacita < byte_necessari: continue
+        punteggio = (voce.get("estensione") == ".png", capacita)
+        if punteggio_migliore is None or punteggio > punteggio_migliore:
+            migliore, punteggio_migliore = voce, punteggio
+    return migliore
+
+
+# --- Modalità con Chiave ---
+
+class PermutazioneChiave:
+    """Permutazione pseudo-casuale degli interi [0, n) stabilita da una frase segreta.
+
+    Rete di Feistel bilanciata su 2 * meta bit (dominio fino a 4n) con funzione di
+    round di tipo splitmix64; i valori che cadono fuori da [0, n) vengono cifrati di
+    nuovo finché non rientrano (cycle walking), quindi il risultato è una biiezione
+    su [0, n). Ogni posizione si calcola indipendentemente dalle altre.
+    """
+
+    def __init__(self, chiave, n):
+        self.n = n
+        self.meta = max(1, (max(1, n - 1).bit_length() + 1) // 2)
+        self._maschera = np.uint64((1 << self.meta) - 1)
+        self._chiavi = _chiavi_round.get((chiave, n))
+        if self._chiavi is None:
+            materiale = hashlib.pbkdf2_hmac("sha256", chiave.encode("utf-8"), _SALE_CHIAVE + str(n).encode("ascii"),
+                                            ITERAZIONI_CHIAVE, dklen=8 * ROUND_FEISTEL)
+            self._chiavi = np.frombuffer(materiale, dtype="<u8")
+            _chiavi_round.inserisci((chiave, n), self._chiavi)
+
+    def _round(self, x, chiave):
+        x = x + chiave # Nuovo array: 'x' è la metà destra, ancora necessaria
+        with np.errstate(over="ignore"): # Le moltiplicazioni a 64 bit si avvolgono di proposito
+            x *= np.uint64(0x9E3779B97F4A7C15)
+            x ^= x >> np.uint64(29)
+            x *= np.uint64(0xBF58476D1CE4E5B9)
+            x ^= x >> np.uint64(32)
+        x &= self._maschera
+        return x
+
+    def _cifra(self, valori):
+        meta = np.uint64(self.meta)
+        sinistra, destra = valori >> meta, valori & self._maschera
+        for chiave in self._chiavi:
+            nuova = self._round(destra, chiave)
+            nuova ^= sinistra
+            sinistra, destra = destra, nuova
+        sinistra <<= meta
+        sinistra |= destra
+        return sinistra
+
+    def __call__(self, inizio, fine):
+        """Posizioni permutate degli indici [inizio, fine) (array di uint64)."""
+        risultato = np.empty(max(0, fine - inizio), dtype=np.uint64)
+        for da in range(inizio, fine, BLOCCO_PERMUTAZIONE): # A blocchi: gli array intermedi restano in cache
+            a = min(fine, da + BLOCCO_PERMUTAZIONE)
+            valori = self._cifra(np.arange(da, a, dtype=np.uint64))
+            fuori = np.flatnonzero(valori >= self.n)
+            while fuori.size: # Cycle walking: in media meno di 4 passaggi, solo sui valori fuori dominio
+                valori[fuori] = self._cifra(valori[fuori])
+                fuori = fuori[valori[fuori] >= self.n]
+            risultato[da - inizio:a - inizio] = valori
+        return risultato
+
+
+def _indici(slot, canali):
+    """Indici nell'array piatto dei pixel (RGB o RGBA) degli slot indicati."""
+    if canali == CANALI_USATI: return slot # RGB: lo slot è già l'indice del byte
+    return slot // np.uint64(CANALI_USATI) * np.uint64(canali) + slot % np.uint64(CANALI_USATI) # RGBA: salta l'alfa
+
+
+def _coordinate(img, slot):
+    """(x, y, canale) di ogni slot, come interi Python per l'accesso pixel per pixel."""
+    pixel, canale = np.divmod(slot, np.uint64(CANALI_USATI))
+    y, x = np.divmod(pixel, np.uint64(img.width))
+    return zip(x.tolist(), y.tolist(), canale.tolist())
+
+
+def _leggi_slot(img, slot, pixel=None):
+    """LSB degli slot (array di uint8): dall'array 'pixel' se c'è, altrimenti pixel per pixel dall'immagine."""
+    if pixel is not None: return pixel.reshape(-1)[_indici(slot, pixel.shape[2])] & 1
+    accesso = img.load()
+    return np.fromiter((accesso[x, y][canale] & 1 for x, y, canale in _coordinate(img, slot)),
+                       dtype=np.uint8, count=slot.size)
+
+
+def nascondi_con_chiave(img, testo, chiave):
+    """Nasconde 'testo' nell'immagine PIL negli slot scelti da 'chiave'. Restituisce una nuova immagine.
+    Solleva ValueError se il testo non ci sta.
+    """
+    messaggio = testo.encode("utf-8")
+    capacita = capacita_con_chiave(img.width, img.height)
+    if len(messaggio) > capacita:
+        raise ValueError(f"Il testo occupa {len(messaggio)} byte, l'immagine ne può contenere {capacita}")
+    intestazione = len(messaggio).to_bytes(4, "big") + zlib.crc32(messaggio).to_bytes(4, "big")
+    bit = np.unpackbits(np.frombuffer(intestazione + messaggio, dtype=np.uint8))
+    slot = PermutazioneChiave(chiave, img.width * img.height * CANALI_USATI)(0, bit.size)
+    if img.mode not in ("RGB", "RGBA"): img = img.convert("RGB")
+    if bit.size <= SLOT_PUNTUALI:
+        # Pochi slot: copia dell'immagine (in C) e modifica dei soli pixel coinvolti
+        risultato = img.copy()
+        accesso = risultato.load()
+        for (x, y, canale), valore_bit in zip(_coordinate(img, slot), bit.tolist()):
+            valore = list(accesso[x, y]) # Rilettura a ogni slot: due slot possono cadere nello stesso pixel
+            valore[canale] = valore[canale] & 0xFE | valore_bit
+            accesso[x, y] = tuple(valore)
+        return risultato
+    pixel = np.array(img) # Copia modificabile: l'immagine di partenza non viene toccata
+    piatti = pixel.reshape(-1)
+    indici = _indici(slot, pixel.shape[2])
+    piatti[indici] = (piatti[indici] & 0xFE) | bit # Tutti gli slot in un'unica operazione
+    return Image.fromarray(pixel, img.mode)
+
+
+def rivela_con_chiave(img, chiave):
+    """Estrae il testo nascosto con 'chiave', o None (nessun testo o chiave sbagliata).
+    Legge prima l'intestazione e poi solo gli slot occupati dal messaggio.
+    """
+    if img.width * img.height * CANALI_USATI < BIT_INTESTAZIONE_CHIAVE: return None
+    if img.mode not in ("RGB", "RGBA"): img = img.convert("RGB")
+    permutazione = PermutazioneChiave(chiave, img.width * img.height * CANALI_USATI)
+    intestazione = np.packbits(_leggi_slot(img, permutazione(0, BIT_INTESTAZIONE_CHIAVE))).tobytes()
+    lunghezza, crc = int.from_bytes(intestazione[:4], "big"), int.from_bytes(intestazione[4:], "big")
+    if lunghezza > capacita_con_chiave(img.width, img.height): return None # Chiave sbagliata (o nessun testo)
+    slot = permutazione(BIT_INTESTAZIONE_CHIAVE, BIT_INTESTAZIONE_CHIAVE + 8 * lunghezza)
+    pixel = np.asarray(img) if slot.size > SLOT_PUNTUALI else None # Messaggi lunghi: lettura vettorizzata
+    messaggio = np.packbits(_leggi_slot(img, slot, pixel)).tobytes()
+    if zlib.crc32(messaggio) != crc: return None
+    try: return messaggio.decode("utf-8")
+    except UnicodeDecodeError: return None
@@ -0,0 +1,471 @@
+# --- Visualizzatore a Tile con Zoom e Spostamento ---
+# Mostra un'immagine su un Canvas Tkinter dividendo la vista in tile quadrate:
+# a ogni livello di zoom vengono ridimensionate e convertite in PhotoImage solo
+# le tile che cadono nella parte visibile, e quelle già pronte restano in una
+# cache LRU. Per gli zoom ridotti si usa una "piramide" di versioni dimezzate
+# dell'immagine (per i JPEG decodificate direttamente in scala con draft()).
+import math # Per logaritmi e arrotondamenti
+import tkinter as tk
+from PIL import Image, ImageTk # Per manipolazione immagini
+
+from cache import CacheLRU # Cache delle tile già convertite
+from animazione import RiproduttoreGif # Riproduzione delle GIF animate
+from miniature import decodifica_livello # Livelli della piramide decodificati in scala
+from decodifica import ErroreDecodifica # Decodifica in processi separati
+from memoria import byte_immagine, byte_photo # Contabilità della memoria
+from analisi_lsb import piano_di_bit, differenza # Piani di bit e differenze (verifica della steganografia)
+
+
+class VisualizzatoreTile:
+    """Gestisce zoom (rotella), spostamento (trascinamento) e disegno a tile su un Canvas.
+
+    Finché l'utente non cambia lo zoom l'immagine resta adattata al canvas
+    (come la vecchia presentazione); doppio clic alterna "adatta" e 1:1.
+    Le GIF animate vengono riprodotte mentre sono adattate al canvas; con lo
+    zoom si ispeziona il primo fotogramma. Con un 'decodificatore' (DecodificatoreEsterno)
+    i livelli vengono decodificati in un processo separato senza bloccare la GUI: intanto
+    si vede il livello più vicino già pronto (o un riquadro grigio) e all'arrivo la vista
+    viene ridisegnata. Con imposta_analisi() al posto dell'immagine si vede un suo piano
+    di bit o la differenza con un altro file.
+    """
+
+    LATO_TILE = 256 # Lato delle tile in pixel dello schermo
+    MEMORIA_TILE = 48 * 1024 * 1024 # Byte massimi delle tile convertite in cache (circa 192 tile piene)
+    ZOOM_MASSIMO = 32.0 # Ingrandimento massimo (32 pixel dello schermo per pixel)
+    FATTORE_ZOOM = 1.25 # Passo di zoom per ogni scatto della rotella
+    ZOOM_PIXEL_NETTI = 2.0 # Da questo ingrandimento i pixel non vengono interpolati (utile per gli artefatti LSB)
+    MEMORIA_ANALISI = 256 * 1024 * 1024 # Byte massimi delle immagini di analisi già calcolate
+    INTERVALLO_LIVELLI = 30 # Millisecondi tra due controlli dei livelli in decodifica
+    COLORE_ATTESA = "#808080" # Riquadro mostrato finché non è pronto nessun livello
+
+    def __init__(self, canvas, decodificatore=None):
+        self.canvas = canvas
+        self._decodificatore = decodificatore
+        self.path = None
+        self.larghezza = self.altezza = 0 # Dimensioni dell'immagine originale
+        self.zoom = 1.0 # Pixel dello schermo per pixel dell'immagine
+        self.adatta = True # Se True lo zoom segue le dimensioni del canvas
+        self.ox = self.oy = 0 # Posizione sul canvas dell'angolo in alto a sinistra dell'immagine
+        self._formato = None
+        self._livelli = {} # k -> (immagine ridotta di 2^k, scala x, scala y)
+        self._visibili = {} # chiave tile -> (id elemento canvas, PhotoImage) attualmente disegnate
+        self._cache = CacheLRU(self.MEMORIA_TILE, peso=byte_photo)
+        self._trascinamento = None # Ultima posizione del mouse durante il trascinamento
+        self.animata = False # L'immagine aperta è una GIF animata?
+        self._riproduttore = RiproduttoreGif(canvas, self._mostra_fotogramma)
+        self._fotogramma = None # PhotoImage del fotogramma visibile (riferimento per Tkinter)
+        # Analisi mostrata al posto dell'immagine: None, ("piano", canale, bit) o ("differenza", path dell'altro file)
+        self.analisi = None
+        self.pixel_cambiati = None # Risultato dell'ultima differenza calcolata
+        self.errore_analisi = None # Perché l'ultima analisi richiesta non è stata possibile
+        self._analisi = CacheLRU(self.MEMORIA_ANALISI, peso=lambda valore: byte_immagine(valore[0])) # (path, analisi, k) -> (immagine, pixel cambiati)
+        self._in_arrivo = {} # (path, k) -> Future dei livelli in decodifica nei processi separati
+        self._confronto = None # (path, immagine) dell'altro file della differenza, finché l'analisi non è calcolata
+        self._job_ricezione = None
+        self.errore_decodifica = None # Perché l'immagine aperta non si è potuta decodificare
+        # Funzioni chiamate dopo una decodifica in ritardo: al_errore(path, eccezione) se l'immagine
+        # non è decodificabile, al_cambio_analisi() quando l'analisi è pronta o è fallita (vedi errore_analisi)
+        self.al_errore = None
+        self.al_cambio_analisi = None
+
+        canvas.bind("<Configure>", self._on_configure)
+        canvas.bind("<ButtonPress-1>", self._inizia_trascinamento)
+        canvas.bind("<B1-Motion>", self._trascina)
+        canvas.bind("<ButtonRelease-1>", lambda e: setattr(self, "_trascinamento", None))
+        canvas.bind("<Double-Button-1>", self._alterna_zoom)
+        canvas.bind("<MouseWheel>", self._rotella) # Windows / macOS
+        canvas.bind("<Button-4>", self._rotella) # Linux (X11): rotella su
+        canvas.bind("<Button-5>", self._rotella) # Linux (X11): rotella giù
+
+    # --- Apertura e Livelli ---
+
+    def apri(self, path, analisi=None):
+        """Mostra un'immagine adattata al canvas (o la sua 'analisi', vedi imposta_analisi).
+        Solleva le eccezioni di PIL se l'header non è leggibile; gli errori della decodifica arrivano
+        poi ad al_errore. Se l'analisi non si può calcolare mostra l'immagine e ne lascia il motivo in 'errore_analisi'.
+        """
+        if path != self.path:
+            sorgente = self._decodificatore.apri(path) if self._decodificatore is not None else path
+            with Image.open(sorgente) as img: # Legge solo l'header (cartelle di rete: l'intero file, poi decodificato dalla memoria)
+                larghezza, altezza = img.size
+                formato = img.format
+                animata = getattr(img, "is_animated", False) # Controlla solo se esiste un secondo fotogramma
+            self.chiudi()
+            self.path, self.larghezza, self.altezza, self._formato = path, larghezza, altezza, formato
+            self.animata = animata
+        self.adatta = True
+        self._adatta_al_canvas()
+        self.analisi, self.errore_analisi = analisi, None
+        self._ridisegna(tutto=True)
+        self._aggiorna_animazione()
+
+    def chiudi(self):
+        """Rimuove l'immagine dal canvas e libera i livelli decodificati (le tile restano in cache)."""
+        self._riproduttore.ferma()
+        self.canvas.delete("tile", "animazione")
+        self._visibili.clear()
+        self._livelli.clear()
+        for futuro in self._in_arrivo.values(): futuro.cancel() # Quelli già iniziati finiscono e vengono ignorati
+        self._in_arrivo.clear()
+        self._confronto = None
+        self._fotogramma = None
+        self.path = None
+        self.animata = False
+        self.errore_decodifica = None
+
+    def dimentica(self, path):
+        """Scarta le tile e le analisi di un file (es. modificato sul disco)."""
+        self._cache.rimuovi_se(lambda chiave: chiave[0] == path)
+        self._analisi.rimuovi_se(lambda chiave: chiave[0] == path or chiave[1][0] == "differenza" and chiave[1][1] == path)
+        if self._confronto is not None and self._confronto[0] == path: self._confronto = None
+        if path == self.path: self.chiudi() # Alla prossima apertura rilegge anche l'header
+
+    @property
+    def analisi_in_calcolo(self):
+        """L'analisi attiva aspetta ancora i livelli dai processi di decodifica?"""
+        return self.analisi is not None and self.path is not None and (self.path, self.analisi, 0) not in self._analisi
+
+    def memoria_occupata(self):
+        """Byte di livelli decodificati, tile in cache e fotogrammi della GIF in riproduzione."""
+        livelli = sum(byte_immagine(immagine) for immagine, _, _ in self._livelli.values())
+        if self._confronto is not None: livelli += byte_immagine(self._confronto[1])
+        return livelli + self._cache.peso_totale + self._analisi.peso_totale + self._riproduttore.memoria_occupata()
+
+    def libera_memoria(self, limite):
+        """Scende (se possibile) entro 'limite' byte: prima le tile fuori vista, poi le analisi e i livelli non in uso."""
+        for chiave in self._visibili: self._cache.get(chiave) # Le tile in vista diventano le più recenti
+        in_vista = sum(byte_photo(photo) for _, photo in self._visibili.values())
+        eccesso = self.memoria_occupata() - limite
+        if eccesso > 0: self._cache.riduci(max(in_vista, self._cache.peso_totale - eccesso))
+        eccesso = self.memoria_occupata() - limite
+        if eccesso > 0: self._analisi.riduci(max(0, self._analisi.peso_totale - eccesso)) # Si ricalcolano al bisogno
+        in_uso = self._indice_livello() if self.path is not None else None
+        for k in sorted(self._livelli, key=lambda k: -byte_immagine(self._livelli[k][0])): # Prima i più grandi
+            if self.memoria_occupata() <= limite: break
+            if k != in_uso: del self._livelli[k] # Verrà ricreato se lo zoom lo richiede
+
+    def imposta_analisi(self, analisi):
+        """Mostra un'analisi al posto dell'immagine (None per tornare all'immagine).
+        Le analisi già calcolate restano in cache: passare da un piano all'altro non ricalcola nulla.
+        Se l'analisi non si può calcolare (es. differenza tra immagini di dimensioni diverse), anche quando
+        lo si scopre all'arrivo dei livelli, torna all'immagine e ne lascia il motivo in 'errore_analisi'.
+        """
+        if analisi == self.analisi: return
+        self.analisi, self.errore_analisi = analisi, None
+        if self.path is None: return
+        self._ridisegna(tutto=True)
+        self._aggiorna_animazione()
+
+    def _livello(self, k):
+        """Restituisce (immagine, scala x, scala y) ridotta di un fattore 2^k, creandola se serve
+        (None se sta ancora arrivando dai processi di decodifica)."""
+        if self.analisi is not None: return self._livello_analisi(k)
+        return self._livello_immagine(k)
+
+    def _livello_immagine(self, k):
+        """Livello k della piramide dell'immagine vera (anche mentre è attiva un'analisi), o None se in decodifica."""
+        if k in self._livelli: return self._livelli[k]
+        # JPEG: il decoder produce direttamente la versione ridotta (1/2, 1/4, 1/8). Con i processi
+        # di decodifica non serve tenere qui l'immagine intera per ricavarne i livelli ridotti
+        if k == 0 or (self._formato == "JPEG" and k <= 3) or (self._decodificatore is not None and k - 1 not in self._livelli):
+            immagine = self._decodifica_livello(k)
+            if immagine is None: return None
+        else: # Altri formati: dimezza il livello precedente (media di blocchi 2x2)
+            precedente = self._livello_immagine(k - 1)[0]
+            immagine = precedente.reduce(2) if min(precedente.size) >= 2 else precedente
+        return self._inserisci_livello(k, immagine)
+
+    def _inserisci_livello(self, k, immagine):
+        livello = (immagine, immagine.width / self.larghezza, immagine.height / self.altezza)
+        self._livelli[k] = livello
+        return livello
+
+    def _livello_analisi(self, k):
+        """Livello k dell'analisi attiva, come (immagine, scala x, scala y), o None se i livelli sono in decodifica."""
+        valore = self._valore_analisi(k)
+        if valore is None: return None
+        immagine, self.pixel_cambiati = valore
+        return immagine, immagine.width / self.larghezza, immagine.height / self.altezza
+
+    def _valore_analisi(self, k):
+        """(immagine, pixel cambiati) del livello k dell'analisi, in cache per (file, analisi, k).
+        I livelli oltre lo 0 sono riduzioni con media di blocchi: nei piani di bit diventano la densità di bit a 1.
+        """
+        chiave = (self.path, self.analisi, k)
+        valore = self._analisi.get(chiave)
+        if valore is None:
+            if k == 0: valore = self._calcola_analisi()
+            else:
+                livello_0 = self._valore_analisi(0)
+                if livello_0 is None: return None
+                immagine, cambiati = livello_0
+                valore = (immagine.reduce(min(2 ** k, immagine.width, immagine.height)), cambiati)
+            if valore is None: return None
+            self._analisi.inserisci(chiave, valore)
+        return valore
+
+    def _calcola_analisi(self):
+        """Calcola l'analisi attiva sull'immagine intera (livello 0 della piramide); None finché
+        l'immagine o l'altro file della differenza sono in decodifica."""
+        livello = self._livello_immagine(0)
+        if self.analisi[0] == "piano":
+            if livello is None: return None
+            return piano_di_bit(livello[0], self.analisi[1], self.analisi[2]), None
+        altro = self.analisi[1]
+        if self._confronto is not None and self._confronto[0] == altro: altra = self._confronto[1]
+        else: altra = self._decodifica_livello(0, altro)
+        if altra is None or livello is None:
+            if altra is not None: self._confronto = (altro, altra)
+            return None
+        self._confronto = None # Il risultato resta nella cache delle analisi
+        return differenza(altra, livello[0])
+
+    def _decodifica_livello(self, k, path=None):
+        """Chiede il livello k del file (di default quello aperto) a un processo separato (un file
+        corrotto fa fallire solo quel processo) e restituisce None: _ricevi() lo raccoglie all'arrivo
+        e ridisegna. Senza processi di decodifica lo decodifica subito e lo restituisce.
+        """
+        path = path or self.path
+        if self._decodificatore is not None:
+            if (path, k) in self._in_arrivo: return None # Già richiesto
+            try: futuro = self._decodificatore.decodifica(path, ("livello", k))
+            except ErroreDecodifica: futuro = None # Processi non disponibili: decodifica in proprio
+            if futuro is not None:
+                self._in_arrivo[(path, k)] = futuro
+                if self._job_ricezione is None:
+                    self._job_ricezione = self.canvas.after(self.INTERVALLO_LIVELLI, self._ricevi)
+                return None
+        return decodifica_livello(self._decodificatore.apri(path) if self._decodificatore is not None else path, k)
+
+    def _ricevi(self):
+        """Raccoglie i livelli arrivati dai processi di decodifica e ridisegna la vista."""
+        self._job_ricezione = None
+        arrivati = False
+        for (path, k), futuro in list(self._in_arrivo.items()):
+            if not futuro.done(): continue
+            del self._in_arrivo[(path, k)]
+            if futuro.cancelled(): continue
+            try: immagine = futuro.result()
+            except Exception as e:
+                if path == self.path: self._immagine_fallita(e)
+                else: self._analisi_fallita(e) # L'altro file della differenza
+                arrivati = True; continue
+            if path == self.path: self._inserisci_livello(k, immagine)
+            elif self.analisi is not None and self.analisi[0] == "differenza" and self.analisi[1] == path:
+                self._confronto = (path, immagine)
+            else: continue # Richiesto per un'analisi non più attiva
+            arrivati = True
+        if arrivati:
+            self._ridisegna(tutto=True)
+            if self.analisi is not None and self.al_cambio_analisi is not None: self.al_cambio_analisi()
+        if self._in_arrivo and self._job_ricezione is None:
+            self._job_ricezione = self.canvas.after(self.INTERVALLO_LIVELLI, self._ricevi)
+
+    def _immagine_fallita(self, errore):
+        """L'immagine aperta non è decodificabile: niente più tile né richieste, lo si dice ad al_errore."""
+        if self.errore_decodifica is not None: return # Già segnalato (es. più livelli richiesti insieme)
+        self.errore_decodifica = str(errore)
+        self.canvas.delete("tile")
+        self._visibili.clear()
+        if self.al_errore is not None: self.al_errore(self.path, errore)
+        else: print(f"WARN: Decodifica fallita per {self.path}: {errore}")
+
+    def _analisi_fallita(self, errore):
+        """L'analisi attiva non si può calcolare: si torna all'immagine e se ne lascia il motivo in 'errore_analisi'."""
+        if self.analisi is None: return
+        self.analisi, self.errore_analisi = None, str(errore)
+        self._confronto = None
+        self._aggiorna_animazione()
+        if self.al_cambio_analisi is not None: self.al_cambio_analisi()
+
+    def _indice_livello(self):
+        """Livello della piramide adatto allo zoom corrente (il più piccolo che non perde dettaglio)."""
+        if self.zoom >= 0.5: return 0
+        massimo = int(math.log2(max(1, min(self.larghezza, self.altezza))))
+        return min(int(math.log2(1.0 / self.zoom)), massimo)
+
+    # --- Geometria ---
+
+    def _dimensioni_canvas(self):
+        return self.canvas.winfo_width(), self.canvas.winfo_height()
+
+    def _zoom_adatto(self):
+        """Zoom con cui l'immagine intera sta nel canvas."""
+        cw, ch = self._dimensioni_canvas()
+        return min(cw / self.larghezza, ch / self.altezza)
+
+    def _adatta_al_canvas(self):
+        self.zoom = self._zoom_adatto()
+        self.ox = self.oy = 0
+        self._limita_posizione()
+
+    def _dimensioni_zoom(self):
+        """Dimensioni dell'immagine sullo schermo allo zoom corrente."""
+        return max(1, round(self.larghezza * self.zoom)), max(1, round(self.altezza * self.zoom))
+
+    def _limita_posizione(self):
+        """Centra l'immagine se più piccola del canvas, altrimenti impedisce di spostarla fuori vista."""
+        cw, ch = self._dimensioni_canvas()
+        zw, zh = self._dimensioni_zoom()
+        self.ox = (cw - zw) // 2 if zw <= cw else min(0, max(cw - zw, self.ox))
+        self.oy = (ch - zh) // 2 if zh <= ch else min(0, max(ch - zh, self.oy))
+
+    # --- Disegno ---
+
+    def _tile_visibili(self):
+        """Chiavi (file, zoom, pixel netti, colonna, riga, analisi) delle tile che intersecano il canvas."""
+        cw, ch = self._dimensioni_canvas()
+        zw, zh = self._dimensioni_zoom()
+        lato = self.LATO_TILE
+        tx0, ty0 = max(0, -self.ox // lato), max(0, -self.oy // lato)
+        tx1 = min((zw - 1) // lato, (cw - self.ox - 1) // lato)
+        ty1 = min((zh - 1) // lato, (ch - self.oy - 1) // lato)
+        netti = self.zoom >= self.ZOOM_PIXEL_NETTI and not self.adatta # Adattata al canvas resta sfumata
+        return [(self.path, self.zoom, netti, tx, ty, self.analisi) for ty in range(ty0, ty1 + 1) for tx in range(tx0, tx1 + 1)]
+
+    def _livello_da_disegnare(self):
+        """(immagine, scala x, scala y, esatto) da cui ricavare le tile allo zoom corrente.
+        Mentre il livello giusto è in decodifica si usa il livello dell'immagine più vicino già pronto
+        (esatto = False: quelle tile non vanno in cache); None se non ce n'è ancora nessuno.
+        """
+        k = self._indice_livello()
+        try:
+            livello = self._livello(k)
+        except Exception as e:
+            if self.analisi is None: raise
+            self._analisi_fallita(e) # Es. originale e file con testo di dimensioni diverse
+            livello = self._livello(k)
+        if livello is not None: return livello + (True,)
+        if not self._livelli: return None
+        vicino = min(self._livelli, key=lambda j: (abs(j - k), j)) # A pari distanza il più dettagliato
+        return self._livelli[vicino] + (False,)
+
+    def _crea_tile(self, tx, ty, netti, livello):
+        """Ridimensiona dal livello della piramide solo la porzione di immagine coperta dalla tile."""
+        lato = self.LATO_TILE
+        zw, zh = self._dimensioni_zoom()
+        zx0, zy0 = tx * lato, ty * lato
+        zx1, zy1 = min(zx0 + lato, zw), min(zy0 + lato, zh)
+        immagine, sx, sy = livello[:3]
+        # Riquadro corrispondente nell'immagine originale, riportato alle coordinate del livello
+        box = (zx0 / self.zoom * sx, zy0 / self.zoom * sy,
+               min(zx1 / self.zoom, self.larghezza) * sx, min(zy1 / self.zoom, self.altezza) * sy)
+        filtro = Image.Resampling.NEAREST if netti else Image.Resampling.BILINEAR
+        return ImageTk.PhotoImage(immagine.resize((zx1 - zx0, zy1 - zy0), filtro, box=box))
+
+    def _ridisegna(self, tutto=False):
+        """Disegna le tile visibili mancanti e rimuove quelle uscite dalla vista."""
+        if self.path is None or self.errore_decodifica is not None: return
+        if tutto:
+            self.canvas.delete("tile")
+            self._visibili.clear()
+        visibili = self._tile_visibili()
+        for chiave in set(self._visibili) - set(visibili):
+            self.canvas.delete(self._visibili.pop(chiave)[0])
+        livello = None # Cercato solo se manca qualche tile
+        for chiave in visibili:
+            if chiave in self._visibili: continue
+            photo = self._cache.get(chiave)
+            if photo is None:
+                if livello is None:
+                    try: livello = self._livello_da_disegnare()
+                    except Exception as e: # Processi non disponibili e file non decodificabile
+                        self._immagine_fallita(e); return
+                    if livello is None: # Niente di pronto: un riquadro grigio finché arriva il primo livello
+                        if not self.canvas.find_withtag("attesa"):
+                            zw, zh = self._dimensioni_zoom()
+                            self.canvas.create_rectangle(self.ox, self.oy, self.ox + zw, self.oy + zh, fill=self.COLORE_ATTESA,
+                                                         outline="", tags=("tile", "attesa"))
+                        return
+                    self.canvas.delete("attesa")
+                photo = self._crea_tile(chiave[3], chiave[4], chiave[2], livello)
+                if livello[3]: self._cache.inserisci(chiave, photo)
+            x, y = self.ox + chiave[3] * self.LATO_TILE, self.oy + chiave[4] * self.LATO_TILE
+            elemento = self.canvas.create_image(x, y, anchor=tk.NW, image=photo, tags="tile")
+            self._visibili[chiave] = (elemento, photo) # Riferimento: la cache potrebbe scartarla mentre è visibile
+        self.canvas.delete("attesa")
+        self.canvas.tag_raise("animazione") # Le tile arrivate in ritardo restano sotto la GIF in riproduzione
+
+    # --- Animazione ---
+
+    def _aggiorna_animazione(self):
+        """Riproduce la GIF se è adattata al canvas; altrimenti restano le tile del primo fotogramma."""
+        if self.path is not None and self.animata and self.adatta and self.analisi is None:
+            self._riproduttore.avvia(self.path, self._dimensioni_zoom())
+        else:
+            self._riproduttore.ferma()
+            self.canvas.delete("animazione")
+            self._fotogramma = None
+
+    def _mostra_fotogramma(self, photo):
+        """Disegna un fotogramma sopra le tile (riusando lo stesso elemento del canvas)."""
+        self._fotogramma = photo
+        elementi = self.canvas.find_withtag("animazione")
+        if elementi:
+            self.canvas.itemconfigure(elementi[0], image=photo)
+            self.canvas.coords(elementi[0], self.ox, self.oy)
+        else:
+            self.canvas.create_image(self.ox, self.oy, anchor=tk.NW, image=photo, tags="animazione")
+
+    # --- Eventi ---
+
+    def _on_configure(self, event=None):
+        """Il canvas ha cambiato dimensione: riadatta (se in modalità adatta) e completa la vista."""
+        if self.path is None: return
+        if self.adatta:
+            self._adatta_al_canvas()
+            self._ridisegna(tutto=True)
+            self._aggiorna_animazione() # Fotogrammi alla nuova dimensione
+        else:
+            vecchio = (self.ox, self.oy)
+            self._limita_posizione()
+            self._ridisegna(tutto=(self.ox, self.oy) != vecchio)
+
+    def imposta_zoom(self, zoom, x=None, y=None):
+        """Cambia lo zoom mantenendo fermo il punto (x, y) del canvas (di default il centro)."""
+        if self.path is None: return
+        cw, ch = self._dimensioni_canvas()
+        x = cw / 2 if x is None else x
+        y = ch / 2 if y is None else y
+        zoom = max(min(self._zoom_adatto(), 1.0), min(self.ZOOM_MASSIMO, zoom))
+        if zoom == self.zoom: return
+        # Punto dell'immagine sotto il cursore, che deve restare sotto il cursore
+        px, py = (x - self.ox) / self.zoom, (y - self.oy) / self.zoom
+        self.zoom = zoom
+        self.adatta = False
+        self.ox, self.oy = round(x - px * zoom), round(y - py * zoom)
+        self._limita_posizione()
+        self._ridisegna(tutto=True)
+        self._aggiorna_animazione()
+
+    def _rotella(self, event):
+        if getattr(event, "num", None) == 4 or getattr(event, "delta", 0) > 0: fattore = self.FATTORE_ZOOM
+        else: fattore = 1 / self.FATTORE_ZOOM
+        self.imposta_zoom(self.zoom * fattore, event.x, event.y)
+
+    def _alterna_zoom(self, event):
+        """Doppio clic: da "adatta" a 1:1 (sul punto cliccato) e viceversa."""
+        if self.path is None: return
+        if self.zoom != 1.0:
+            self.imposta_zoom(1.0, event.x, event.y)
+        else:
+            self.adatta = True
+            self._adatta_al_canvas()
+            self._ridisegna(tutto=True)
+            self._aggiorna_animazione()
+
+    def _inizia_trascinamento(self, event):
+        self._trascinamento = (event.x, event.y)
+
+    def _trascina(self, event):
+        """Sposta la vista: le tile già disegnate vengono solo traslate, si creano solo quelle nuove."""
+        if self.path is None or self._trascinamento is None: return
+        vecchio = (self.ox, self.oy)
+        self.ox += event.x - self._trascinamento[0]
+        self.oy += event.y - self._trascinamento[1]
+        self._trascinamento = (event.x, event.y)
+        self._limita_posizione()
+        dx, dy = self.ox - vecchio[0], self.oy - vecchio[1]
+        if dx or dy:
+            self.canvas.move("tile", dx, dy)
+            self._ridisegna()